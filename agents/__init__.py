@@ -1,13 +1,19 @@
-from agents.supervisor import SupervisorAgent
-from agents.enhancer import EnhancerAgent
-from agents.researcher import ResearcherAgent
-from agents.coder import CoderAgent
-from agents.validator import ValidatorAgent
+import importlib
 
-__all__ = [
-    'SupervisorAgent',
-    'EnhancerAgent',
-    'ResearcherAgent',
-    'CoderAgent',
-    'ValidatorAgent'
-]
\ No newline at end of file
+# Agents pull in langgraph and the provider SDKs, so they are imported on first access
+_EXPORTS = {
+    'SupervisorAgent': 'agents.supervisor',
+    'EnhancerAgent': 'agents.enhancer',
+    'ResearcherAgent': 'agents.researcher',
+    'CoderAgent': 'agents.coder',
+    'ValidatorAgent': 'agents.validator',
+    'DeciderAgent': 'agents.decider',
+    'SpeculatorAgent': 'agents.speculator'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
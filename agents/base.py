@@ -1,21 +1,36 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Literal, Any
-from langchain_groq import ChatGroq
-from langgraph.graph import MessagesState
+from typing import Literal, Any, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langgraph.graph import MessagesState, END
 from langgraph.types import Command
-from config.settings import GROQ_API_KEY, LLM_MODEL
+from core.budget import BudgetExceeded
+from core.compaction import CompactionPolicy, ContextCompactor
+from core.llm import LLMFactory
+from core.run_context import RunContext
 from utils.logger import logger
+from utils.resilience import CircuitOpenError, is_retryable
 
 class BaseAgent(ABC):
     """
     Abstract base class for all agents in the workflow.
     Defines the common interface and shared functionality.
     """
+    # Node that reviews the answers of answering agents; the decider when the workflow is fused
+    handoff = "validator"
     
-    def __init__(self):
-        """Initialize the agent with a language model."""
-        self.llm = ChatGroq(groq_api_key=GROQ_API_KEY, model_name=LLM_MODEL)
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        """
+        Initialize the agent with a language model.
+        
+        Args:
+            llm: Optional shared chat model; the agent's model from AGENT_MODELS is used if omitted
+        """
         self.name = self.__class__.__name__.lower().replace('agent', '')
+        self.llm = llm if llm is not None else LLMFactory.create_agent_model(self.name)
+        self.compactor = ContextCompactor(CompactionPolicy.for_agent(self.name))
     
     @abstractmethod
     def process(self, state: MessagesState) -> Command:
@@ -30,6 +45,108 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def aprocess(self, state: MessagesState) -> Command:
+        """
+        Asynchronously process the current state and return a command for the next step.
+        Agents override this with a native async implementation; the default
+        runs process() in a worker thread so the event loop is never blocked.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A Command object indicating the next step
+        """
+        return await asyncio.to_thread(self.process, state)
+    
+    def as_node(self) -> RunnableLambda:
+        """
+        Wrap the agent as a graph node exposing both sync and async entry points.
+        
+        Returns:
+            A runnable that calls process() from invoke and aprocess() from ainvoke
+        """
+        return RunnableLambda(self._run_node, afunc=self._arun_node, name=self.name)
+    
+    def _run_node(self, state: MessagesState, config: RunnableConfig) -> Command:
+        """
+        Node entry point: activates the run context, traces the step, enforces
+        the run's budget and calls process().
+        
+        Args:
+            state: The current workflow state
+            config: The graph config, carrying the run context
+            
+        Returns:
+            The agent's command, or a command ending the run if a budget ran
+            out or a provider is unavailable
+        """
+        run = RunContext.from_config(config)
+        if run is None:
+            return self.process(state)
+        
+        with run.activate(), run.trace.span("agent", self.name):
+            try:
+                run.budget.record_hop()
+                return self.process(state)
+            except BudgetExceeded as e:
+                return self.terminate(e.reason)
+            except Exception as e:
+                # A provider still failing after retries, or behind an open circuit, ends the run gracefully
+                if isinstance(e, CircuitOpenError) or is_retryable(e):
+                    return self.terminate(f"provider unavailable ({type(e).__name__})")
+                raise
+    
+    async def _arun_node(self, state: MessagesState, config: RunnableConfig) -> Command:
+        """
+        Async node entry point: activates the run context, traces the step,
+        enforces the run's budget and awaits aprocess().
+        
+        Args:
+            state: The current workflow state
+            config: The graph config, carrying the run context
+            
+        Returns:
+            The agent's command, or a command ending the run if a budget ran
+            out or a provider is unavailable
+        """
+        run = RunContext.from_config(config)
+        if run is None:
+            return await self.aprocess(state)
+        
+        with run.activate(), run.trace.span("agent", self.name):
+            try:
+                run.budget.record_hop()
+                return await self.aprocess(state)
+            except BudgetExceeded as e:
+                return self.terminate(e.reason)
+            except Exception as e:
+                # A provider still failing after retries, or behind an open circuit, ends the run gracefully
+                if isinstance(e, CircuitOpenError) or is_retryable(e):
+                    return self.terminate(f"provider unavailable ({type(e).__name__})")
+                raise
+    
+    def terminate(self, reason: str) -> Command:
+        """
+        End the run early, keeping the answers gathered so far in the state.
+        
+        Args:
+            reason: Why the run is being stopped
+            
+        Returns:
+            A Command routing to END with the termination reason recorded
+        """
+        logger.warning(f"Stopping run at node '{self.name}': {reason}")
+        return Command(
+            update={
+                "messages": [
+                    HumanMessage(content=f"Run stopped early: {reason}.", name="terminated")
+                ],
+                "termination_reason": reason
+            },
+            goto=END
+        )
+    
     def log_transition(self, next_node: str):
         """
         Log the transition from this agent to the next node.
@@ -41,7 +158,8 @@ class BaseAgent(ABC):
     
     def prepare_messages(self, system_prompt: str, state: MessagesState) -> list:
         """
-        Prepare messages for the language model by combining system prompt with state.
+        Prepare messages for the language model by combining system prompt with
+        the state's history, compacted according to the agent's policy.
         
         Args:
             system_prompt: The system prompt to guide the LLM
@@ -52,4 +170,4 @@ class BaseAgent(ABC):
         """
         return [
             {"role": "system", "content": system_prompt},
-        ] + state["messages"]
\ No newline at end of file
+        ] + self.compactor.compact(state["messages"])
\ No newline at end of file
@@ -1,5 +1,6 @@
-from typing import Literal
-from langchain_core.messages import HumanMessage
+from typing import Any, Dict, List, Literal, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, ToolMessage
 from langgraph.graph import MessagesState
 from langgraph.types import Command
 from langgraph.prebuilt import create_react_agent
@@ -12,9 +13,31 @@ class CoderAgent(BaseAgent):
     """
     Coder agent that handles technical tasks related to calculation,
     coding, data analysis, and problem-solving.
+    
+    Its answer carries the sub-agent's last code execution (code, output and
+    whether it succeeded) under additional_kwargs['execution'], so reviewers
+    can check the answer against it.
     """
     
-    def process(self, state: MessagesState) -> Command[Literal["validator"]]:
+    def __init__(self, llm: Optional[BaseChatModel] = None, executor: Optional[str] = None):
+        """
+        Initialize the agent and compile its ReAct sub-agent once.
+        
+        Args:
+            llm: Optional shared chat model; the agent's model from AGENT_MODELS is used if omitted
+            executor: Python executor, 'riza' or 'local'; defaults to the
+                PYTHON_EXECUTOR setting
+        """
+        super().__init__(llm)
+        
+        # Create a ReAct agent for coding over the pooled coding tools
+        self.code_agent = create_react_agent(
+            self.llm,
+            tools=ToolFactory.create_coding_tools(shared=True, executor=executor),
+            state_modifier=self.compactor.prompt(CODER_PROMPT)
+        )
+    
+    def process(self, state: MessagesState) -> Command[Literal["validator", "decider"]]:
         """
         Process the current state to perform coding, calculation, or analysis tasks.
         
@@ -22,23 +45,43 @@ class CoderAgent(BaseAgent):
             state: The current workflow state
             
         Returns:
-            A Command object routing to the validator with coding results
+            A Command object routing to the validator or decider with coding results
         """
-        # Create coding tools
-        coding_tools = ToolFactory.create_coding_tools()
+        # Invoke the code agent
+        result = self.code_agent.invoke(state)
         
-        # Create a ReAct agent for coding
-        code_agent = create_react_agent(
-            self.llm,
-            tools=coding_tools,
-            state_modifier=CODER_PROMPT
-        )
+        return self._route(result)
+    
+    async def aprocess(self, state: MessagesState) -> Command[Literal["validator", "decider"]]:
+        """
+        Asynchronously perform coding, calculation, or analysis tasks.
         
-        # Invoke the code agent
-        result = code_agent.invoke(state)
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A Command object routing to the validator or decider with coding results
+        """
+        # Invoke the code agent without blocking the event loop
+        result = await self.code_agent.ainvoke(state)
+        
+        return self._route(result)
+    
+    def _route(self, result: dict) -> Command[Literal["validator", "decider"]]:
+        """
+        Build the command that hands the sub-agent's final answer to the validator or decider.
         
+        Args:
+            result: The final state of the ReAct sub-agent
+            
+        Returns:
+            A Command object routing to the validator or decider
+        """
         # Log the transition
-        self.log_transition("validator")
+        self.log_transition(self.handoff)
+        
+        # Keep the evidence of the last execution with the answer
+        execution = self._last_execution(result["messages"])
         
         # Return command with updated state and next destination
         return Command(
@@ -46,9 +89,31 @@ class CoderAgent(BaseAgent):
                 "messages": [
                     HumanMessage(
                         content=result["messages"][-1].content,
-                        name="coder"
+                        name="coder",
+                        additional_kwargs={"execution": execution} if execution else {}
                     )
                 ]
             },
-            goto="validator"
-        )
\ No newline at end of file
+            goto=self.handoff
+        )
+    
+    @staticmethod
+    def _last_execution(messages: List[BaseMessage]) -> Optional[Dict[str, Any]]:
+        """
+        Find the sub-agent's last code execution.
+        
+        Args:
+            messages: The final messages of the ReAct sub-agent
+            
+        Returns:
+            The code, its output and whether it ran without error, or None if
+            no code was executed
+        """
+        outputs = {message.tool_call_id: message for message in messages if isinstance(message, ToolMessage)}
+        for message in reversed(messages):
+            for call in reversed(getattr(message, "tool_calls", None) or []):
+                code = call["args"].get("code")
+                if isinstance(code, str) and call["id"] in outputs:
+                    output = outputs[call["id"]]
+                    return {"code": code, "output": str(output.content), "ok": output.status != "error"}
+        return None
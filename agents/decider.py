@@ -0,0 +1,202 @@
+import ast
+import re
+from typing import Literal, Optional
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+from langgraph.graph import MessagesState, END
+from langgraph.types import Command
+
+from agents.base import BaseAgent
+from core.models import Decision
+from core.run_context import RunContext
+from config.settings import DECIDER_PROMPT, DECIDER_ACCEPT_VERIFIED_CODE, NONDETERMINISTIC_MODULES
+from utils.logger import logger
+
+# Builtins whose result depends on the environment rather than the code
+NONDETERMINISTIC_BUILTINS = ("input", "open", "exec", "eval", "__import__", "hash", "id")
+
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:[.,]\d+)*(?!\w|\.\d)")
+
+class DeciderAgent(BaseAgent):
+    """
+    Decider agent that judges the latest answer and picks the next step in
+    one structured call, replacing the validator-then-supervisor round trip:
+    FINISH ends the workflow, otherwise the chosen worker gets the task directly.
+    
+    A coder answer backed by a successful, deterministic code execution whose
+    output it reports is accepted locally, without an LLM call.
+    """
+    
+    def __init__(self, llm: Optional[BaseChatModel] = None, accept_verified_code: bool = DECIDER_ACCEPT_VERIFIED_CODE):
+        """
+        Initialize the agent.
+        
+        Args:
+            llm: Optional shared chat model; the agent's model from AGENT_MODELS is used if omitted
+            accept_verified_code: Accept verified coder answers without asking the LLM
+        """
+        super().__init__(llm)
+        self.accept_verified_code = accept_verified_code
+    
+    def process(self, state: MessagesState) -> Command[Literal["enhancer", "researcher", "coder", "__end__"]]:
+        """
+        Process the current state to accept the answer or route the next step.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A Command object routing to the next worker or end
+        """
+        if self._verified(state):
+            return self._accept_verified()
+        
+        # Get structured output from the LLM
+        response = self.llm.with_structured_output(Decision).invoke(self.prepare_messages(DECIDER_PROMPT, state))
+        
+        return self._route(response)
+    
+    async def aprocess(self, state: MessagesState) -> Command[Literal["enhancer", "researcher", "coder", "__end__"]]:
+        """
+        Asynchronously accept the answer or route the next step.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A Command object routing to the next worker or end
+        """
+        if self._verified(state):
+            return self._accept_verified()
+        
+        # Get structured output from the LLM without blocking the event loop
+        response = await self.llm.with_structured_output(Decision).ainvoke(self.prepare_messages(DECIDER_PROMPT, state))
+        
+        return self._route(response)
+    
+    def _verified(self, state: MessagesState) -> bool:
+        """
+        Check locally whether the latest answer is the coder's, backed by an
+        execution that succeeded, is reproducible and whose final output line
+        the answer reports.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            Whether the answer can be accepted without the LLM
+        """
+        message = state["messages"][-1]
+        if not self.accept_verified_code or getattr(message, "name", None) != "coder":
+            return False
+        
+        execution = message.additional_kwargs.get("execution")
+        if not execution or not execution.get("ok") or not self.is_deterministic(execution["code"]):
+            return False
+        
+        output = execution["output"].strip()
+        if not output or "Traceback (most recent call last)" in output:
+            return False
+        
+        # The answer must state the result, not merely follow a run that produced it
+        result = " ".join(output.splitlines()[-1].split())
+        return self.reports(result, " ".join(str(message.content).split()))
+    
+    @staticmethod
+    def reports(result: str, answer: str) -> bool:
+        """
+        Check that an answer states a result as a whole value, not as part of
+        another one, e.g. that 4 is not taken from 42 or -4.
+        
+        Args:
+            result: The execution's final output line
+            answer: The answer text
+            
+        Returns:
+            Whether the result appears unambiguously; False leaves the decision to the LLM
+        """
+        matches = re.findall(rf"(?<![\w.-]){re.escape(result)}(?!\w|\.\d)", answer)
+        if not matches:
+            return False
+        # Short results such as 1, 0 or True turn up in most answers; only trust them
+        # when they are the answer's single figure
+        if len(result) == 1 or result in ("True", "False", "None"):
+            others = [number for number in _NUMBER.findall(answer) if number != result]
+            return len(matches) == 1 and not others
+        return True
+    
+    @staticmethod
+    def is_deterministic(code: str) -> bool:
+        """
+        Check that code's output depends only on the code: no clock, randomness,
+        environment, input, files or network.
+        
+        Args:
+            code: Python source
+            
+        Returns:
+            Whether running it again would print the same output
+        """
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return False
+        
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                modules = [node.module or ""]
+            elif isinstance(node, ast.Attribute):
+                # e.g. numpy.random, reached without importing the module itself
+                modules = [node.attr]
+            elif isinstance(node, ast.Name) and node.id in NONDETERMINISTIC_BUILTINS:
+                return False
+            else:
+                continue
+            if any(module.split(".")[0] in NONDETERMINISTIC_MODULES for module in modules):
+                return False
+        return True
+    
+    def _accept_verified(self) -> Command[Literal["__end__"]]:
+        """
+        End the workflow on a verified coder answer.
+        
+        Returns:
+            A Command object routing to end
+        """
+        run = RunContext.current()
+        if run is not None:
+            run.record("verified_accepts")
+        return self._route(Decision(
+            next="FINISH",
+            reason="Accepted without review: the answer reports the output of a successful deterministic execution."
+        ))
+    
+    def _route(self, response: Decision) -> Command[Literal["enhancer", "researcher", "coder", "__end__"]]:
+        """
+        Turn the decision into a routing command.
+        
+        Args:
+            response: The structured decision
+            
+        Returns:
+            A Command object routing to the chosen worker or end
+        """
+        update = {
+            "messages": [
+                HumanMessage(content=response.reason, name="decider")
+            ]
+        }
+        
+        # Determine the next node
+        if response.next == "FINISH":
+            goto = END
+            update["termination_reason"] = "validated"
+            logger.info("Transitioning to END")
+        else:
+            goto = response.next
+            self.log_transition(goto)
+        
+        # Return command with updated state and next destination
+        return Command(update=update, goto=goto)
@@ -28,6 +28,36 @@ class EnhancerAgent(BaseAgent):
         # Get response from the LLM
         enhanced_query = self.llm.invoke(messages)
         
+        return self._route(enhanced_query.content)
+    
+    async def aprocess(self, state: MessagesState) -> Command[Literal["supervisor"]]:
+        """
+        Asynchronously enhance and clarify the user query.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A Command object routing back to the supervisor with enhanced query
+        """
+        # Prepare messages with the enhancer prompt
+        messages = self.prepare_messages(ENHANCER_PROMPT, state)
+        
+        # Get response from the LLM without blocking the event loop
+        enhanced_query = await self.llm.ainvoke(messages)
+        
+        return self._route(enhanced_query.content)
+    
+    def _route(self, content: str) -> Command[Literal["supervisor"]]:
+        """
+        Build the command that hands the enhanced query back to the supervisor.
+        
+        Args:
+            content: The enhanced query text
+            
+        Returns:
+            A Command object routing back to the supervisor
+        """
         # Log the transition
         self.log_transition("supervisor")
         
@@ -36,7 +66,7 @@ class EnhancerAgent(BaseAgent):
             update={
                 "messages": [
                     HumanMessage(
-                        content=enhanced_query.content,
+                        content=content,
                         name="enhancer"
                     )
                 ]
@@ -1,20 +1,67 @@
-from typing import Literal
+import asyncio
+import contextvars
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Literal, Optional, Tuple
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage
 from langgraph.graph import MessagesState
 from langgraph.types import Command
 from langgraph.prebuilt import create_react_agent
 
 from agents.base import BaseAgent
+from core.budget import BudgetExceeded
+from core.decompose import QueryDecomposer
+from core.run_context import RunContext
+from core.state import WorkflowState
 from tools.tool_factory import ToolFactory
-from config.settings import RESEARCHER_PROMPT
+from utils.logger import logger
+from utils.tokens import truncate_to_tokens
+from config.settings import (
+    RESEARCHER_PROMPT,
+    RESEARCH_DECOMPOSE_ENABLED,
+    RESEARCH_MAX_SUBQUERIES,
+    RESEARCH_SEARCH_CONCURRENCY,
+    RESEARCH_SEARCH_POOL_SIZE
+)
 
 class ResearcherAgent(BaseAgent):
     """
     Researcher agent that gathers information using search tools.
     Specializes in information retrieval and synthesis.
+    
+    Compound questions are split into sub-queries whose searches run
+    concurrently, and answered from the merged results in one LLM call;
+    other questions go through a ReAct sub-agent, which runs the tool calls
+    of one model turn in parallel.
     """
+    # Worker threads for sub-query searches, shared by every researcher in the process;
+    # each question is bounded separately, so one slow run cannot take them all
+    _search_pool: Optional[ThreadPoolExecutor] = None
+    _pool_lock = threading.Lock()
     
-    def process(self, state: MessagesState) -> Command[Literal["validator"]]:
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        """
+        Initialize the agent and compile its ReAct sub-agent once.
+        
+        Args:
+            llm: Optional shared chat model; the agent's model from AGENT_MODELS is used if omitted
+        """
+        super().__init__(llm)
+        
+        # Create a ReAct agent for research over the pooled research tools
+        tools = ToolFactory.create_research_tools(shared=True)
+        self.search_tool = tools[0]
+        self.research_agent = create_react_agent(
+            self.llm,
+            tools=tools,
+            state_modifier=self.compactor.prompt(RESEARCHER_PROMPT)
+        )
+        # Bounds the parallel tool calls of one model turn
+        self.agent_config = {"max_concurrency": RESEARCH_SEARCH_CONCURRENCY}
+    
+    def process(self, state: MessagesState) -> Command[Literal["validator", "decider"]]:
         """
         Process the current state to research and gather information.
         
@@ -22,33 +69,167 @@ class ResearcherAgent(BaseAgent):
             state: The current workflow state
             
         Returns:
-            A Command object routing to the validator with research results
+            A Command object routing to the validator or decider with research results
         """
-        # Create research tools
-        research_tools = ToolFactory.create_research_tools()
+        queries = self._plan(state)
+        if len(queries) < 2:
+            # Invoke the research agent
+            result = self.research_agent.invoke(state, self.agent_config)
+            return self._route(result["messages"][-1].content)
         
-        # Create a ReAct agent for research
-        research_agent = create_react_agent(
-            self.llm,
-            tools=research_tools,
-            state_modifier=RESEARCHER_PROMPT
-        )
+        # Search every sub-query on the shared pool, at most RESEARCH_SEARCH_CONCURRENCY at a time;
+        # each task copies the context so callbacks follow
+        semaphore = threading.Semaphore(RESEARCH_SEARCH_CONCURRENCY)
+        
+        def search(query: str) -> Any:
+            with semaphore:
+                return self.search_tool.invoke(query)
+        
+        pool = self._pool()
+        futures = [pool.submit(contextvars.copy_context().run, search, query) for query in queries]
+        outcomes = [
+            (None, future.exception()) if future.exception() is not None else (future.result(), None)
+            for future in futures
+        ]
+        
+        # Answer from the merged results in one call
+        response = self.llm.invoke(self._synthesis_messages(state, queries, outcomes))
+        return self._route(response.content)
+    
+    async def aprocess(self, state: MessagesState) -> Command[Literal["validator", "decider"]]:
+        """
+        Asynchronously research and gather information.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A Command object routing to the validator or decider with research results
+        """
+        queries = self._plan(state)
+        if len(queries) < 2:
+            # Invoke the research agent without blocking the event loop
+            result = await self.research_agent.ainvoke(state, self.agent_config)
+            return self._route(result["messages"][-1].content)
+        
+        # Search every sub-query concurrently, at most RESEARCH_SEARCH_CONCURRENCY at a time
+        semaphore = asyncio.Semaphore(RESEARCH_SEARCH_CONCURRENCY)
+        
+        async def search(query: str) -> Any:
+            async with semaphore:
+                return await self.search_tool.ainvoke(query)
+        
+        results = await asyncio.gather(*(search(query) for query in queries), return_exceptions=True)
+        outcomes = [
+            (None, result) if isinstance(result, BaseException) else (result, None)
+            for result in results
+        ]
+        
+        # Answer from the merged results in one call
+        response = await self.llm.ainvoke(self._synthesis_messages(state, queries, outcomes))
+        return self._route(response.content)
+    
+    @classmethod
+    def _pool(cls) -> ThreadPoolExecutor:
+        """Get the shared search pool, creating it on first use."""
+        with cls._pool_lock:
+            if cls._search_pool is None:
+                cls._search_pool = ThreadPoolExecutor(
+                    max_workers=RESEARCH_SEARCH_POOL_SIZE,
+                    thread_name_prefix="research"
+                )
+            return cls._search_pool
+    
+    @staticmethod
+    def _plan(state: MessagesState) -> List[str]:
+        """
+        Split the user's question into sub-queries on the first research pass.
+        Once the question was answered and sent back, the ReAct sub-agent
+        takes over so it can act on the feedback.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            The sub-queries, or a single query when the question is not split
+        """
+        question = WorkflowState.get_user_question(state)
+        if not RESEARCH_DECOMPOSE_ENABLED:
+            return [question]
+        for message in reversed(state["messages"]):
+            if isinstance(message, HumanMessage) and not message.name:
+                break
+            if getattr(message, "name", None) in ("researcher", "speculator"):
+                return [question]
+        
+        queries = QueryDecomposer.decompose(question, RESEARCH_MAX_SUBQUERIES)
+        if len(queries) > 1:
+            logger.info(f"Researcher split the question into {len(queries)} searches: {queries}")
+            run = RunContext.current()
+            if run is not None:
+                run.record("research_subqueries", len(queries))
+        return queries
+    
+    def _synthesis_messages(self, state: MessagesState, queries: List[str],
+                            outcomes: List[Tuple[Any, Optional[BaseException]]]) -> list:
+        """
+        Build the synthesis prompt: the conversation plus one block of results per sub-query.
+        
+        Args:
+            state: The current workflow state
+            queries: The sub-queries, in question order
+            outcomes: (results, error) per sub-query
+            
+        Returns:
+            A list of messages ready for the LLM
+        """
+        # A search that hit the budget stops the run; if every search failed, so does the step
+        for _, error in outcomes:
+            if isinstance(error, BudgetExceeded):
+                raise error
+        errors = [error for _, error in outcomes if error is not None]
+        if len(errors) == len(outcomes):
+            raise errors[0]
         
-        # Invoke the research agent
-        result = research_agent.invoke(state)
+        sections = []
+        for index, (query, (results, error)) in enumerate(zip(queries, outcomes), start=1):
+            if error is not None:
+                logger.warning(f"Search for sub-query '{query}' failed: {error}")
+                text = f"Search failed: {type(error).__name__}"
+            else:
+                text = results if isinstance(results, str) else json.dumps(results, default=str)
+            sections.append(f"[{index}] {query}\n{truncate_to_tokens(text, self.compactor.policy.tool_max_tokens)}")
         
+        return self.prepare_messages(RESEARCHER_PROMPT, state) + [
+            HumanMessage(
+                content="Search results, one block per part of the question:\n\n" + "\n\n".join(sections)
+                        + "\n\nAnswer the user's question using these results.",
+                name="search"
+            )
+        ]
+    
+    def _route(self, answer: str) -> Command[Literal["validator", "decider"]]:
+        """
+        Build the command that hands the research answer to the validator or decider.
+        
+        Args:
+            answer: The researcher's final answer
+            
+        Returns:
+            A Command object routing to the validator or decider
+        """
         # Log the transition
-        self.log_transition("validator")
+        self.log_transition(self.handoff)
         
         # Return command with updated state and next destination
         return Command(
             update={
                 "messages": [
                     HumanMessage(
-                        content=result["messages"][-1].content,
+                        content=answer,
                         name="researcher"
                     )
                 ]
             },
-            goto="validator"
-        )
\ No newline at end of file
+            goto=self.handoff
+        )
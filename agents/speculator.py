@@ -0,0 +1,156 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Literal, Optional, Tuple
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+from langgraph.graph import MessagesState
+from langgraph.types import Command
+
+from agents.base import BaseAgent
+from core.budget import BudgetExceeded
+from core.run_context import RunContext
+from utils.logger import logger
+
+class SpeculatorAgent(BaseAgent):
+    """
+    Fan-out agent that runs several answering agents concurrently on the same
+    state and merges their answers into one message for the validator.
+    The supervisor routes here when a query plausibly needs both research
+    and computation, replacing serial supervisor/validator round trips.
+    """
+    
+    def __init__(self, branches: List[BaseAgent], llm: Optional[BaseChatModel] = None):
+        """
+        Initialize the agent.
+        
+        Args:
+            branches: Agents to run in parallel; their order fixes the merge order
+            llm: Optional shared chat model; the first branch's model is reused if omitted
+        """
+        # The speculator makes no LLM calls of its own, so it needs no model from AGENT_MODELS
+        super().__init__(llm if llm is not None else branches[0].llm)
+        self.branches = branches
+    
+    def process(self, state: MessagesState) -> Command[Literal["validator", "decider"]]:
+        """
+        Run every branch in its own thread and merge the answers.
+        
+        Args:
+            state: The current workflow state
+        
+        Returns:
+            A Command object routing to the validator or decider with the merged answer
+        """
+        tokens_before = self._tokens_used()
+        
+        # Each thread gets a copy of the context so callbacks and the run context follow
+        with ThreadPoolExecutor(max_workers=len(self.branches), thread_name_prefix="speculate") as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, self._run_branch, agent, state)
+                for agent in self.branches
+            ]
+            outcomes = [
+                (None, future.exception()) if future.exception() is not None else (future.result(), None)
+                for future in futures
+            ]
+        
+        return self._route(outcomes, tokens_before)
+    
+    async def aprocess(self, state: MessagesState) -> Command[Literal["validator", "decider"]]:
+        """
+        Asynchronously run every branch concurrently and merge the answers.
+        
+        Args:
+            state: The current workflow state
+        
+        Returns:
+            A Command object routing to the validator or decider with the merged answer
+        """
+        tokens_before = self._tokens_used()
+        
+        # Tasks copy the current context, so callbacks and the run context follow
+        results = await asyncio.gather(
+            *(self._arun_branch(agent, state) for agent in self.branches),
+            return_exceptions=True
+        )
+        outcomes = [
+            (None, result) if isinstance(result, BaseException) else (result, None)
+            for result in results
+        ]
+        
+        return self._route(outcomes, tokens_before)
+    
+    @staticmethod
+    def _answer(command: Command) -> str:
+        """Extract the answer text from a branch agent's command."""
+        return command.update["messages"][-1].content
+    
+    def _run_branch(self, agent: BaseAgent, state: MessagesState) -> str:
+        """Run one branch, traced as that agent's step."""
+        run = RunContext.current()
+        if run is None:
+            return self._answer(agent.process(state))
+        with run.trace.span("agent", agent.name, speculative=True):
+            return self._answer(agent.process(state))
+    
+    async def _arun_branch(self, agent: BaseAgent, state: MessagesState) -> str:
+        """Asynchronously run one branch, traced as that agent's step."""
+        run = RunContext.current()
+        if run is None:
+            return self._answer(await agent.aprocess(state))
+        with run.trace.span("agent", agent.name, speculative=True):
+            return self._answer(await agent.aprocess(state))
+    
+    @staticmethod
+    def _tokens_used() -> int:
+        """Tokens the current run has used so far."""
+        run = RunContext.current()
+        return run.budget.tokens if run is not None else 0
+    
+    def _route(self, outcomes: List[Tuple[Optional[str], Optional[BaseException]]],
+               tokens_before: int) -> Command[Literal["validator", "decider"]]:
+        """
+        Merge the branch answers in branch order and hand them to the validator or decider.
+        
+        Args:
+            outcomes: (answer, error) per branch, in branch order
+            tokens_before: Run tokens used before the fan-out
+        
+        Returns:
+            A Command object routing to the validator or decider
+        """
+        # Account the fan-out against the run's speculative cap
+        run = RunContext.current()
+        if run is not None:
+            run.record("speculative_fanouts")
+            run.record("speculative_tokens", run.budget.tokens - tokens_before)
+        
+        # A branch that hit the budget stops the run; other failures only drop that branch
+        for _, error in outcomes:
+            if isinstance(error, BudgetExceeded):
+                raise error
+        
+        sections = []
+        for agent, (answer, error) in zip(self.branches, outcomes):
+            if error is not None:
+                logger.warning(f"Speculative branch '{agent.name}' failed: {error}")
+            elif answer:
+                sections.append(f"[{agent.name}]\n{answer}")
+        
+        errors = [error for _, error in outcomes if error is not None]
+        if not sections and errors:
+            raise errors[0]
+        
+        # Log the transition
+        self.log_transition(self.handoff)
+        
+        # Return command with the merged answer and next destination
+        return Command(
+            update={
+                "messages": [
+                    HumanMessage(content="\n\n".join(sections), name=self.name)
+                ]
+            },
+            goto=self.handoff
+        )
@@ -1,20 +1,52 @@
-from typing import Literal
+import time
+from typing import Literal, Optional
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import HumanMessage
 from langgraph.graph import MessagesState
 from langgraph.types import Command
 
 from agents.base import BaseAgent
 from core.models import Supervisor
-from config.settings import SUPERVISOR_PROMPT
+from core.router import FastPathRouter
+from core.run_context import RunContext
+from config.settings import (
+    SUPERVISOR_PROMPT,
+    FAST_ROUTER_ENABLED,
+    FAST_ROUTER_THRESHOLD,
+    SPECULATIVE_MIN_SCORE,
+    SPECULATIVE_MAX_FANOUTS,
+    SPECULATIVE_MAX_TOKENS
+)
 from utils.logger import logger
 
 class SupervisorAgent(BaseAgent):
     """
     Supervisor agent that routes tasks to the appropriate specialized agent.
     Acts as a coordinator in the workflow.
+    
+    A local fast-path router is consulted before the LLM on the first hop of
+    a run, so obvious arithmetic or lookup queries skip the routing call.
+    With speculation enabled, a first hop that scores high for both research
+    and computation fans out to the speculator instead.
     """
     
-    def process(self, state: MessagesState) -> Command[Literal["enhancer", "researcher", "coder"]]:
+    def __init__(self, llm: Optional[BaseChatModel] = None, router: Optional[FastPathRouter] = None,
+                 speculative: bool = False):
+        """
+        Initialize the agent.
+        
+        Args:
+            llm: Optional shared chat model; the agent's model from AGENT_MODELS is used if omitted
+            router: Optional fast-path router; one is created from settings if omitted
+            speculative: Whether the graph has a speculator node to fan out to
+        """
+        super().__init__(llm)
+        if router is None and (FAST_ROUTER_ENABLED or speculative):
+            router = FastPathRouter(threshold=FAST_ROUTER_THRESHOLD if FAST_ROUTER_ENABLED else float("inf"))
+        self.router = router
+        self.speculative = speculative
+    
+    def process(self, state: MessagesState) -> Command[Literal["enhancer", "researcher", "coder", "speculator"]]:
         """
         Process the current state and determine which agent should handle the task next.
         
@@ -24,12 +56,152 @@ class SupervisorAgent(BaseAgent):
         Returns:
             A Command object routing to the next appropriate agent
         """
+        # Route locally when the intent is obvious, or fan out when it is mixed
+        response = self._fast_route(state)
+        if response is not None:
+            return self._route(response)
+        if self._should_speculate(state):
+            return self._fan_out()
+        
         # Prepare messages with the supervisor prompt
         messages = self.prepare_messages(SUPERVISOR_PROMPT, state)
         
         # Get structured output from the LLM
+        start = time.perf_counter()
         response = self.llm.with_structured_output(Supervisor).invoke(messages)
+        self._record_latency(time.perf_counter() - start)
+        
+        return self._route(response)
+    
+    async def aprocess(self, state: MessagesState) -> Command[Literal["enhancer", "researcher", "coder", "speculator"]]:
+        """
+        Asynchronously determine which agent should handle the task next.
         
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A Command object routing to the next appropriate agent
+        """
+        # Route locally when the intent is obvious, or fan out when it is mixed
+        response = self._fast_route(state)
+        if response is not None:
+            return self._route(response)
+        if self._should_speculate(state):
+            return self._fan_out()
+        
+        # Prepare messages with the supervisor prompt
+        messages = self.prepare_messages(SUPERVISOR_PROMPT, state)
+        
+        # Get structured output from the LLM without blocking the event loop
+        start = time.perf_counter()
+        response = await self.llm.with_structured_output(Supervisor).ainvoke(messages)
+        self._record_latency(time.perf_counter() - start)
+        
+        return self._route(response)
+    
+    def _fast_route(self, state: MessagesState) -> Optional[Supervisor]:
+        """
+        Try to route without the LLM.
+        Only the first hop is eligible: once agents have replied, the decision
+        depends on their outputs, which the rules cannot judge.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A routing decision, or None to fall back to the LLM
+        """
+        question = self._pending_question(state)
+        if self.router is None or question is None:
+            return None
+        
+        decision = self.router.route(question)
+        if decision is None:
+            return None
+        
+        label, confidence = decision
+        return Supervisor(next=label, reason=f"Fast-path router matched '{label}' with confidence {confidence:.2f}.")
+    
+    @staticmethod
+    def _pending_question(state: MessagesState) -> Optional[str]:
+        """
+        Get the user's question if no agent has replied to it yet.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            The question on the first hop of a run, otherwise None
+        """
+        last_message = state["messages"][-1]
+        if last_message.type != "human" or getattr(last_message, "name", None):
+            return None
+        return last_message.content
+    
+    def _should_speculate(self, state: MessagesState) -> bool:
+        """
+        Decide whether to run researcher and coder in parallel.
+        Only a first hop that scores high for both is eligible, and only while
+        the run is under its speculative fan-out and token caps.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            Whether to route to the speculator
+        """
+        question = self._pending_question(state)
+        if not self.speculative or self.router is None or question is None:
+            return False
+        
+        scores = self.router.scores(question)
+        if min(scores["researcher"], scores["coder"]) < SPECULATIVE_MIN_SCORE:
+            return False
+        
+        run = RunContext.current()
+        if run is not None and (run.metrics["speculative_fanouts"] >= SPECULATIVE_MAX_FANOUTS
+                                or run.metrics["speculative_tokens"] >= SPECULATIVE_MAX_TOKENS):
+            return False
+        return True
+    
+    def _fan_out(self) -> Command[Literal["speculator"]]:
+        """
+        Build the command that sends the question to the speculator.
+        
+        Returns:
+            A Command object routing to the speculator
+        """
+        # Log the transition
+        self.log_transition("speculator")
+        
+        return Command(
+            update={
+                "messages": [
+                    HumanMessage(
+                        content="The query needs both research and computation; running researcher and coder in parallel.",
+                        name="supervisor"
+                    )
+                ]
+            },
+            goto="speculator"
+        )
+    
+    def _record_latency(self, seconds: float):
+        """Feed the LLM routing latency to the router's savings estimate."""
+        if self.router is not None:
+            self.router.record_llm_latency(seconds)
+    
+    def _route(self, response: Supervisor) -> Command[Literal["enhancer", "researcher", "coder"]]:
+        """
+        Turn the supervisor decision into a routing command.
+        
+        Args:
+            response: The structured routing decision
+            
+        Returns:
+            A Command object routing to the chosen agent
+        """
         # Extract routing decision and reason
         goto = response.next
         reason = response.reason
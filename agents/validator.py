@@ -25,37 +25,74 @@ class ValidatorAgent(BaseAgent):
         Returns:
             A Command object routing to either the supervisor or end
         """
+        # Get structured output from the LLM
+        response = self.llm.with_structured_output(Validator).invoke(self._build_messages(state))
+        
+        return self._route(response)
+    
+    async def aprocess(self, state: MessagesState) -> Command[Literal["supervisor", "__end__"]]:
+        """
+        Asynchronously validate the quality of the response.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A Command object routing to either the supervisor or end
+        """
+        # Get structured output from the LLM without blocking the event loop
+        response = await self.llm.with_structured_output(Validator).ainvoke(self._build_messages(state))
+        
+        return self._route(response)
+    
+    def _build_messages(self, state: MessagesState) -> list:
+        """
+        Prepare the validation prompt from the user question and the latest answer.
+        
+        Args:
+            state: The current workflow state
+            
+        Returns:
+            A list of messages ready for the LLM
+        """
         # Extract user question and agent answer
         user_question = WorkflowState.get_user_question(state)
         agent_answer = WorkflowState.get_last_response(state)
         
         # Prepare messages for validation
-        messages = [
+        return [
             {"role": "system", "content": VALIDATOR_PROMPT},
             {"role": "user", "content": user_question},
             {"role": "assistant", "content": agent_answer},
         ]
+    
+    def _route(self, response: Validator) -> Command[Literal["supervisor", "__end__"]]:
+        """
+        Turn the validator decision into a routing command.
         
-        # Get structured output from the LLM
-        response = self.llm.with_structured_output(Validator).invoke(messages)
-        
+        Args:
+            response: The structured validation decision
+            
+        Returns:
+            A Command object routing to either the supervisor or end
+        """
         # Extract routing decision and reason
         goto = response.next
         reason = response.reason
         
+        update = {
+            "messages": [
+                HumanMessage(content=reason, name="validator")
+            ]
+        }
+        
         # Determine the next node
         if goto == "FINISH" or goto == END:
             goto = END
+            update["termination_reason"] = "validated"
             logger.info("Transitioning to END")
         else:
             self.log_transition("supervisor")
         
         # Return command with updated state and next destination
-        return Command(
-            update={
-                "messages": [
-                    HumanMessage(content=reason, name="validator")
-                ]
-            },
-            goto=goto
-        )
\ No newline at end of file
+        return Command(update=update, goto=goto)
\ No newline at end of file
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+A/B benchmark of the fused decider against the validator/supervisor loop.
+Runs the same query mix through both workflows on the deterministic fake
+backend (a ScriptedChatModel and fake tools with seeded latency and seeded
+rejections), and reports hops, LLM calls and latency per query, plus how
+many coder answers the decider accepted without an LLM call. No network
+calls are made.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fakes import ScriptedChatModel
+from core.workflow import WorkflowManager
+from tools.fakes import FakePythonTool, FakeSearchTool
+from tools.tool_factory import ToolFactory
+from utils.faults import LatencyDistribution
+
+# Mix of lookup and calculation questions, cycled to fill the run
+QUERIES = [
+    "What is the population of Canada?",
+    "Calculate the compound interest on 1000 at 5% for 10 years.",
+    "Who won the 2022 football world cup?",
+    "What is 17 factorial divided by 3?",
+    "Summarize the latest news about renewable energy.",
+    "Compare the GDP growth of India and Brazil in 2023.",
+    "Compute the standard deviation of 3, 7, 7, 19.",
+    "What is the capital of Australia?",
+]
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Fused decider vs validator/supervisor A/B benchmark')
+    parser.add_argument('--queries', '-n', type=int, default=64, help='Queries per variant')
+    parser.add_argument('--concurrency', '-c', type=int, default=8, help='Queries in flight at once')
+    parser.add_argument('--llm-latency', type=str, default='lognormal:0.3,0.4',
+                        help='LLM latency as KIND:A,B (fixed, uniform, normal, lognormal, exponential) or seconds')
+    parser.add_argument('--tool-latency', type=str, default='lognormal:0.3,0.3', help='Tool latency, as --llm-latency')
+    parser.add_argument('--reject-rate', type=float, default=0.3, help='Probability an answer is sent back for more work')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for latencies and rejections, shared by both variants')
+    parser.add_argument('--json', type=str, metavar='FILE', help='Write the results as JSON')
+    return parser.parse_args()
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile.
+    
+    Args:
+        values: The samples
+        q: The percentile in [0, 100]
+        
+    Returns:
+        The sample at that rank, or 0.0 without samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+def build_workflow(args, fused: bool) -> WorkflowManager:
+    """
+    Build a workflow on the fake backend, seeded identically for both variants.
+    
+    Args:
+        args: Parsed command line arguments
+        fused: Whether to use the decider node
+        
+    Returns:
+        The compiled workflow
+    """
+    ToolFactory.override('tavily_search', lambda: FakeSearchTool(latency=LatencyDistribution.parse(args.tool_latency, args.seed)))
+    ToolFactory.override('python_executor', lambda: FakePythonTool(latency=LatencyDistribution.parse(args.tool_latency, args.seed + 1)))
+    llm = ScriptedChatModel(
+        latency=LatencyDistribution.parse(args.llm_latency, args.seed),
+        reject_rate=args.reject_rate,
+        seed=args.seed
+    )
+    # The response and answer caches would answer repeated prompts and queries
+    workflow = WorkflowManager(llm=llm.model_copy(update={"cache": False}), fused=fused)
+    return workflow.set_answer_cache(None).build_graph()
+
+async def run_variant(workflow: WorkflowManager, queries: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    """Answer the queries with at most concurrency runs in flight, recording each run's summary."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    
+    async def one(query: str):
+        async with semaphore:
+            started = time.perf_counter()
+            result = await workflow.arun(query, with_summary=True)
+            summary = result['run_summary']
+            samples.append({
+                'latency': time.perf_counter() - started,
+                'hops': summary['hops'],
+                'llm_calls': summary['llm']['calls'],
+                'tokens': summary['tokens'],
+                'verified_accepts': summary.get('verified_accepts', 0),
+            })
+    
+    await asyncio.gather(*(one(query) for query in queries))
+    return samples
+
+def summarize(samples: List[Dict[str, Any]]) -> Dict[str, float]:
+    """Aggregate per-query samples into means and latency percentiles."""
+    latencies = [sample['latency'] * 1000 for sample in samples]
+    return {
+        'mean_hops': statistics.mean(sample['hops'] for sample in samples),
+        'mean_llm_calls': statistics.mean(sample['llm_calls'] for sample in samples),
+        'mean_tokens': statistics.mean(sample['tokens'] for sample in samples),
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'verified_accepts': int(sum(sample['verified_accepts'] for sample in samples)),
+    }
+
+def main():
+    """Run both variants and print their per-query costs side by side."""
+    args = parse_arguments()
+    logging.getLogger("workflow").setLevel(logging.WARNING)
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+    
+    results = {}
+    for name, fused in (('validator', False), ('decider', True)):
+        samples = asyncio.run(run_variant(build_workflow(args, fused), queries, args.concurrency))
+        results[name] = summarize(samples)
+    
+    print(f"queries={args.queries} concurrency={args.concurrency} llm={args.llm_latency} "
+          f"tools={args.tool_latency} reject_rate={args.reject_rate}")
+    print(f"{'variant':<12}{'hops':>8}{'LLM calls':>11}{'tokens':>9}{'p50 ms':>9}{'p95 ms':>9}{'verified':>10}")
+    for name, result in results.items():
+        print(f"{name:<12}{result['mean_hops']:>8.2f}{result['mean_llm_calls']:>11.2f}{result['mean_tokens']:>9.0f}"
+              f"{result['p50_ms']:>9.0f}{result['p95_ms']:>9.0f}{result['verified_accepts']:>10}")
+    
+    baseline, fused = results['validator'], results['decider']
+    print(f"decider saves {baseline['mean_hops'] - fused['mean_hops']:.2f} hops and "
+          f"{baseline['mean_llm_calls'] - fused['mean_llm_calls']:.2f} LLM calls per query; "
+          f"p50 {fused['p50_ms'] - baseline['p50_ms']:+.0f} ms")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
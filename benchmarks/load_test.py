@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Load test for WorkflowManager against a deterministic fake backend.
+A ScriptedChatModel replaces the provider LLM and fake tools replace search
+and code execution, each with a seeded latency distribution, so results are
+reproducible and no network calls are made. Each concurrency level runs the
+same query mix and reports throughput, latency percentiles, hops per query
+and memory use.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fakes import ScriptedChatModel
+from core.workflow import WorkflowManager
+from tools.fakes import FakePythonTool, FakeSearchTool
+from tools.tool_factory import ToolFactory
+from utils.faults import LatencyDistribution
+
+# Mix of lookup and calculation questions, cycled to fill each level
+QUERIES = [
+    "What is the population of Canada?",
+    "Calculate the compound interest on 1000 at 5% for 10 years.",
+    "Who won the 2022 football world cup?",
+    "What is 17 factorial divided by 3?",
+    "Summarize the latest news about renewable energy.",
+    "Compare the GDP growth of India and Brazil in 2023.",
+    "Compute the standard deviation of 3, 7, 7, 19.",
+    "What is the capital of Australia?",
+]
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='WorkflowManager load test with a fake LLM and tools')
+    parser.add_argument('--concurrency', type=str, default='1,4,16,64', help='Comma-separated concurrency levels')
+    parser.add_argument('--queries', '-n', type=int, default=64, help='Queries per concurrency level')
+    parser.add_argument('--mode', choices=['async', 'threads'], default='async',
+                        help='Drive arun() on one event loop, or run() from a thread pool')
+    parser.add_argument('--llm-latency', type=str, default='lognormal:0.05,0.5',
+                        help='LLM latency as KIND:A,B (fixed, uniform, normal, lognormal, exponential) or seconds')
+    parser.add_argument('--tool-latency', type=str, default='lognormal:0.1,0.3', help='Tool latency, as --llm-latency')
+    parser.add_argument('--routes', type=str, default='researcher,coder', help='Nodes the scripted supervisor picks from')
+    parser.add_argument('--reject-rate', type=float, default=0.1, help='Probability the validator rejects an answer')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for latencies and validator decisions')
+    parser.add_argument('--trace-memory', action='store_true', help='Report peak Python allocations (slower)')
+    parser.add_argument('--json', type=str, metavar='FILE', help='Write the results as JSON')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Keep the workflow\'s per-run logging')
+    return parser.parse_args()
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile.
+    
+    Args:
+        values: The samples
+        q: The percentile in [0, 100]
+        
+    Returns:
+        The sample at that rank, or 0.0 without samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+def rss_mb() -> float:
+    """Current resident set size in MB, or the peak where the current value is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def build_workflow(args) -> WorkflowManager:
+    """
+    Build a workflow whose LLM and tools are all local fakes.
+    
+    Args:
+        args: Parsed command line arguments
+        
+    Returns:
+        The compiled workflow
+    """
+    tool_latency = args.tool_latency
+    ToolFactory.override('tavily_search', lambda: FakeSearchTool(latency=LatencyDistribution.parse(tool_latency, args.seed)))
+    ToolFactory.override('python_executor', lambda: FakePythonTool(latency=LatencyDistribution.parse(tool_latency, args.seed + 1)))
+    llm = ScriptedChatModel(
+        latency=LatencyDistribution.parse(args.llm_latency, args.seed),
+        routes=args.routes.split(','),
+        reject_rate=args.reject_rate,
+        seed=args.seed
+    )
+    # Every slot the load test asks for must be available to the workflow, and
+    # repeated queries must run the graph rather than hit the answer cache
+    workflow = WorkflowManager(llm=llm, max_concurrency=max(int(level) for level in args.concurrency.split(',')))
+    return workflow.set_answer_cache(None).build_graph()
+
+def record(result: Dict[str, Any], started: float, samples: List[Dict[str, Any]]):
+    """Store one finished query's latency and resource usage."""
+    summary = result['run_summary']
+    samples.append({
+        'latency': time.perf_counter() - started,
+        'hops': summary['hops'],
+        'tokens': summary['tokens'],
+        'termination_reason': result.get('termination_reason'),
+    })
+
+async def run_async(workflow: WorkflowManager, queries: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    """Answer the queries with at most concurrency runs in flight on one event loop."""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+    
+    async def one(query: str):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                record(await workflow.arun(query, with_summary=True), started, samples)
+            except Exception as e:
+                samples.append({'latency': time.perf_counter() - started, 'error': str(e)})
+    
+    await asyncio.gather(*(one(query) for query in queries))
+    return samples
+
+def run_threads(workflow: WorkflowManager, queries: List[str], concurrency: int) -> List[Dict[str, Any]]:
+    """Answer the queries from a pool of concurrency threads."""
+    samples = []
+    
+    def one(query: str):
+        started = time.perf_counter()
+        try:
+            record(workflow.run(query, with_summary=True), started, samples)
+        except Exception as e:
+            samples.append({'latency': time.perf_counter() - started, 'error': str(e)})
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, queries))
+    return samples
+
+def run_level(workflow: WorkflowManager, args, concurrency: int) -> Dict[str, Any]:
+    """
+    Run one concurrency level and summarize it.
+    
+    Args:
+        workflow: The workflow under test
+        args: Parsed command line arguments
+        concurrency: Queries in flight at once
+        
+    Returns:
+        Throughput, latency percentiles, hops, errors and memory for the level
+    """
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+    gc.collect()
+    rss_before = rss_mb()
+    if args.trace_memory:
+        tracemalloc.start()
+    
+    started = time.perf_counter()
+    if args.mode == 'async':
+        samples = asyncio.run(run_async(workflow, queries, concurrency))
+    else:
+        samples = run_threads(workflow, queries, concurrency)
+    elapsed = time.perf_counter() - started
+    
+    peak_mb = None
+    if args.trace_memory:
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    
+    ok = [sample for sample in samples if 'error' not in sample]
+    latencies = [sample['latency'] * 1000 for sample in ok]
+    return {
+        'concurrency': concurrency,
+        'queries': len(samples),
+        'errors': len(samples) - len(ok),
+        'throughput_qps': len(ok) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'mean_hops': statistics.mean(sample['hops'] for sample in ok) if ok else 0.0,
+        'mean_tokens': statistics.mean(sample['tokens'] for sample in ok) if ok else 0.0,
+        'rss_mb': rss_mb(),
+        'rss_delta_mb': rss_mb() - rss_before,
+        'peak_alloc_mb': peak_mb,
+    }
+
+def main():
+    """Run the load test and print one row per concurrency level."""
+    args = parse_arguments()
+    workflow = build_workflow(args)
+    if not args.verbose:
+        logging.getLogger("workflow").setLevel(logging.WARNING)
+    
+    print(f"mode={args.mode} llm={args.llm_latency} tools={args.tool_latency} "
+          f"reject_rate={args.reject_rate} queries/level={args.queries}")
+    print(f"{'conc':>5}{'q/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'hops':>7}{'errors':>8}{'rss MB':>9}{'peak MB':>9}")
+    results = []
+    for level in (int(value) for value in args.concurrency.split(',')):
+        result = run_level(workflow, args, level)
+        results.append(result)
+        peak = f"{result['peak_alloc_mb']:.1f}" if result['peak_alloc_mb'] is not None else '-'
+        print(f"{level:>5}{result['throughput_qps']:>9.2f}{result['p50_ms']:>10.0f}{result['p95_ms']:>10.0f}"
+              f"{result['p99_ms']:>10.0f}{result['mean_hops']:>7.2f}{result['errors']:>8}{result['rss_mb']:>9.1f}{peak:>9}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
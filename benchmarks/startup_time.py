@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark.
+Runs each entry point in a fresh interpreter under `python -X importtime`,
+reporting wall-clock time, total import time and the heaviest top-level
+imports. Results can be saved as JSON and compared against a saved baseline
+to catch import-time regressions. No network calls are made.
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry points to time, as interpreter arguments run from the repository root
+TARGETS = {
+    'run --help': ['run.py', '--help'],
+    'run --check-config': ['run.py', '--check-config'],
+    'import config.settings': ['-c', 'import config.settings'],
+    'import core.workflow': ['-c', 'import core.workflow'],
+}
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='CLI startup-time benchmark')
+    parser.add_argument('--repeat', '-n', type=int, default=5, help='Runs per target; the median is reported')
+    parser.add_argument('--top', type=int, default=5, help='Heaviest top-level imports to list per target')
+    parser.add_argument('--target', action='append', choices=list(TARGETS), help='Only time these targets')
+    parser.add_argument('--save', type=str, metavar='FILE', help='Write the results as JSON')
+    parser.add_argument('--baseline', type=str, metavar='FILE', help='Compare against results saved with --save')
+    return parser.parse_args()
+
+def parse_importtime(stderr: str) -> Tuple[int, List[Tuple[str, int]]]:
+    """
+    Parse `-X importtime` output.
+    
+    Args:
+        stderr: The interpreter's standard error
+        
+    Returns:
+        Total import microseconds, and (module, cumulative microseconds) for
+        every top-level import, heaviest first
+    """
+    top_level = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        # Top-level imports are the ones not indented under another import
+        if match and len(match.group(3)) == 1:
+            top_level.append((match.group(4), int(match.group(2))))
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    return sum(us for _, us in top_level), top_level
+
+def time_target(args: List[str]) -> Dict:
+    """
+    Run a target once in a fresh interpreter.
+    
+    Args:
+        args: Interpreter arguments
+        
+    Returns:
+        Wall-clock milliseconds, import milliseconds and the heaviest imports
+    """
+    # Dummy keys keep clients from failing on construction; nothing is sent
+    env = dict(os.environ)
+    for key in ('groq_api_key', 'riza_api_key', 'tavily_api_key'):
+        env.setdefault(key, 'benchmark')
+    
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    import_us, heaviest = parse_importtime(completed.stderr)
+    return {'wall_ms': wall_ms, 'import_ms': import_us / 1000, 'heaviest': heaviest}
+
+def main():
+    """Run the benchmark and print per-target startup costs."""
+    args = parse_arguments()
+    targets = {name: TARGETS[name] for name in (args.target or TARGETS)}
+    
+    results = {}
+    for name, target in targets.items():
+        # Warm the OS file cache so the first run does not skew the median
+        time_target(target)
+        runs = [time_target(target) for _ in range(args.repeat)]
+        results[name] = {
+            'wall_ms': round(statistics.median(run['wall_ms'] for run in runs), 1),
+            'import_ms': round(statistics.median(run['import_ms'] for run in runs), 1),
+            'heaviest': [(module, round(us / 1000, 1)) for module, us in runs[-1]['heaviest'][:args.top]],
+        }
+    
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    
+    print(f"{'target':<26}{'wall (ms)':>12}{'imports (ms)':>14}{'vs baseline':>14}")
+    for name, result in results.items():
+        delta = ''
+        if name in baseline:
+            delta = f"{result['wall_ms'] - baseline[name]['wall_ms']:+.1f}"
+        print(f"{name:<26}{result['wall_ms']:>12.1f}{result['import_ms']:>14.1f}{delta:>14}")
+        for module, ms in result['heaviest']:
+            print(f"    {module:<40}{ms:>10.1f}")
+    
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.save}")
+
+if __name__ == "__main__":
+    main()
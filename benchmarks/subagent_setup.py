@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for ReAct sub-agent setup cost.
+Compares building tools and compiling the sub-agent graph on every call
+(the old ResearcherAgent/CoderAgent behaviour) with reusing pooled tools
+and a sub-agent compiled once per agent instance. No network calls are made.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tools and clients validate their keys on construction; dummy keys are enough offline
+for key in ('groq_api_key', 'riza_api_key', 'tavily_api_key'):
+    os.environ.setdefault(key, 'benchmark')
+
+from langgraph.prebuilt import create_react_agent
+from core.llm import LLMFactory
+from tools.tool_factory import ToolFactory
+from config.settings import RESEARCHER_PROMPT, CODER_PROMPT
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='ReAct sub-agent setup micro-benchmark')
+    parser.add_argument('--iterations', '-n', type=int, default=200, help='Calls to time per variant')
+    return parser.parse_args()
+
+def time_per_call(fn, iterations: int) -> float:
+    """
+    Time a callable and return the mean cost of one call in milliseconds.
+    
+    Args:
+        fn: The callable to time
+        iterations: Number of calls
+        
+    Returns:
+        Mean milliseconds per call
+    """
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+def main():
+    """Run the benchmark and print per-call setup overhead."""
+    args = parse_arguments()
+    llm = LLMFactory.create_chat_model()
+    
+    variants = {
+        'researcher': (ToolFactory.create_research_tools, RESEARCHER_PROMPT),
+        'coder': (ToolFactory.create_coding_tools, CODER_PROMPT),
+    }
+    
+    print(f"{'agent':<12}{'per-call (ms)':>16}{'cached (ms)':>14}{'saved (ms)':>14}")
+    for name, (create_tools, prompt) in variants.items():
+        # Old behaviour: new tools and a freshly compiled graph on every call
+        uncached = time_per_call(
+            lambda: create_react_agent(llm, tools=create_tools(), state_modifier=prompt),
+            args.iterations
+        )
+        
+        # New behaviour: compiled once, each call only looks up the pooled tools
+        compiled = create_react_agent(llm, tools=create_tools(shared=True), state_modifier=prompt)
+        cached = time_per_call(lambda: (create_tools(shared=True), compiled), args.iterations)
+        
+        print(f"{name:<12}{uncached:>16.3f}{cached:>14.4f}{uncached - cached:>14.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,295 @@
 import os
-import dotenv
+import threading
+from dataclasses import dataclass, fields
+from typing import List, Optional
 
-# Load environment variables from .env file
-dotenv.load_dotenv()
+@dataclass(frozen=True)
+class Settings:
+    """
+    Settings read from the environment and the .env file. They are loaded on
+    first use (get_settings()), not at import, so code that only needs the
+    constants below starts fast and a missing key is reported where it is needed.
+    """
+    groq_api_key: Optional[str] = None
+    openai_api_key: Optional[str] = None
+    riza_api_key: Optional[str] = None
+    tavily_api_key: Optional[str] = None
+    
+    @classmethod
+    def from_env(cls) -> 'Settings':
+        """
+        Read the settings from the environment, after loading the .env file.
+        
+        Returns:
+            The settings; keys that are not set are None
+        """
+        try:
+            import dotenv
+            dotenv.load_dotenv()
+        except ImportError:
+            pass
+        return cls(**{field.name: os.getenv(field.name) or None for field in fields(cls)})
+    
+    def export_tool_keys(self):
+        """Expose the tool API keys under the names the Riza and Tavily clients read."""
+        for name, value in (("RIZA_API_KEY", self.riza_api_key), ("TAVILY_API_KEY", self.tavily_api_key)):
+            if value:
+                os.environ[name] = value
+    
+    def validate(self, python_executor: Optional[str] = None) -> List[str]:
+        """
+        Check the settings and the configuration constants for problems that
+        would otherwise only surface mid-run.
+        
+        Args:
+            python_executor: The executor the coder will use; defaults to PYTHON_EXECUTOR
+            
+        Returns:
+            A description of each problem found; empty if the configuration is usable
+        """
+        problems = []
+        for provider in sorted(_model_providers()):
+            config = LLM_PROVIDERS.get(provider)
+            if config is None:
+                problems.append(f"LLM provider {provider!r} is used in AGENT_MODELS but not defined in LLM_PROVIDERS")
+            elif config.get("type", provider) not in ("groq", "openai"):
+                problems.append(f"LLM provider {provider!r} has unknown type {config.get('type')!r}")
+            elif config.get("api_key") and not getattr(self, config["api_key"], None):
+                problems.append(f"{config['api_key']} is not set; the {provider!r} models in AGENT_MODELS need it")
+        if not self.tavily_api_key:
+            problems.append("tavily_api_key is not set; the researcher needs it")
+        python_executor = python_executor or PYTHON_EXECUTOR
+        if python_executor not in ("riza", "local"):
+            problems.append(f"PYTHON_EXECUTOR must be 'riza' or 'local', not {python_executor!r}")
+        elif python_executor == "riza" and not self.riza_api_key:
+            problems.append("riza_api_key is not set; the coder needs it unless the executor is 'local'")
+        for name, value, allowed in (
+            ("LLM_CACHE_BACKEND", LLM_CACHE_BACKEND, ("memory", "sqlite", None)),
+            ("SEARCH_CACHE_BACKEND", SEARCH_CACHE_BACKEND, ("memory", "sqlite", None)),
+            ("CHECKPOINT_BACKEND", CHECKPOINT_BACKEND, ("memory", "sqlite", None)),
+            ("ANSWER_CACHE_BACKEND", ANSWER_CACHE_BACKEND, ("memory", "sqlite", None)),
+        ):
+            if value not in allowed:
+                problems.append(f"{name} must be one of {allowed}, not {value!r}")
+        for key in RATE_LIMITS:
+            unknown = set(RATE_LIMITS[key]) - {"requests_per_minute", "tokens_per_minute", "burst_seconds"}
+            if unknown:
+                problems.append(f"RATE_LIMITS[{key!r}] has unknown limits {sorted(unknown)}")
+        if RESEARCH_INDEX_ENABLED and RESEARCH_INDEX_EMBEDDER.partition(":")[0] not in ("hashing", "sentence-transformers"):
+            problems.append(f"RESEARCH_INDEX_EMBEDDER must be 'hashing[:dims]' or 'sentence-transformers:<model>', not {RESEARCH_INDEX_EMBEDDER!r}")
+        if RESEARCH_SEARCH_CONCURRENCY < 1:
+            problems.append(f"RESEARCH_SEARCH_CONCURRENCY must be at least 1, not {RESEARCH_SEARCH_CONCURRENCY}")
+        if RESEARCH_SEARCH_POOL_SIZE < RESEARCH_SEARCH_CONCURRENCY:
+            problems.append(f"RESEARCH_SEARCH_POOL_SIZE must be at least RESEARCH_SEARCH_CONCURRENCY ({RESEARCH_SEARCH_CONCURRENCY}), not {RESEARCH_SEARCH_POOL_SIZE}")
+        return problems
 
-# API Keys
-GROQ_API_KEY = os.getenv('groq_api_key')
-RIZA_API_KEY = os.getenv('riza_api_key')
-TAVILY_API_KEY = os.getenv('tavily_api_key')
+def _model_providers() -> set:
+    """Get the provider of every model named in AGENT_MODELS, as LLMFactory.parse_model_spec reads them."""
+    providers = set()
+    for config in AGENT_MODELS.values():
+        for spec in [config.get("model"), config.get("under_load"), *config.get("fallbacks", ())]:
+            if spec:
+                prefix, _, model = spec.partition(":")
+                providers.add(prefix if model and prefix in LLM_PROVIDERS else LLM_PROVIDER)
+    return providers
 
-# Set environment variables for tools
-os.environ["RIZA_API_KEY"] = RIZA_API_KEY
-os.environ["TAVILY_API_KEY"] = TAVILY_API_KEY
+_settings: Optional[Settings] = None
+_settings_lock = threading.Lock()
+
+def get_settings() -> Settings:
+    """
+    Get the process-wide settings, loading them on first use.
+    
+    Returns:
+        The loaded settings
+    """
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings.from_env()
+    return _settings
+
+# Legacy names of the environment-backed settings, resolved lazily on access
+_ENV_SETTINGS = {"GROQ_API_KEY": "groq_api_key", "RIZA_API_KEY": "riza_api_key", "TAVILY_API_KEY": "tavily_api_key"}
+
+def __getattr__(name: str):
+    if name in _ENV_SETTINGS:
+        return getattr(get_settings(), _ENV_SETTINGS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # LLM Configuration
+LLM_PROVIDER = "groq"  # provider of model names given without a "provider:" prefix
 LLM_MODEL = "llama-3.3-70b-versatile"
 
+# LLM providers by name. "groq" clients use ChatGroq; "openai" clients use
+# ChatOpenAI against any OpenAI-compatible endpoint (OpenAI, vLLM, Ollama or a
+# local stand-in). api_key names the Settings field holding the key, if any.
+LLM_PROVIDERS = {
+    "groq": {"type": "groq", "api_key": "groq_api_key"},
+    "openai": {"type": "openai", "api_key": "openai_api_key", "base_url": None},
+    "local": {"type": "openai", "api_key": None, "base_url": "http://127.0.0.1:8000/v1"},
+}
+
+# Models per agent as "provider:model", merged over "default". The supervisor
+# and validator only emit a routing label and a reason, so they run on a small
+# fast model. Fallbacks are tried in order when a model still fails after its
+# retries or its provider's circuit is open; under_load is tried first while
+# the model is overloaded (see MODEL_DOWNTIER_*).
+AGENT_MODELS = {
+    "default": {"model": "groq:llama-3.3-70b-versatile", "fallbacks": ["groq:llama-3.1-8b-instant"], "under_load": None},
+    "supervisor": {"model": "groq:llama-3.1-8b-instant", "fallbacks": ["groq:llama-3.3-70b-versatile"]},
+    "validator": {"model": "groq:llama-3.1-8b-instant", "fallbacks": ["groq:llama-3.3-70b-versatile"]},
+    "enhancer": {"under_load": "groq:llama-3.1-8b-instant"},
+}
+MODEL_DOWNTIER_QUEUE_DEPTH = 4  # requests waiting in a model's scheduler that count as overload (None disables)
+MODEL_DOWNTIER_LATENCY_SECONDS = 8.0  # recent average request latency that counts as overload (None disables)
+MODEL_DOWNTIER_COOLDOWN_SECONDS = 30.0  # a slow model is tried again once its latency is this old
+
+# USD per million tokens, used for per-run cost estimates
+MODEL_PRICING = {
+    "llama-3.3-70b-versatile": {"input": 0.59, "output": 0.79},
+    "llama-3.1-8b-instant": {"input": 0.05, "output": 0.08},
+}
+
+# Resilience: per-attempt deadline, retries with jittered exponential backoff
+# and hedged duplicate requests, per provider (merged over "default")
+RESILIENCE_POLICIES = {
+    "default": {"max_attempts": 3, "timeout": 60.0, "base_delay": 0.5, "max_delay": 8.0, "hedge_after": None},
+    "groq": {"timeout": 45.0},
+    "tavily": {"timeout": 15.0, "hedge_after": 3.0},
+    "riza": {"timeout": 30.0},
+}
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures that open a provider's circuit
+CIRCUIT_BREAKER_RESET_SECONDS = 30.0  # seconds before a trial call is let through
+
+# Client-side rate limits per provider or "provider:model", shared by every
+# workflow in the process, e.g. {"groq:llama-3.3-70b-versatile":
+# {"requests_per_minute": 30, "tokens_per_minute": 6000}}; omitted means unlimited
+RATE_LIMITS = {}
+SCHEDULER_COMPLETION_TOKENS = 512  # completion tokens assumed when admitting an LLM request
+
+# LLM Response Cache Configuration
+LLM_CACHE_BACKEND = "memory"  # "memory", "sqlite", or None to disable
+LLM_CACHE_PATH = ".cache/llm_cache.sqlite"
+LLM_CACHE_TTL_SECONDS = 3600
+LLM_CACHE_MAX_ENTRIES = 10000
+LLM_CACHE_SEMANTIC_THRESHOLD = None  # e.g. 0.95 to reuse answers for reworded prompts
+
+# Workflow Configuration
+MAX_CONCURRENT_WORKFLOWS = 100  # async runs allowed in flight per event loop
+BATCH_WORKERS = 8
+STREAM_TOKEN_NODES = ("enhancer", "researcher", "coder")  # nodes whose tokens are streamed in "tokens" mode
+
+# Fused Decider: one structured call judges each answer and picks the next
+# worker, replacing the validator-then-supervisor round trip on every loop
+FUSED_DECIDER_ENABLED = False
+DECIDER_ACCEPT_VERIFIED_CODE = True  # accept coder answers reporting a clean deterministic execution without an LLM call
+# Modules whose use makes an execution's output non-reproducible
+NONDETERMINISTIC_MODULES = ("random", "secrets", "uuid", "time", "datetime", "os", "sys", "socket", "urllib", "requests")
+
+# HTTP Server (run.py --serve)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8080
+SERVER_MAX_IN_FLIGHT = 32  # runs executed concurrently
+SERVER_MAX_QUEUE = 128  # requests waiting for a run slot before new ones get 429
+SERVER_QUEUE_TIMEOUT_SECONDS = 30.0  # wait for a run slot before a 503
+SERVER_DRAIN_SECONDS = 30.0  # time runs in progress get to finish on shutdown
+SERVER_KEEPALIVE_SECONDS = 15.0  # idle time before a keep-alive connection is closed
+SERVER_MAX_BODY_BYTES = 1024 * 1024
+
+# Answer Cache: whole-run results keyed by normalized query and a fingerprint
+# of the workflow configuration; identical concurrent queries share one run.
+# Runs on a checkpoint thread are never cached, as they depend on its history.
+ANSWER_CACHE_BACKEND = "memory"  # "memory", "sqlite", or None to disable
+ANSWER_CACHE_PATH = ".cache/answer_cache.sqlite"
+ANSWER_CACHE_TTL_SECONDS = 15 * 60
+ANSWER_CACHE_MAX_ENTRIES = 2000
+ANSWER_CACHE_VERSION = 2  # bump to invalidate stored answers after changing agent behaviour
+
+# Checkpointing: persist graph state per thread so runs can be resumed and
+# conversations continued. The memory backend keeps every thread until exit.
+CHECKPOINT_BACKEND = None  # "memory", "sqlite", or None to disable
+CHECKPOINT_PATH = ".cache/checkpoints.sqlite"
+
+# Per-Run Budgets (None disables a limit)
+BUDGET_MAX_HOPS = 15
+BUDGET_MAX_TOKENS = 60000
+BUDGET_MAX_SECONDS = 300
+BUDGET_MAX_TOOL_CALLS = 20
+
+# Context Compaction Policies (per agent, merged over "default")
+COMPACTION_POLICIES = {
+    "default": {"keep_last": 4, "older_strategy": "truncate", "older_max_tokens": 200, "tool_max_tokens": 1500},
+    "supervisor": {"keep_last": 3, "older_strategy": "summarize"},
+    "decider": {"keep_last": 3, "older_strategy": "summarize"},
+    "enhancer": {"keep_last": 2, "older_strategy": "drop"},
+}
+
+# Instrumentation
+TRACE_JSONL_PATH = None  # e.g. "traces/spans.jsonl" to export every run's spans
+METRICS_PORT = None  # e.g. 9464 to serve Prometheus metrics at /metrics
+
+# Fast-Path Router Configuration
+FAST_ROUTER_ENABLED = True
+FAST_ROUTER_THRESHOLD = 0.75  # minimum rule confidence to skip the supervisor LLM call
+
+# Speculative Fan-Out: run researcher and coder in parallel when a query
+# plausibly needs both, instead of serial supervisor/validator round trips
+SPECULATIVE_FANOUT_ENABLED = False
+SPECULATIVE_MIN_SCORE = 0.5  # both router scores must reach this to fan out
+SPECULATIVE_MAX_FANOUTS = 1  # fan-outs allowed per run
+SPECULATIVE_MAX_TOKENS = 20000  # no further fan-out once speculative branches used this many tokens
+
 # Tool Configuration
-TAVILY_MAX_RESULTS = 2
+TAVILY_MAX_RESULTS = 6  # over-fetched; ranking passes only the best passages on to the model
+
+# Search Result Ranking: results are split into passages, ranked against the
+# query, deduplicated and packed into a token budget before reaching the model
+SEARCH_RANKING_ENABLED = True
+SEARCH_RESULT_MAX_TOKENS = 400  # per search call
+SEARCH_PASSAGE_TOKENS = 60
+SEARCH_DUPLICATE_THRESHOLD = 0.8  # word-trigram Jaccard similarity of near-duplicate passages
+SEARCH_SEMANTIC_WEIGHT = 0.3  # share of embedding similarity in the score, the rest is BM25
+
+# Research Fan-Out: split compound questions into sub-queries, search them
+# concurrently and answer from the merged results in one LLM call
+RESEARCH_DECOMPOSE_ENABLED = True
+RESEARCH_MAX_SUBQUERIES = 4
+RESEARCH_SEARCH_CONCURRENCY = 4  # searches in flight at once per question, also bounding a model turn's parallel tool calls
+RESEARCH_SEARCH_POOL_SIZE = 32  # worker threads for sub-query searches, shared by all runs in the process
+
+# Python Execution: "riza" runs code remotely, "local" in a pre-forked pool of
+# sandboxed subprocesses on this machine (no network, CPU/memory/time limits)
+PYTHON_EXECUTOR = "riza"
+SANDBOX_WORKERS = 2  # warm worker processes, i.e. snippets run concurrently
+SANDBOX_TIMEOUT_SECONDS = 10.0  # wall-clock time per snippet
+SANDBOX_CPU_SECONDS = 5  # CPU time per snippet
+SANDBOX_MEMORY_MB = 512  # address space per worker
+SANDBOX_MAX_OUTPUT_CHARS = 20000  # stdout/stderr kept per snippet
+SANDBOX_MAX_JOBS_PER_WORKER = 100  # snippets before a worker is replaced
+SANDBOX_PRELOAD_MODULES = (
+    "math", "cmath", "statistics", "decimal", "fractions", "datetime", "json", "re",
+    "itertools", "collections", "functools", "random", "numpy"
+)
+
+# Search Cache Configuration
+SEARCH_CACHE_BACKEND = "sqlite"  # "memory", "sqlite", or None to disable
+SEARCH_CACHE_PATH = ".cache/search_cache.sqlite"
+SEARCH_CACHE_TTL_SECONDS = 6 * 3600
+SEARCH_CACHE_MAX_ENTRIES = 50000
+
+# Local Research Index: earlier search results and validated research answers,
+# embedded locally and consulted before web search
+RESEARCH_INDEX_ENABLED = True
+RESEARCH_INDEX_PATH = ".cache/research_index"  # None keeps the index in memory
+RESEARCH_INDEX_EMBEDDER = "hashing:384"  # or e.g. "sentence-transformers:all-MiniLM-L6-v2"
+RESEARCH_INDEX_MIN_SCORE = 0.5  # cosine similarity a local hit needs
+RESEARCH_INDEX_MIN_HITS = 2  # close hits needed to skip web search
+RESEARCH_INDEX_MAX_AGE_SECONDS = 7 * 24 * 3600  # older entries are not used
+RESEARCH_INDEX_LSH_BITS = 12
+RESEARCH_INDEX_LSH_TABLES = 8
+RESEARCH_INDEX_EXACT_BELOW = 5000  # smaller indexes are scanned in full
 
 # System Prompts
 SUPERVISOR_PROMPT = '''You are a workflow supervisor managing a team of three agents: Prompt Enhancer, Researcher, and Coder. Your role is to direct the flow of tasks by selecting the next agent based on the current stage of the workflow. For each task, provide a clear rationale for your choice, ensuring that the workflow progresses logically, efficiently, and toward a timely completion.
@@ -42,10 +314,19 @@ Don't ask anything to the user, select the most appropriate prompt
 3. Generate a more precise and actionable version of the original request.
 '''
 
-RESEARCHER_PROMPT = '''You are a researcher. Focus on gathering information and generating content. Do not perform any other tasks'''
+RESEARCHER_PROMPT = '''You are a researcher. Focus on gathering information and generating content. Do not perform any other tasks. When a question needs several searches, request them all together in one turn.'''
 
 CODER_PROMPT = '''You are a coder and analyst. Focus on mathematical caluclations, analyzing, solving math questions, and executing code. Handle technical problem-solving and data tasks.'''
 
+DECIDER_PROMPT = '''You are a workflow decider managing a team of three agents: Prompt Enhancer, Researcher, and Coder. Review the user's question and the latest agent answer, then make one decision:
+- If the answer satisfactorily and completely addresses the question, respond with 'FINISH'.
+- Otherwise choose the agent best suited to close the gap:
+  1. 'enhancer': The question itself is unclear or vague.
+  2. 'researcher': Information is missing, outdated or unsupported.
+  3. 'coder': A calculation, code or data analysis is missing or wrong.
+Give a short reason stating what the answer lacks, so the chosen agent knows what to fix.
+'''
+
 VALIDATOR_PROMPT = '''You are a workflow validator. Your task is to ensure the quality of the workflow. Specifically, you must:
 - Review the user's question (the first message in the workflow).
 - Review the answer (the last message in the workflow).
@@ -1,10 +1,19 @@
-from core.workflow import WorkflowManager
-from core.state import WorkflowState
-from core.models import Supervisor, Validator
+import importlib
 
-__all__ = [
-    'WorkflowManager',
-    'WorkflowState',
-    'Supervisor',
-    'Validator'
-]
\ No newline at end of file
+# Importing a core submodule must not build the whole workflow, so exports load on first access
+_EXPORTS = {
+    'WorkflowManager': 'core.workflow',
+    'BatchRunner': 'core.batch',
+    'WorkflowState': 'core.state',
+    'Supervisor': 'core.models',
+    'Validator': 'core.models',
+    'FastPathRouter': 'core.router',
+    'QueryDecomposer': 'core.decompose'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,140 @@
+import copy
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+from tools.cached_search import normalize_query
+from utils.cache import CacheBackend
+from utils.metrics import metrics
+from utils.single_flight import SingleFlight
+
+class AnswerCache:
+    """
+    Cache of whole workflow results, keyed by normalized query and a
+    fingerprint of the workflow configuration, so a repeated question is
+    answered without running the graph. Identical queries arriving while
+    one is running share that run's result instead of starting their own.
+    
+    Only runs that ended with a validated answer are stored.
+    """
+    
+    def __init__(self, backend: CacheBackend):
+        """
+        Initialize the cache.
+        
+        Args:
+            backend: Store for serialized results, providing TTL and LRU eviction
+        """
+        self.backend = backend
+        self.single_flight = SingleFlight()
+    
+    @staticmethod
+    def fingerprint(config: Dict[str, Any]) -> str:
+        """
+        Hash a workflow configuration into a version for cache keys.
+        
+        Args:
+            config: JSON-serializable description of everything that shapes answers
+            
+        Returns:
+            A short hex digest
+        """
+        return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    
+    @staticmethod
+    def key(query: str, version: str) -> str:
+        """
+        Build the cache key for a query.
+        
+        Args:
+            query: The user's query
+            version: The workflow configuration fingerprint
+            
+        Returns:
+            The cache key
+        """
+        return f"answer:{version}:{normalize_query(query)}"
+    
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read and decode a cached result."""
+        cached = self.backend.get(key)
+        if cached is None:
+            return None
+        result = json.loads(cached)
+        result["messages"] = messages_from_dict(result["messages"])
+        return result
+    
+    def _store(self, key: str, result: Dict[str, Any]):
+        """Encode and cache a result, skipping runs that stopped early."""
+        # Only the messages need converting; the other state fields are plain values
+        if result.get("termination_reason") == "validated":
+            self.backend.set(key, json.dumps({**result, "messages": messages_to_dict(result["messages"])}))
+    
+    @staticmethod
+    def _outcome(result: Dict[str, Any], shared: bool) -> Tuple[Dict[str, Any], str]:
+        """Count the lookup and give each caller of a shared run its own copy of the result."""
+        outcome = "coalesced" if shared else "miss"
+        metrics.inc("workflow_answer_cache_total", 1, {"result": outcome})
+        # The state is shared by every caller of the run; the leader only adds top-level keys
+        return (copy.deepcopy(result) if shared else dict(result)), outcome
+    
+    def run(self, key: str, fn: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], str]:
+        """
+        Return the cached result for a key, or run fn once for all concurrent callers.
+        
+        Args:
+            key: The cache key, from key()
+            fn: Runs the workflow and returns its final state
+            
+        Returns:
+            The result, and 'hit', 'coalesced' (shared another caller's run) or 'miss'
+        """
+        cached = self._load(key)
+        if cached is not None:
+            metrics.inc("workflow_answer_cache_total", 1, {"result": "hit"})
+            return cached, "hit"
+        
+        def execute():
+            result = fn()
+            self._store(key, result)
+            return result
+        
+        return self._outcome(*self.single_flight.do(key, execute))
+    
+    async def arun(self, key: str, fn: Callable[[], Awaitable[Dict[str, Any]]]) -> Tuple[Dict[str, Any], str]:
+        """
+        Asynchronously return the cached result for a key, or await fn once
+        for all concurrent callers on the event loop.
+        
+        Args:
+            key: The cache key, from key()
+            fn: Coroutine function running the workflow and returning its final state
+            
+        Returns:
+            The result, and 'hit', 'coalesced' or 'miss'
+        """
+        cached = self._load(key)
+        if cached is not None:
+            metrics.inc("workflow_answer_cache_total", 1, {"result": "hit"})
+            return cached, "hit"
+        
+        async def execute():
+            result = await fn()
+            self._store(key, result)
+            return result
+        
+        return self._outcome(*await self.single_flight.ado(key, execute))
+    
+    def clear(self):
+        """Remove every cached result."""
+        self.backend.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters.
+        
+        Returns:
+            Hits, misses, evictions, size, and runs coalesced into an in-flight one
+        """
+        return {**self.backend.stats(), "coalesced": self.single_flight.coalesced}
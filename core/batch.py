@@ -0,0 +1,174 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Set
+
+from core.state import WorkflowState
+from utils.logger import logger
+from utils.scheduler import request_priority
+
+class BatchRunner:
+    """
+    Runs a file of queries through a shared workflow with bounded parallelism.
+    Results are appended to a JSONL output file as each query finishes, so a
+    crashed batch can be resumed by skipping the queries already answered.
+    """
+    
+    def __init__(self, workflow, output_path: str, workers: int = 8):
+        """
+        Initialize the batch runner.
+        
+        Args:
+            workflow: The WorkflowManager used to answer queries
+            output_path: JSONL file that results are appended to
+            workers: Number of queries processed concurrently
+        """
+        self.workflow = workflow
+        self.output_path = output_path
+        self.workers = workers
+    
+    @staticmethod
+    def load_queries(path: str) -> List[Dict[str, str]]:
+        """
+        Load queries from a JSONL or plain-text file.
+        
+        JSONL lines must be objects with a 'query' field and may carry an 'id';
+        any other non-empty line is taken as a plain-text query. Queries without
+        an id are identified by their line number.
+        
+        Args:
+            path: Path to the input file
+            
+        Returns:
+            A list of {'id', 'query'} dictionaries in file order
+        """
+        queries = []
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                
+                record = None
+                if line.startswith("{"):
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        record = None
+                
+                if isinstance(record, dict) and "query" in record:
+                    query_id = str(record.get("id", line_number))
+                    queries.append({"id": query_id, "query": record["query"]})
+                else:
+                    queries.append({"id": str(line_number), "query": line})
+        return queries
+    
+    def completed_ids(self) -> Set[str]:
+        """
+        Read the ids already answered successfully in the output file.
+        A partially written trailing line from a crash is ignored.
+        
+        Returns:
+            The set of completed query ids
+        """
+        if not os.path.exists(self.output_path):
+            return set()
+        
+        completed = set()
+        with open(self.output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("error") is None and "id" in record:
+                    completed.add(str(record["id"]))
+        return completed
+    
+    async def arun(self, queries: List[Dict[str, str]], resume: bool = True) -> Dict[str, Any]:
+        """
+        Process queries concurrently and stream results to the output file.
+        
+        Args:
+            queries: The {'id', 'query'} dictionaries to process
+            resume: Whether to skip queries already answered in the output file
+            
+        Returns:
+            A summary with the number of queries processed, skipped and failed
+        """
+        done = self.completed_ids() if resume else set()
+        pending = [q for q in queries if q["id"] not in done]
+        logger.info(f"Batch: {len(pending)} queries to run, {len(queries) - len(pending)} already done")
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        for query in pending:
+            queue.put_nowait(query)
+        
+        summary = {"processed": 0, "skipped": len(queries) - len(pending), "failed": 0}
+        
+        self._terminate_partial_line()
+        with open(self.output_path, "a", encoding="utf-8") as out:
+            async def worker():
+                while True:
+                    try:
+                        query = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    record = await self._answer(query)
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                    summary["processed"] += 1
+                    if record["error"] is not None:
+                        summary["failed"] += 1
+                    logger.info(f"Batch: [{summary['processed']}/{len(pending)}] finished query {query['id']}")
+            
+            await asyncio.gather(*(worker() for _ in range(max(1, self.workers))))
+        
+        return summary
+    
+    def run(self, queries: List[Dict[str, str]], resume: bool = True) -> Dict[str, Any]:
+        """
+        Synchronous wrapper around arun().
+        
+        Args:
+            queries: The {'id', 'query'} dictionaries to process
+            resume: Whether to skip queries already answered in the output file
+            
+        Returns:
+            A summary with the number of queries processed, skipped and failed
+        """
+        return asyncio.run(self.arun(queries, resume))
+    
+    def _terminate_partial_line(self):
+        """End a line left half-written by a crash so new records start cleanly."""
+        if not os.path.exists(self.output_path) or os.path.getsize(self.output_path) == 0:
+            return
+        with open(self.output_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+    
+    async def _answer(self, query: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Run one query, capturing its answer or error as an output record.
+        
+        Args:
+            query: The {'id', 'query'} dictionary to process
+            
+        Returns:
+            The output record for the query
+        """
+        start = time.perf_counter()
+        record = {"id": query["id"], "query": query["query"], "answer": None, "error": None, "answer_cache": None}
+        try:
+            # Batch queries yield to interactive requests in the shared scheduler
+            with request_priority("batch"):
+                result = await self.workflow.arun(query["query"], with_summary=True)
+            record["answer"] = WorkflowState.get_final_answer(result)
+            record["answer_cache"] = result["run_summary"]["answer_cache"]
+        except Exception as e:
+            logger.error(f"Batch: query {query['id']} failed: {e}")
+            record["error"] = str(e)
+        record["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return record
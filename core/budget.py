@@ -0,0 +1,131 @@
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from config.settings import BUDGET_MAX_HOPS, BUDGET_MAX_TOKENS, BUDGET_MAX_SECONDS, BUDGET_MAX_TOOL_CALLS
+
+class BudgetExceeded(Exception):
+    """Raised when a run has used up one of its budgets."""
+    
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+class RunBudget:
+    """
+    Limits for a single workflow run. A limit of None means unlimited.
+    """
+    
+    def __init__(self, max_hops: Optional[int] = BUDGET_MAX_HOPS, max_tokens: Optional[int] = BUDGET_MAX_TOKENS,
+                 max_seconds: Optional[float] = BUDGET_MAX_SECONDS, max_tool_calls: Optional[int] = BUDGET_MAX_TOOL_CALLS):
+        """
+        Initialize the budget.
+        
+        Args:
+            max_hops: Maximum agent node executions
+            max_tokens: Maximum prompt plus completion tokens across all LLM calls
+            max_seconds: Maximum wall-clock time
+            max_tool_calls: Maximum tool invocations
+        """
+        self.max_hops = max_hops
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.max_tool_calls = max_tool_calls
+
+class BudgetTracker(BaseCallbackHandler):
+    """
+    Tracks a run's usage against its budget.
+    Registered as a callback on the run, it sees every LLM and tool call,
+    including those made inside ReAct sub-agents, and raises BudgetExceeded
+    before a call that would start after a budget has run out.
+    """
+    raise_error = True
+    run_inline = True
+    
+    def __init__(self, budget: Optional[RunBudget] = None):
+        """
+        Initialize the tracker and start the run's clock.
+        
+        Args:
+            budget: The limits to enforce; defaults from settings
+        """
+        self.budget = budget or RunBudget()
+        self.started_at = time.monotonic()
+        self.hops = 0
+        self.tokens = 0
+        self.tool_calls = 0
+        self._lock = threading.Lock()
+    
+    def exceeded(self) -> Optional[str]:
+        """
+        Check every budget.
+        
+        Returns:
+            A description of the first exhausted budget, or None
+        """
+        budget = self.budget
+        if budget.max_hops is not None and self.hops > budget.max_hops:
+            return f"hop budget exhausted ({budget.max_hops} hops)"
+        if budget.max_tokens is not None and self.tokens >= budget.max_tokens:
+            return f"token budget exhausted ({self.tokens}/{budget.max_tokens} tokens)"
+        if budget.max_tool_calls is not None and self.tool_calls > budget.max_tool_calls:
+            return f"tool call budget exhausted ({budget.max_tool_calls} tool calls)"
+        if budget.max_seconds is not None and self.elapsed() >= budget.max_seconds:
+            return f"time budget exhausted ({budget.max_seconds:g}s)"
+        return None
+    
+    def check(self):
+        """Raise BudgetExceeded if any budget is exhausted."""
+        reason = self.exceeded()
+        if reason:
+            raise BudgetExceeded(reason)
+    
+    def elapsed(self) -> float:
+        """Seconds since the run started."""
+        return time.monotonic() - self.started_at
+    
+    def record_hop(self):
+        """Count an agent node execution and enforce the budgets."""
+        with self._lock:
+            self.hops += 1
+        self.check()
+    
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, **kwargs: Any):
+        self.check()
+    
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, **kwargs: Any):
+        self.check()
+    
+    def on_llm_end(self, response: LLMResult, **kwargs: Any):
+        tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    tokens += usage.get("total_tokens", 0)
+        if not tokens and response.llm_output:
+            tokens = (response.llm_output.get("token_usage") or {}).get("total_tokens", 0)
+        with self._lock:
+            self.tokens += tokens
+    
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any):
+        with self._lock:
+            self.tool_calls += 1
+        self.check()
+    
+    def usage(self) -> Dict[str, Any]:
+        """
+        Get the run's usage so far.
+        
+        Returns:
+            Hops, tokens, tool calls and elapsed seconds
+        """
+        return {
+            "hops": self.hops,
+            "tokens": self.tokens,
+            "tool_calls": self.tool_calls,
+            "elapsed_seconds": round(self.elapsed(), 3),
+        }
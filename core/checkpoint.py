@@ -0,0 +1,122 @@
+import asyncio
+import os
+import sqlite3
+import zlib
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from utils.logger import logger
+
+# Payloads smaller than this are stored as-is; compression would not pay for itself
+COMPRESSION_MIN_BYTES = 512
+COMPRESSED_SUFFIX = "+zlib"
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Checkpoint serializer that zlib-compresses the msgpack encoding of large
+    payloads. Message histories are repetitive text, so checkpoints of a
+    MessagesState shrink several-fold.
+    """
+    
+    def __init__(self, inner: Optional[SerializerProtocol] = None, level: int = 6,
+                 min_bytes: int = COMPRESSION_MIN_BYTES):
+        """
+        Initialize the serializer.
+        
+        Args:
+            inner: The serializer producing the uncompressed payload
+            level: zlib compression level
+            min_bytes: Smallest payload that gets compressed
+        """
+        self.inner = inner or JsonPlusSerializer()
+        self.level = level
+        self.min_bytes = min_bytes
+    
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+    
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+    
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) < self.min_bytes:
+            return type_, data
+        return type_ + COMPRESSED_SUFFIX, zlib.compress(data, self.level)
+    
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(COMPRESSED_SUFFIX):
+            return self.inner.loads_typed((type_[:-len(COMPRESSED_SUFFIX)], zlib.decompress(payload)))
+        return self.inner.loads_typed(data)
+
+def _sqlite_saver_class():
+    """Import SqliteSaver lazily; it ships in the optional langgraph-checkpoint-sqlite package."""
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError as e:
+        raise ImportError(
+            "The sqlite checkpoint backend requires langgraph-checkpoint-sqlite: "
+            "pip install langgraph-checkpoint-sqlite"
+        ) from e
+    
+    class ThreadedSqliteSaver(SqliteSaver):
+        """
+        SqliteSaver whose async methods run the sync ones in a worker thread,
+        so the same checkpointer serves run()/stream() and arun()/astream().
+        """
+        
+        async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+            return await asyncio.to_thread(self.get_tuple, config)
+        
+        async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[dict] = None,
+                        before: Optional[RunnableConfig] = None,
+                        limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+            checkpoints = await asyncio.to_thread(
+                lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+            )
+            for checkpoint in checkpoints:
+                yield checkpoint
+        
+        async def aput(self, config: RunnableConfig, checkpoint: Any, metadata: Any,
+                       new_versions: Any) -> RunnableConfig:
+            return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+        
+        async def aput_writes(self, config: RunnableConfig, writes: Any, task_id: str, *args: Any) -> None:
+            await asyncio.to_thread(self.put_writes, config, writes, task_id, *args)
+    
+    return ThreadedSqliteSaver
+
+def create_checkpointer(backend: Optional[str], path: Optional[str] = None) -> Optional[BaseCheckpointSaver]:
+    """
+    Create a checkpointer for the workflow graph.
+    
+    Args:
+        backend: 'memory', 'sqlite', or None to disable checkpointing
+        path: Database file for the sqlite backend
+    
+    Returns:
+        The checkpointer, or None when disabled
+    """
+    if not backend or backend == "none":
+        return None
+    
+    serde = CompressedSerializer()
+    if backend == "memory":
+        return MemorySaver(serde=serde)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("The sqlite checkpoint backend requires a path")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        logger.info(f"Checkpointing runs to {path}")
+        return _sqlite_saver_class()(conn, serde=serde)
+    raise ValueError(f"Unknown checkpoint backend: {backend}")
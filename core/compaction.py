@@ -0,0 +1,173 @@
+import re
+import threading
+from typing import Any, Dict, List
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from core.run_context import RunContext
+from config.settings import COMPACTION_POLICIES
+from utils.logger import logger
+from utils.tokens import estimate_tokens, truncate_to_tokens
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+class CompactionPolicy:
+    """
+    How an agent's message history is compacted before an LLM call.
+    
+    Older agent turns are handled by `older_strategy`:
+      - 'truncate': keep each older turn cut to `older_max_tokens`
+      - 'summarize': replace all older turns with one extractive digest
+        holding the first sentence of each turn
+      - 'drop': remove older turns entirely
+    """
+    
+    def __init__(self, enabled: bool = True, keep_last: int = 4, older_strategy: str = "truncate",
+                 older_max_tokens: int = 200, tool_max_tokens: int = 1500):
+        """
+        Initialize the policy.
+        
+        Args:
+            enabled: Whether to compact at all
+            keep_last: Latest agent outputs kept verbatim
+            older_strategy: 'truncate', 'summarize' or 'drop'
+            older_max_tokens: Token budget per older turn when truncating
+            tool_max_tokens: Token budget per tool output
+        """
+        if older_strategy not in ("truncate", "summarize", "drop"):
+            raise ValueError(f"Unknown compaction strategy: {older_strategy}")
+        self.enabled = enabled
+        self.keep_last = keep_last
+        self.older_strategy = older_strategy
+        self.older_max_tokens = older_max_tokens
+        self.tool_max_tokens = tool_max_tokens
+    
+    @classmethod
+    def for_agent(cls, name: str) -> 'CompactionPolicy':
+        """
+        Build an agent's policy from COMPACTION_POLICIES, falling back to its 'default' entry.
+        
+        Args:
+            name: The agent name
+            
+        Returns:
+            The configured policy
+        """
+        options = dict(COMPACTION_POLICIES.get("default", {}))
+        options.update(COMPACTION_POLICIES.get(name, {}))
+        return cls(**options)
+
+class ContextCompactor:
+    """
+    Compacts a workflow message history according to a policy.
+    
+    The user's questions and the latest `keep_last` agent outputs are kept
+    verbatim, older agent outputs are truncated, summarized or dropped, and
+    tool outputs are trimmed to a token budget. Tool-calling messages are
+    never removed, so tool calls and their results stay paired.
+    """
+    
+    def __init__(self, policy: CompactionPolicy):
+        """
+        Initialize the compactor.
+        
+        Args:
+            policy: The compaction policy to apply
+        """
+        self.policy = policy
+        self.tokens_saved = 0
+        # Agents and their compactors are shared by concurrent runs
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _is_user_message(message: BaseMessage) -> bool:
+        """Whether a message was written by the user rather than by an agent."""
+        return message.type == "human" and not message.name
+    
+    @staticmethod
+    def _first_sentence(text: str) -> str:
+        """Get the first sentence of a text."""
+        return _SENTENCE_END.split(text.strip(), maxsplit=1)[0]
+    
+    def compact(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        """
+        Compact a message history.
+        
+        Args:
+            messages: The message history
+            
+        Returns:
+            The compacted history; the input list is not modified
+        """
+        policy = self.policy
+        if not policy.enabled:
+            return list(messages)
+        
+        # Agent outputs are named human messages; the latest few stay verbatim
+        agent_turns = [i for i, m in enumerate(messages) if m.type == "human" and m.name]
+        older = set(agent_turns[:-policy.keep_last] if policy.keep_last else agent_turns)
+        
+        compacted: List[BaseMessage] = []
+        digest: List[str] = []
+        for i, message in enumerate(messages):
+            if i in older:
+                if policy.older_strategy == "truncate":
+                    compacted.append(self._with_content(message, truncate_to_tokens(message.content, policy.older_max_tokens)))
+                elif policy.older_strategy == "summarize":
+                    digest.append(f"- {message.name}: {self._first_sentence(message.content)}")
+                    # The digest takes the place of the first older turn
+                    if len(digest) == 1:
+                        compacted.append(None)
+            elif isinstance(message, ToolMessage) and isinstance(message.content, str):
+                compacted.append(self._with_content(message, truncate_to_tokens(message.content, policy.tool_max_tokens)))
+            else:
+                compacted.append(message)
+        
+        if digest:
+            summary = HumanMessage(content="Summary of earlier agent turns:\n" + "\n".join(digest), name="summary")
+            compacted = [summary if m is None else m for m in compacted]
+        
+        self._record(messages, compacted)
+        return compacted
+    
+    def prompt(self, system_prompt: str):
+        """
+        Build a ReAct prompt callable that prepends the system prompt to the compacted history.
+        
+        Args:
+            system_prompt: The agent's system prompt
+            
+        Returns:
+            A callable usable as create_react_agent's state_modifier
+        """
+        def modifier(state: Dict[str, Any]) -> List[BaseMessage]:
+            return [SystemMessage(content=system_prompt)] + self.compact(state["messages"])
+        return modifier
+    
+    @staticmethod
+    def _with_content(message: BaseMessage, content: str) -> BaseMessage:
+        """Copy a message with new content, reusing it when unchanged."""
+        if content == message.content:
+            return message
+        return message.model_copy(update={"content": content})
+    
+    def _record(self, original: List[BaseMessage], compacted: List[BaseMessage]):
+        """Account the tokens removed to the compactor and the current run."""
+        saved = sum(estimate_tokens(m.content) for m in original) - sum(estimate_tokens(m.content) for m in compacted)
+        if saved <= 0:
+            return
+        with self._lock:
+            self.tokens_saved += saved
+        run = RunContext.current()
+        if run is not None:
+            run.record("compaction_tokens_saved", saved)
+        logger.debug("Compacted context", f"{saved} tokens saved")
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the compactor counters.
+        
+        Returns:
+            Total tokens saved across all calls
+        """
+        return {"tokens_saved": self.tokens_saved}
@@ -0,0 +1,99 @@
+import re
+from typing import List
+
+# Separators joining the alternatives of a comparison, e.g. "2023 vs 2021" or "India and Brazil"
+_JOINER = r"\s*(?:,\s*(?:and\s+|or\s+)?|\s(?:and|or|&|vs\.?|versus|compared\s+(?:to|with)|against)\s)\s*"
+
+_YEAR = r"\b(?:19|20)\d{2}\b"
+_YEAR_LIST = re.compile(rf"{_YEAR}(?:{_JOINER}{_YEAR})+")
+
+# Runs of capitalized names; only split when the question asks for a comparison
+_NAME = r"[A-Z][\w.&'-]*(?:\s+[A-Z][\w.&'-]*)*"
+_NAME_LIST = re.compile(rf"(?<![\w])({_NAME})(?:{_JOINER}{_NAME})+")
+_COMPARISON = re.compile(r"\b(compare|comparison|compared|vs\.?|versus|difference between|differences between|which is (?:bigger|larger|higher|lower|smaller|better|cheaper|older|newer))\b", re.IGNORECASE)
+
+# Single words around an explicit "vs", e.g. "python vs rust performance"
+_VERSUS = re.compile(r"\b([\w.+#-]+)\s+(?:vs\.?|versus)\s+([\w.+#-]+)\b", re.IGNORECASE)
+
+# A second question joined by "and", e.g. "... of France and who is its president?"
+_QUESTION_JOIN = re.compile(r"\s*(?:\?\s+|,?\s+and\s+(?=(?:what|who|when|where|which|how|why)\b))", re.IGNORECASE)
+
+# Words referring back to an earlier question, which a standalone search would lose
+_PRONOUN = re.compile(r"\b(it|its|they|their|them|this|that|these|those|he|his|she|her)\b", re.IGNORECASE)
+
+# Comparison phrasing left over once the alternatives are split apart
+_LEAD = re.compile(r"^\s*(?:please\s+)?(?:compare|comparison of|contrast|what(?:'s| is| are) the differences? between|differences? between)\s+(?:the\s+)?", re.IGNORECASE)
+
+class QueryDecomposer:
+    """
+    Rule-based splitter of compound questions into independent search
+    queries, so their searches can run concurrently instead of across
+    serial LLM turns. It separates several questions asked at once, and
+    expands comparisons over years or named entities into one query per
+    alternative. No LLM call is made.
+    """
+    
+    @staticmethod
+    def _items(span: str) -> List[str]:
+        """Split a list of alternatives on its joiners."""
+        return [item for item in re.split(_JOINER, span) if item.strip()]
+    
+    @staticmethod
+    def _expand(question: str, pattern: re.Pattern) -> List[str]:
+        """One question per alternative in the first list the pattern finds, or none."""
+        match = pattern.search(question)
+        if match is None:
+            return []
+        items = QueryDecomposer._items(match.group(0))
+        # Without any words around the list, a single search over the whole question does better
+        context = _LEAD.sub("", question[:match.start()] + question[match.end():])
+        if len(items) < 2 or not re.search(r"\w", context):
+            return []
+        return [question[:match.start()] + item.strip() + question[match.end():] for item in items]
+    
+    @staticmethod
+    def _clean(query: str) -> str:
+        """Strip comparison phrasing and stray punctuation from a sub-query."""
+        query = _LEAD.sub("", query).strip(" ,;.")
+        return query[:1].upper() + query[1:] if query else query
+    
+    @staticmethod
+    def _split_comparison(question: str) -> List[str]:
+        """Expand a comparison into one query per alternative; years first, then names."""
+        parts = QueryDecomposer._expand(question, _YEAR_LIST)
+        if not parts and _COMPARISON.search(question):
+            # Drop the comparison phrasing first, so its capitalized first word is not taken for a name
+            stripped = _LEAD.sub("", question)
+            parts = QueryDecomposer._expand(stripped, _NAME_LIST) or QueryDecomposer._expand(stripped, _VERSUS)
+        return parts or [question]
+    
+    @staticmethod
+    def decompose(question: str, max_queries: int = 4) -> List[str]:
+        """
+        Split a question into the searches needed to answer it.
+        
+        Args:
+            question: The user's question
+            max_queries: Most sub-queries to return
+            
+        Returns:
+            The sub-queries in question order; a single entry when the
+            question is not compound
+        """
+        parts = _QUESTION_JOIN.split(question.strip())
+        # Follow-up questions that refer back to an earlier one are searched together with it
+        if any(_PRONOUN.search(part) for part in parts[1:]):
+            parts = [question.strip()]
+        
+        queries: List[str] = []
+        for part in parts:
+            if len(part.split()) < 2:
+                continue
+            for query in QueryDecomposer._split_comparison(part):
+                query = QueryDecomposer._clean(query)
+                if query and query.lower() not in (q.lower() for q in queries):
+                    queries.append(query)
+        
+        if len(queries) < 2:
+            return [question.strip()]
+        return queries[:max_queries]
@@ -0,0 +1,169 @@
+import asyncio
+import random
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict, Field, PrivateAttr
+
+from utils.faults import FaultInjector, LatencyDistribution
+from utils.tokens import estimate_tokens
+
+class FaultyChatModel(BaseChatModel):
+    """
+    Chat model wrapper that injects latency and provider errors before each
+    request reaches the wrapped model, to exercise retries, deadlines,
+    hedging and circuit breakers without a real provider.
+    """
+    model: BaseChatModel
+    faults: FaultInjector
+    
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    @property
+    def _llm_type(self) -> str:
+        return self.model._llm_type
+    
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+    
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable[LanguageModelInput, BaseMessage]:
+        return self.bind(**self.model.bind_tools(tools, **kwargs).kwargs)
+    
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        self.faults.inject()
+        return self.model._generate(messages, stop=stop, **kwargs)
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        await self.faults.ainject()
+        return await self.model._agenerate(messages, stop=stop, **kwargs)
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for a provider chat model, for benchmarks and local
+    runs. It plays every role in the workflow: Supervisor, Validator and
+    Decision outputs for structured output requests, one tool call then an answer
+    inside the ReAct sub-agents, and plain text otherwise. Latency is drawn
+    from a seeded distribution and usage metadata is reported, so budgets,
+    tracing and cost accounting behave as with a real provider.
+    """
+    latency: LatencyDistribution = Field(default_factory=LatencyDistribution)
+    routes: List[str] = ["researcher", "coder"]
+    reject_rate: float = 0.0
+    seed: Optional[int] = 0
+    completion_tokens: int = 40
+    calls: int = 0
+    _random: random.Random = PrivateAttr()
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    def __init__(self, **kwargs: Any):
+        """
+        Initialize the model.
+        
+        Args:
+            **kwargs: Fields: latency, routes (answering nodes the supervisor
+                picks between, chosen by a hash of the question), reject_rate
+                (probability the validator sends an answer back), seed and
+                completion_tokens
+        """
+        super().__init__(**kwargs)
+        self._random = random.Random(self.seed)
+    
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+    
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": "scripted", "routes": self.routes, "reject_rate": self.reject_rate}
+    
+    def bind_tools(self, tools: Sequence[Any], tool_choice: Optional[Any] = None,
+                   **kwargs: Any) -> Runnable[LanguageModelInput, BaseMessage]:
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], tool_choice=tool_choice, **kwargs)
+    
+    @staticmethod
+    def _question(messages: List[BaseMessage]) -> str:
+        """The latest user question in the conversation."""
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage) and message.name is None:
+                return str(message.content)
+        return str(messages[-1].content) if messages else ""
+    
+    def _route(self, question: str, messages: List[BaseMessage]) -> str:
+        """Pick the supervisor's next node; the enhancer is only chosen once per question."""
+        routes = self.routes
+        if any(getattr(message, "name", None) == "enhancer" for message in messages):
+            routes = [route for route in routes if route != "enhancer"] or ["researcher"]
+        return routes[zlib.crc32(question.encode("utf-8")) % len(routes)]
+    
+    @staticmethod
+    def _tool_arguments(tool: Dict[str, Any], question: str) -> Dict[str, Any]:
+        """Fill a tool's required string arguments, using code for code fields."""
+        parameters = tool["function"].get("parameters", {})
+        return {
+            name: "print(6 * 7)" if name == "code" else question
+            for name in parameters.get("required", list(parameters.get("properties", {})))
+        }
+    
+    def _respond(self, messages: List[BaseMessage], tools: List[Dict[str, Any]]) -> AIMessage:
+        """Script the reply to a request."""
+        with self._lock:
+            self.calls += 1
+            call_id = f"call_{self.calls}"
+            rejected = self._random.random() < self.reject_rate
+        question = self._question(messages)
+        names = [tool["function"]["name"] for tool in tools]
+        
+        if "Supervisor" in names:
+            route = self._route(question, messages)
+            return AIMessage(content="", tool_calls=[{
+                "name": "Supervisor", "id": call_id,
+                "args": {"next": route, "reason": f"Scripted route to {route}."}
+            }])
+        if "Decision" in names:
+            decision = self._route(question, messages) if rejected else "FINISH"
+            return AIMessage(content="", tool_calls=[{
+                "name": "Decision", "id": call_id,
+                "args": {"next": decision, "reason": f"Scripted decision {decision}."}
+            }])
+        if "Validator" in names:
+            decision = "supervisor" if rejected else "FINISH"
+            return AIMessage(content="", tool_calls=[{
+                "name": "Validator", "id": call_id,
+                "args": {"next": decision, "reason": f"Scripted decision {decision}."}
+            }])
+        if tools and not isinstance(messages[-1], ToolMessage):
+            return AIMessage(content="", tool_calls=[{
+                "name": names[0], "id": call_id, "args": self._tool_arguments(tools[0], question)
+            }])
+        return AIMessage(content=f"Scripted answer to '{question}': 42.")
+    
+    def _result(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> ChatResult:
+        message = self._respond(messages, kwargs.get("tools") or [])
+        prompt_tokens = sum(estimate_tokens(m.content) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": self.completion_tokens,
+            "total_tokens": prompt_tokens + self.completion_tokens
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+    
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency.sample())
+        return self._result(messages, kwargs)
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency.sample())
+        return self._result(messages, kwargs)
@@ -0,0 +1,571 @@
+import json
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.messages.ai import UsageMetadata, add_usage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from pydantic import ConfigDict
+from config.settings import (
+    get_settings,
+    AGENT_MODELS,
+    LLM_MODEL,
+    LLM_PROVIDER,
+    LLM_PROVIDERS,
+    LLM_CACHE_BACKEND,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_SEMANTIC_THRESHOLD,
+    MODEL_DOWNTIER_COOLDOWN_SECONDS,
+    MODEL_DOWNTIER_LATENCY_SECONDS,
+    MODEL_DOWNTIER_QUEUE_DEPTH,
+    SCHEDULER_COMPLETION_TOKENS
+)
+from utils.cache import create_cache_backend
+from utils.llm_cache import LLMResponseCache
+from utils.logger import logger
+from utils.metrics import metrics
+from utils.rate_limiter import rate_limiters
+from utils.resilience import CircuitOpenError, ResilientCaller, is_retryable
+from utils.scheduler import RequestScheduler
+from utils.tokens import estimate_tokens
+
+class ResilientChatModel(BaseChatModel):
+    """
+    Chat model wrapper that sends every request through a ResilientCaller:
+    per-attempt deadlines, jittered backoff on retryable errors, hedging and
+    the provider's circuit breaker.
+    
+    Requests go straight to the wrapped model's _generate/_stream, so response
+    caching is configured on the wrapper. Every attempt, retries included,
+    first waits for admission by the request scheduler, charged with the
+    request's estimated tokens and settled with its reported usage, or else
+    for the wrapped model's rate limiter.
+    """
+    model: BaseChatModel
+    provider: str
+    caller: ResilientCaller
+    scheduler: Optional[RequestScheduler] = None
+    
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    def __init__(self, model: BaseChatModel, provider: str, caller: Optional[ResilientCaller] = None, **kwargs: Any):
+        """
+        Wrap a chat model.
+        
+        Args:
+            model: The chat model to call
+            provider: The provider name, selecting the retry policy and circuit breaker
+            caller: Optional caller; one is created from the provider's settings if omitted
+            **kwargs: Additional chat model fields, e.g. cache or scheduler
+        """
+        super().__init__(model=model, provider=provider, caller=caller or ResilientCaller(provider), **kwargs)
+    
+    @property
+    def _llm_type(self) -> str:
+        return self.model._llm_type
+    
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return self.model._identifying_params
+    
+    @property
+    def model_name(self) -> str:
+        """The wrapped model's name."""
+        return getattr(self.model, "model_name", None) or getattr(self.model, "model", None) or self._llm_type
+    
+    @property
+    def model_key(self) -> str:
+        """The model as a "provider:model" spec."""
+        return f"{self.provider}:{self.model_name}"
+    
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        return self.model._get_ls_params(stop=stop, **kwargs)
+    
+    def _should_stream(self, *, async_api: bool, run_manager: Optional[Any] = None, **kwargs: Any) -> bool:
+        return self.model._should_stream(async_api=async_api, run_manager=run_manager, **kwargs)
+    
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable[LanguageModelInput, BaseMessage]:
+        """Bind tools in the wrapped model's format, keeping requests on the wrapper."""
+        return self.bind(**self.model.bind_tools(tools, **kwargs).kwargs)
+    
+    def _estimate(self, messages: List[BaseMessage], kwargs: Dict[str, Any]) -> int:
+        """Estimate a request's total tokens for admission: prompt plus expected completion."""
+        completion = kwargs.get("max_tokens") or getattr(self.model, "max_tokens", None) or SCHEDULER_COMPLETION_TOKENS
+        return sum(estimate_tokens(message.content) for message in messages) + completion
+    
+    def _admission(self, messages: List[BaseMessage], kwargs: Dict[str, Any]):
+        """Create the blocking hook run before every attempt, and the token estimate it charges."""
+        estimate = self._estimate(messages, kwargs) if self.scheduler else 0
+        def admit():
+            if self.scheduler:
+                self.scheduler.admit(estimate)
+            elif self.model.rate_limiter:
+                self.model.rate_limiter.acquire(blocking=True)
+        return admit, estimate
+    
+    def _aadmission(self, messages: List[BaseMessage], kwargs: Dict[str, Any]):
+        """Create the async hook awaited before every attempt, and the token estimate it charges."""
+        estimate = self._estimate(messages, kwargs) if self.scheduler else 0
+        async def admit():
+            if self.scheduler:
+                await self.scheduler.aadmit(estimate)
+            elif self.model.rate_limiter:
+                await self.model.rate_limiter.aacquire(blocking=True)
+        return admit, estimate
+    
+    def _settle(self, estimate: int, usage: Optional[UsageMetadata]):
+        """Correct the scheduler's token bucket with the usage the provider reported."""
+        if self.scheduler and usage:
+            self.scheduler.settle(estimate, usage.get("total_tokens", estimate))
+    
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        admit, estimate = self._admission(messages, kwargs)
+        result = self.caller.call(lambda: self.model._generate(messages, stop=stop, **kwargs), before_attempt=admit)
+        self._settle(estimate, getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None)
+        return result
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        admit, estimate = self._aadmission(messages, kwargs)
+        result = await self.caller.acall(
+            lambda: self.model._agenerate(messages, stop=stop, **kwargs), before_attempt=admit
+        )
+        self._settle(estimate, getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None)
+        return result
+    
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[Any] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # Retries and the deadline cover the wait for the first chunk; a stream is never hedged
+        def attempt():
+            chunks = self._inner_stream(messages, stop, **kwargs)
+            return next(chunks, None), chunks
+        admit, estimate = self._admission(messages, kwargs)
+        first, chunks = self.caller.call(attempt, hedge=False, before_attempt=admit)
+        if first is not None:
+            yield first
+            usage = first.message.usage_metadata
+            for chunk in chunks:
+                usage = add_usage(usage, chunk.message.usage_metadata)
+                yield chunk
+            self._settle(estimate, usage)
+    
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[Any] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        async def attempt():
+            chunks = self.model._astream(messages, stop=stop, **kwargs)
+            return await anext(chunks, None), chunks
+        admit, estimate = self._aadmission(messages, kwargs)
+        first, chunks = await self.caller.acall(attempt, hedge=False, before_attempt=admit)
+        if first is not None:
+            yield first
+            usage = first.message.usage_metadata
+            async for chunk in chunks:
+                usage = add_usage(usage, chunk.message.usage_metadata)
+                yield chunk
+            self._settle(estimate, usage)
+    
+    def _inner_stream(self, messages: List[BaseMessage], stop: Optional[List[str]], **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        """Stream from the wrapped model, or emit its whole response as one chunk if it cannot stream."""
+        if type(self.model)._stream is not BaseChatModel._stream:
+            yield from self.model._stream(messages, stop=stop, **kwargs)
+            return
+        message = self.model._generate(messages, stop=stop, **kwargs).generations[0].message
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content=message.content,
+            additional_kwargs=message.additional_kwargs,
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+                for index, call in enumerate(getattr(message, "tool_calls", None) or [])
+            ]
+        ))
+
+class ModelLoadPolicy:
+    """
+    Decides when a model is overloaded: when requests queue up in its
+    scheduler, or its recent requests were slow. Latency is an exponentially
+    weighted average of successful non-streamed requests; it is forgotten
+    after a cooldown, so a model that is no longer called is tried again.
+    """
+    
+    def __init__(self, queue_depth: Optional[int] = MODEL_DOWNTIER_QUEUE_DEPTH,
+                 latency_seconds: Optional[float] = MODEL_DOWNTIER_LATENCY_SECONDS,
+                 cooldown_seconds: float = MODEL_DOWNTIER_COOLDOWN_SECONDS, smoothing: float = 0.2):
+        """
+        Initialize the policy.
+        
+        Args:
+            queue_depth: Waiting requests that count as overload; None ignores the queue
+            latency_seconds: Average latency that counts as overload; None ignores latency
+            cooldown_seconds: Age after which a model's latency is forgotten
+            smoothing: Weight of each new latency sample in the average
+        """
+        self.queue_depth = queue_depth
+        self.latency_seconds = latency_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.smoothing = smoothing
+        self._latency: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, model: ResilientChatModel, seconds: float):
+        """
+        Add a successful request's latency to the model's average.
+        
+        Args:
+            model: The model that answered
+            seconds: The request's duration, retries included
+        """
+        now = time.monotonic()
+        with self._lock:
+            average, updated = self._latency.get(model.model_key, (seconds, now))
+            if now - updated > self.cooldown_seconds:
+                average = seconds
+            self._latency[model.model_key] = (average + self.smoothing * (seconds - average), now)
+    
+    def latency(self, model: ResilientChatModel) -> Optional[float]:
+        """
+        Get the model's recent average latency.
+        
+        Args:
+            model: The model
+            
+        Returns:
+            Seconds, or None without a sample inside the cooldown
+        """
+        with self._lock:
+            average, updated = self._latency.get(model.model_key, (None, 0.0))
+        if average is None or time.monotonic() - updated > self.cooldown_seconds:
+            return None
+        return average
+    
+    def overloaded(self, model: ResilientChatModel) -> bool:
+        """
+        Decide whether requests should avoid the model for now.
+        
+        Args:
+            model: The model
+            
+        Returns:
+            True if its queue or its recent latency reached the policy's limits
+        """
+        if self.queue_depth is not None and model.scheduler is not None:
+            if model.scheduler.stats()["queue_depth"] >= self.queue_depth:
+                return True
+        latency = self.latency(model)
+        return self.latency_seconds is not None and latency is not None and latency >= self.latency_seconds
+
+class RoutedChatModel(BaseChatModel):
+    """
+    Chat model that answers each request with the first of several models
+    that succeeds. The next model is tried when one still fails with a
+    retryable error after its own retries, or its provider's circuit is open.
+    While the primary model is overloaded, the under-load model (a cheaper,
+    faster tier) is tried first.
+    
+    Tool bindings are made in the primary model's format and passed to
+    whichever model answers, so every model must accept OpenAI-style tools,
+    as the Groq and OpenAI-compatible clients do.
+    """
+    models: List[ResilientChatModel]
+    under_load: Optional[ResilientChatModel] = None
+    policy: ModelLoadPolicy
+    
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    @property
+    def _llm_type(self) -> str:
+        return "routed"
+    
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "models": [model.model_key for model in self.models],
+            "under_load": self.under_load.model_key if self.under_load else None,
+        }
+    
+    def _get_ls_params(self, stop: Optional[List[str]] = None, **kwargs: Any):
+        return self.models[0]._get_ls_params(stop=stop, **kwargs)
+    
+    def _should_stream(self, *, async_api: bool, run_manager: Optional[Any] = None, **kwargs: Any) -> bool:
+        return self.models[0]._should_stream(async_api=async_api, run_manager=run_manager, **kwargs)
+    
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable[LanguageModelInput, BaseMessage]:
+        """Bind tools in the primary model's format, keeping requests on the router."""
+        return self.bind(**self.models[0].bind_tools(tools, **kwargs).kwargs)
+    
+    def _order(self) -> List[ResilientChatModel]:
+        """The models to try for a request, in order."""
+        if self.under_load is not None and self.policy.overloaded(self.models[0]):
+            metrics.inc("llm_downtier_total", 1, {"model": self.models[0].model_key, "to": self.under_load.model_key})
+            return [self.under_load] + [model for model in self.models if model is not self.under_load]
+        return self.models
+    
+    @staticmethod
+    def _falls_back(error: BaseException) -> bool:
+        """Whether another model may answer where this error was raised."""
+        return isinstance(error, CircuitOpenError) or is_retryable(error)
+    
+    def _fell_back(self, failed: ResilientChatModel, following: ResilientChatModel, error: BaseException):
+        logger.warning(f"{failed.model_key} failed ({type(error).__name__}: {error}); falling back to {following.model_key}")
+        metrics.inc("llm_fallbacks_total", 1, {"model": failed.model_key, "to": following.model_key})
+    
+    @staticmethod
+    def _stamp(result: ChatResult, model: ResilientChatModel) -> ChatResult:
+        """Record which model answered, for tracing and cost estimates."""
+        for generation in result.generations:
+            generation.message.response_metadata.setdefault("model_name", model.model_name)
+        return result
+    
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        models = self._order()
+        for index, model in enumerate(models):
+            started = time.perf_counter()
+            try:
+                result = model._generate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                if index == len(models) - 1 or not self._falls_back(e):
+                    raise
+                self._fell_back(model, models[index + 1], e)
+                continue
+            self.policy.record(model, time.perf_counter() - started)
+            return self._stamp(result, model)
+    
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        models = self._order()
+        for index, model in enumerate(models):
+            started = time.perf_counter()
+            try:
+                result = await model._agenerate(messages, stop=stop, **kwargs)
+            except Exception as e:
+                if index == len(models) - 1 or not self._falls_back(e):
+                    raise
+                self._fell_back(model, models[index + 1], e)
+                continue
+            self.policy.record(model, time.perf_counter() - started)
+            return self._stamp(result, model)
+    
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[Any] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # A stream falls back only until its first chunk; later failures are raised
+        models = self._order()
+        for index, model in enumerate(models):
+            chunks = model._stream(messages, stop=stop, **kwargs)
+            try:
+                first = next(chunks, None)
+            except Exception as e:
+                if index == len(models) - 1 or not self._falls_back(e):
+                    raise
+                self._fell_back(model, models[index + 1], e)
+                continue
+            if first is not None:
+                yield first
+                yield from chunks
+            return
+    
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[Any] = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        models = self._order()
+        for index, model in enumerate(models):
+            chunks = model._astream(messages, stop=stop, **kwargs)
+            try:
+                first = await anext(chunks, None)
+            except Exception as e:
+                if index == len(models) - 1 or not self._falls_back(e):
+                    raise
+                self._fell_back(model, models[index + 1], e)
+                continue
+            if first is not None:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+            return
+
+class LLMFactory:
+    """
+    Factory class for creating the chat models used by agents.
+    Centralizes client construction so a single client (and its HTTP
+    connection pool) can be shared across all agents of a workflow.
+    
+    Every model it creates shares one process-wide response cache, so repeat
+    prompts are answered locally without a network call, and is wrapped in a
+    ResilientChatModel so requests get deadlines, retries and a circuit breaker.
+    Agents get their models from AGENT_MODELS, on any provider in LLM_PROVIDERS,
+    with fallbacks and an under-load tier routed by a shared ModelLoadPolicy.
+    """
+    _cache: Optional[LLMResponseCache] = None
+    _cache_lock = threading.Lock()
+    _models: Dict[str, ResilientChatModel] = {}
+    _models_lock = threading.Lock()
+    _client_creators: Dict[str, Callable[[str, Dict[str, Any], Optional[float]], BaseChatModel]] = {}
+    load_policy = ModelLoadPolicy()
+    
+    @classmethod
+    def get_cache(cls) -> Optional[LLMResponseCache]:
+        """
+        Get the shared response cache, creating it from settings on first use.
+        
+        Returns:
+            The response cache, or None if caching is disabled
+        """
+        if cls._cache is None and LLM_CACHE_BACKEND:
+            with cls._cache_lock:
+                if cls._cache is None:
+                    backend = create_cache_backend(
+                        LLM_CACHE_BACKEND, LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS
+                    )
+                    cls._cache = LLMResponseCache(backend, semantic_threshold=LLM_CACHE_SEMANTIC_THRESHOLD)
+        return cls._cache
+    
+    @classmethod
+    def set_cache(cls, cache: Optional[LLMResponseCache]):
+        """
+        Replace the shared response cache for models created afterwards.
+        
+        Args:
+            cache: The cache to use, or None to fall back to the settings
+        """
+        with cls._cache_lock:
+            cls._cache = cache
+    
+    @staticmethod
+    def parse_model_spec(spec: str) -> Tuple[str, str]:
+        """
+        Split a model spec into provider and model name.
+        
+        Args:
+            spec: "provider:model", or a bare model name of LLM_PROVIDER; a
+                prefix that is not a provider in LLM_PROVIDERS is part of the name
+                
+        Returns:
+            The provider and model name
+        """
+        provider, _, model = spec.partition(":")
+        if model and provider in LLM_PROVIDERS:
+            return provider, model
+        return LLM_PROVIDER, spec
+    
+    @classmethod
+    def register_client(cls, provider_type: str, creator: Optional[Callable[[str, Dict[str, Any], Optional[float]], BaseChatModel]]):
+        """
+        Replace how clients of a provider type are created, e.g. to inject a
+        stand-in client. Models created earlier are discarded.
+        
+        Args:
+            provider_type: A provider type from LLM_PROVIDERS, e.g. 'groq' or 'openai'
+            creator: Called with the model name, the provider's settings and the
+                request timeout, returning the client; None restores the built-in client
+        """
+        with cls._models_lock:
+            if creator is None:
+                cls._client_creators.pop(provider_type, None)
+            else:
+                cls._client_creators[provider_type] = creator
+            cls._models.clear()
+    
+    @classmethod
+    def create_client(cls, provider: str, model_name: str, timeout: Optional[float] = None) -> BaseChatModel:
+        """
+        Create a provider's chat client, without retries of its own.
+        
+        Args:
+            provider: A provider name from LLM_PROVIDERS
+            model_name: The provider's model name
+            timeout: Request timeout in seconds
+            
+        Returns:
+            The client
+            
+        Raises:
+            ValueError: If the provider or its type is unknown
+        """
+        config = LLM_PROVIDERS.get(provider)
+        if config is None:
+            raise ValueError(f"Unknown LLM provider {provider!r}; expected one of {sorted(LLM_PROVIDERS)}")
+        provider_type = config.get("type", provider)
+        if provider_type in cls._client_creators:
+            return cls._client_creators[provider_type](model_name, config, timeout)
+        api_key = getattr(get_settings(), config["api_key"]) if config.get("api_key") else None
+        
+        # Imported here, so a provider's SDK only loads once one of its clients is needed
+        if provider_type == "groq":
+            from langchain_groq import ChatGroq
+            return ChatGroq(groq_api_key=api_key, model_name=model_name, max_retries=0, request_timeout=timeout)
+        if provider_type == "openai":
+            from langchain_openai import ChatOpenAI
+            # Local OpenAI-compatible servers usually accept any key
+            return ChatOpenAI(api_key=api_key or "unused", base_url=config.get("base_url"), model=model_name,
+                              max_retries=0, timeout=timeout, stream_usage=True)
+        raise ValueError(f"Unknown type {provider_type!r} for LLM provider {provider!r}")
+    
+    @classmethod
+    def create_chat_model(cls, model_name: str = LLM_MODEL) -> ResilientChatModel:
+        """
+        Creates a provider client wrapped with the provider's resilience
+        policy, admitted by the model's request scheduler if a '<provider>'
+        or '<provider>:<model>' limit is configured, and backed by the shared
+        response cache.
+        
+        Args:
+            model_name: The model, as "provider:model" or a bare LLM_PROVIDER model name
+            
+        Returns:
+            Configured chat model
+        """
+        provider, model_name = cls.parse_model_spec(model_name)
+        
+        # Retries and deadlines are handled by the wrapper, not the provider SDK
+        caller = ResilientCaller(provider)
+        client = cls.create_client(provider, model_name, caller.policy.timeout)
+        return ResilientChatModel(
+            client, provider, caller=caller, scheduler=rate_limiters.get(provider, model_name), cache=cls.get_cache()
+        )
+    
+    @classmethod
+    def get_model(cls, spec: str) -> ResilientChatModel:
+        """
+        Get the shared chat model for a spec, creating it on first use, so
+        agents on the same model share one client and connection pool.
+        
+        Args:
+            spec: The model, as "provider:model" or a bare LLM_PROVIDER model name
+            
+        Returns:
+            The chat model
+        """
+        key = "{}:{}".format(*cls.parse_model_spec(spec))
+        with cls._models_lock:
+            if key not in cls._models:
+                cls._models[key] = cls.create_chat_model(key)
+            return cls._models[key]
+    
+    @classmethod
+    def create_agent_model(cls, agent: str) -> BaseChatModel:
+        """
+        Create the chat model for an agent from AGENT_MODELS.
+        
+        Args:
+            agent: The agent name, e.g. 'supervisor'
+            
+        Returns:
+            The agent's model, or a RoutedChatModel over it when fallbacks or
+            an under-load model are configured
+        """
+        config = {**AGENT_MODELS.get("default", {}), **AGENT_MODELS.get(agent, {})}
+        models = []
+        for spec in [config.get("model") or LLM_MODEL, *(config.get("fallbacks") or ())]:
+            model = cls.get_model(spec)
+            if all(model is not other for other in models):
+                models.append(model)
+        under_load = cls.get_model(config["under_load"]) if config.get("under_load") else None
+        if under_load is models[0]:
+            under_load = None
+        
+        if len(models) == 1 and under_load is None:
+            return models[0]
+        return RoutedChatModel(models=models, under_load=under_load, policy=cls.load_policy, cache=cls.get_cache())
@@ -20,4 +20,16 @@ class Validator(BaseModel):
     )
     reason: str = Field(
         description="The reason for the decision."
-    )
\ No newline at end of file
+    )
+
+class Decision(BaseModel):
+    """Model for fused decisions: accept the latest answer, or route the next step."""
+    next: Literal["FINISH", "enhancer", "researcher", "coder"] = Field(
+        description="'FINISH' if the latest answer fully resolves the user's question; otherwise the next worker: "
+                    "'enhancer' to clarify a vague question, "
+                    "'researcher' for additional information gathering, "
+                    "'coder' for calculations or technical problems."
+    )
+    reason: str = Field(
+        description="The reason for the decision: what the answer gets right or lacks, and why the chosen worker."
+    )
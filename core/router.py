@@ -0,0 +1,206 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple, get_args
+
+from core.models import Supervisor
+from utils.logger import logger
+
+# Routing labels the supervisor can choose from
+ROUTE_LABELS = get_args(Supervisor.model_fields["next"].annotation)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# (label, pattern, weight) rules; weights are combined per label with a noisy-or
+DEFAULT_RULES: List[Tuple[str, str, float]] = [
+    # Bare arithmetic such as "12 * (3 + 4)" or "what is 2^10?"
+    ("coder", r"^\s*(what\s+is|what's|calculate|compute|evaluate)?\s*[\d\s.,+\-*/^%()x×÷=]*\d[\d\s.,+\-*/^%()x×÷=]*\??\s*$", 0.95),
+    ("coder", r"\b(calculate|compute|evaluate|solve|simplify|integrate|differentiate|derivative|factorial|square root|sqrt|prime factor)\b", 0.8),
+    ("coder", r"\b(python|code|script|function|algorithm|regex|sort|json)\b", 0.6),
+    ("coder", r"\d+(\.\d+)?\s*(%|percent)\s+of\s+\d", 0.85),
+    ("coder", r"\b(difference between|how much (more|less)|percentage change|growth rate|ratio of|average of|compare)\b", 0.6),
+    ("researcher", r"\b(latest|news|today|current|currently|recent|as of)\b", 0.7),
+    ("researcher", r"^\s*(who|when|where)\b", 0.75),
+    ("researcher", r"\b(stock price|share price|weather|population|capital of|ceo of|president of|founded|headquarter)", 0.8),
+    ("researcher", r"\b(history of|tell me about|information about|look up|search for)\b", 0.7),
+]
+
+class NaiveBayesClassifier:
+    """
+    Lightweight multinomial Naive Bayes text classifier over the supervisor's
+    routing labels, trained locally from labelled example queries.
+    """
+    
+    def __init__(self, alpha: float = 1.0):
+        """
+        Initialize an untrained classifier.
+        
+        Args:
+            alpha: Additive smoothing for word counts
+        """
+        self.alpha = alpha
+        self.label_counts: Counter = Counter()
+        self.word_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.vocabulary = set()
+    
+    def fit(self, examples: Iterable[Tuple[str, str]]) -> 'NaiveBayesClassifier':
+        """
+        Train on (text, label) examples.
+        
+        Args:
+            examples: Labelled example queries
+            
+        Returns:
+            Self for method chaining
+        """
+        for text, label in examples:
+            tokens = _TOKEN_PATTERN.findall(text.lower())
+            self.label_counts[label] += 1
+            self.word_counts[label].update(tokens)
+            self.vocabulary.update(tokens)
+        return self
+    
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """
+        Compute label probabilities for a text.
+        
+        Args:
+            text: The query to classify
+            
+        Returns:
+            A probability per trained label, or an empty dict if untrained
+        """
+        if not self.label_counts:
+            return {}
+        
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        total = sum(self.label_counts.values())
+        vocabulary_size = len(self.vocabulary)
+        log_scores = {}
+        for label, count in self.label_counts.items():
+            words = self.word_counts[label]
+            denominator = sum(words.values()) + self.alpha * vocabulary_size
+            log_scores[label] = math.log(count / total) + sum(
+                math.log((words[token] + self.alpha) / denominator) for token in tokens
+            )
+        
+        peak = max(log_scores.values())
+        exp_scores = {label: math.exp(score - peak) for label, score in log_scores.items()}
+        norm = sum(exp_scores.values())
+        return {label: score / norm for label, score in exp_scores.items()}
+
+class FastPathRouter:
+    """
+    Deterministic pre-router in front of the supervisor LLM.
+    Scores the query against regex rules (and an optional local classifier)
+    and short-circuits routing when the top label's confidence clears the
+    threshold; otherwise the supervisor falls back to its LLM call.
+    """
+    
+    def __init__(self, threshold: float = 0.75, rules: Optional[List[Tuple[str, str, float]]] = None,
+                 classifier: Optional[NaiveBayesClassifier] = None):
+        """
+        Initialize the router.
+        
+        Args:
+            threshold: Minimum confidence needed to skip the LLM call
+            rules: (label, pattern, weight) rules; defaults to DEFAULT_RULES
+            classifier: Optional trained classifier blended with the rule scores
+        """
+        self.threshold = threshold
+        self.rules = [
+            (label, re.compile(pattern, re.IGNORECASE), weight)
+            for label, pattern, weight in (rules if rules is not None else DEFAULT_RULES)
+        ]
+        self.classifier = classifier
+        self._lock = threading.Lock()
+        self.routed = 0
+        self.fallbacks = 0
+        self._llm_latency = None
+    
+    def scores(self, query: str) -> Dict[str, float]:
+        """
+        Score every routing label for a query.
+        
+        Args:
+            query: The user query
+            
+        Returns:
+            A score in [0, 1] per routing label
+        """
+        misses = {label: 1.0 for label in ROUTE_LABELS}
+        for label, pattern, weight in self.rules:
+            if pattern.search(query):
+                misses[label] *= 1.0 - weight
+        scores = {label: 1.0 - miss for label, miss in misses.items()}
+        
+        if self.classifier is not None:
+            probabilities = self.classifier.predict_proba(query)
+            if probabilities:
+                scores = {label: (score + probabilities.get(label, 0.0)) / 2 for label, score in scores.items()}
+        
+        return scores
+    
+    def route(self, query: str) -> Optional[Tuple[str, float]]:
+        """
+        Decide the route for a query if the decision is obvious.
+        
+        Args:
+            query: The user query
+            
+        Returns:
+            The label and its confidence, or None to defer to the LLM
+        """
+        ranked = sorted(self.scores(query).items(), key=lambda item: item[1], reverse=True)
+        (label, top), (_, runner_up) = ranked[0], ranked[1]
+        confidence = top * (1.0 - runner_up)
+        
+        with self._lock:
+            if confidence < self.threshold:
+                self.fallbacks += 1
+                return None
+            self.routed += 1
+        
+        logger.info(
+            f"Fast router: '{label}' (confidence {confidence:.2f}); "
+            f"saved {self.routed} routing calls, ~{self.saved_latency():.2f}s so far"
+        )
+        return label, confidence
+    
+    def record_llm_latency(self, seconds: float):
+        """
+        Record the latency of a routing decision made by the LLM, used to
+        estimate the time the fast path saves.
+        
+        Args:
+            seconds: Duration of the supervisor LLM call
+        """
+        with self._lock:
+            if self._llm_latency is None:
+                self._llm_latency = seconds
+            else:
+                self._llm_latency = 0.8 * self._llm_latency + 0.2 * seconds
+    
+    def saved_latency(self) -> float:
+        """
+        Estimate the total latency saved by skipped routing calls.
+        
+        Returns:
+            Seconds saved, based on the moving average of LLM routing latency
+        """
+        return self.routed * (self._llm_latency or 0.0)
+    
+    def stats(self) -> Dict[str, float]:
+        """
+        Get the router counters.
+        
+        Returns:
+            Calls saved, LLM fallbacks, average LLM routing latency and estimated seconds saved
+        """
+        return {
+            "saved_calls": self.routed,
+            "llm_fallbacks": self.fallbacks,
+            "llm_latency_seconds": self._llm_latency or 0.0,
+            "saved_latency_seconds": self.saved_latency(),
+        }
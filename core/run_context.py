@@ -0,0 +1,120 @@
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from core.budget import BudgetTracker, RunBudget
+from utils.tracing import Trace, TracingCallbackHandler
+
+_current_run: ContextVar[Optional['RunContext']] = ContextVar("current_run", default=None)
+
+class RunContext:
+    """
+    Per-run state shared by every agent of a single workflow execution.
+    It travels in the graph config under configurable['run_context'], and
+    agents make it available to nested code through RunContext.current().
+    """
+    
+    def __init__(self, budget: Optional[RunBudget] = None, run_id: Optional[str] = None,
+                 thread_id: Optional[str] = None):
+        """
+        Initialize the run context.
+        
+        Args:
+            budget: The limits for this run; defaults from settings
+            run_id: Identifier of the run; generated if omitted
+            thread_id: Checkpoint thread the run reads and writes, if checkpointing
+        """
+        self.run_id = run_id or uuid.uuid4().hex
+        self.thread_id = thread_id
+        self.budget = BudgetTracker(budget)
+        self.trace = Trace(self.run_id)
+        self.metrics: Dict[str, float] = defaultdict(float)
+        self.answer_cache: Optional[str] = None
+        self._lock = threading.Lock()
+    
+    def record(self, name: str, value: float = 1):
+        """
+        Add to one of the run's metric counters.
+        
+        Args:
+            name: The metric name
+            value: The amount to add
+        """
+        with self._lock:
+            self.metrics[name] += value
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the run's resource usage.
+        
+        Returns:
+            The run id, budget usage, whole-run answer cache outcome ('hit',
+            'coalesced', 'miss', or None if not cached), metric counters, and
+            per-agent timings with LLM/tool/cache totals from the trace
+        """
+        return {"run_id": self.run_id, "thread_id": self.thread_id, **self.budget.usage(),
+                "answer_cache": self.answer_cache, **self.metrics, **self.trace.summary()}
+    
+    def callbacks(self) -> List[Any]:
+        """
+        Get the callback handlers to attach to the run.
+        
+        Returns:
+            Handlers that observe every LLM and tool call of the run
+        """
+        return [self.budget, TracingCallbackHandler(self.trace)]
+    
+    def config(self) -> RunnableConfig:
+        """
+        Build the graph config for this run.
+        
+        Returns:
+            A config carrying the run context, its checkpoint thread, its
+            callbacks and a recursion limit as a backstop behind the hop budget
+        """
+        config: RunnableConfig = {
+            "configurable": {"run_context": self},
+            "callbacks": self.callbacks(),
+        }
+        if self.thread_id is not None:
+            config["configurable"]["thread_id"] = self.thread_id
+        if self.budget.budget.max_hops is not None:
+            config["recursion_limit"] = self.budget.budget.max_hops + 5
+        return config
+    
+    @staticmethod
+    def from_config(config: Optional[RunnableConfig]) -> Optional['RunContext']:
+        """
+        Get the run context carried by a graph config.
+        
+        Args:
+            config: The config passed to a node
+            
+        Returns:
+            The run context, or None if the graph was invoked without one
+        """
+        return ((config or {}).get("configurable") or {}).get("run_context")
+    
+    @staticmethod
+    def current() -> Optional['RunContext']:
+        """
+        Get the run context of the agent currently executing.
+        
+        Returns:
+            The active run context, or None outside a run
+        """
+        return _current_run.get()
+    
+    @contextmanager
+    def activate(self) -> Iterator['RunContext']:
+        """Make this the current run context for the duration of the block."""
+        token = _current_run.set(self)
+        try:
+            yield self
+        finally:
+            _current_run.reset(token)
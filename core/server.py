@@ -0,0 +1,516 @@
+import asyncio
+import json
+import signal
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from core.budget import RunBudget
+from core.state import WorkflowState
+from core.workflow import WorkflowManager
+from config.settings import (
+    SERVER_HOST,
+    SERVER_PORT,
+    SERVER_MAX_IN_FLIGHT,
+    SERVER_MAX_QUEUE,
+    SERVER_QUEUE_TIMEOUT_SECONDS,
+    SERVER_DRAIN_SECONDS,
+    SERVER_KEEPALIVE_SECONDS,
+    SERVER_MAX_BODY_BYTES
+)
+from utils.logger import logger
+from utils.metrics import metrics
+
+_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 408: "Request Timeout",
+    411: "Length Required", 413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+    501: "Not Implemented", 503: "Service Unavailable",
+}
+
+_BUDGET_FIELDS = ("max_hops", "max_tokens", "max_seconds", "max_tool_calls")
+
+class HTTPError(Exception):
+    """An error answered with an HTTP status and a JSON body."""
+    
+    def __init__(self, status: int, message: str, headers: Optional[Dict[str, str]] = None):
+        """
+        Initialize the error.
+        
+        Args:
+            status: The HTTP status code
+            message: Description returned to the client
+            headers: Extra response headers, e.g. Retry-After
+        """
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+class Request:
+    """A parsed HTTP request."""
+    
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str], body: bytes):
+        """
+        Initialize the request.
+        
+        Args:
+            method: The HTTP method
+            target: The request target, path plus query string
+            version: The HTTP version, e.g. 'HTTP/1.1'
+            headers: Headers with lower-cased names
+            body: The request body
+        """
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.version = version
+        self.headers = headers
+        self.body = body
+    
+    @property
+    def keep_alive(self) -> bool:
+        connection = self.headers.get("connection", "").lower()
+        if self.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+    
+    def json(self) -> Dict[str, Any]:
+        """
+        Decode the body as a JSON object.
+        
+        Returns:
+            The decoded object
+        """
+        try:
+            payload = json.loads(self.body or b"{}")
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise HTTPError(400, f"Invalid JSON body: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "The JSON body must be an object")
+        return payload
+
+def to_jsonable(value: Any) -> Any:
+    """
+    Convert graph state and stream events to JSON-serializable values.
+    
+    Args:
+        value: A state update, event or part of one
+        
+    Returns:
+        The value with messages turned into dictionaries
+    """
+    if isinstance(value, BaseMessage):
+        message = {"type": value.type, "name": value.name, "content": value.content}
+        if getattr(value, "tool_calls", None):
+            message["tool_calls"] = value.tool_calls
+        return message
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+class WorkflowServer:
+    """
+    Long-running HTTP server answering queries with one shared WorkflowManager.
+    
+    Endpoints:
+        POST /v1/query   JSON request/response: {"query", "thread_id"?, "resume"?, "budget"?}
+        POST /v1/stream  Server-sent events mirroring WorkflowManager.stream; the
+                         body also takes "mode" ('updates' or 'tokens')
+        GET  /healthz    Liveness: the process is serving
+        GET  /readyz     Readiness: the graph is built and the server is not draining or saturated
+        GET  /metrics    Prometheus metrics
+        
+    At most max_in_flight runs execute at once; up to max_queue more wait for
+    a slot, and requests beyond that are refused with 429 and Retry-After. On
+    shutdown the server stops accepting connections, lets runs in progress
+    finish for up to drain_seconds, then cancels the rest.
+    """
+    
+    def __init__(self, workflow: Optional[WorkflowManager] = None, host: str = SERVER_HOST, port: int = SERVER_PORT,
+                 max_in_flight: int = SERVER_MAX_IN_FLIGHT, max_queue: int = SERVER_MAX_QUEUE,
+                 queue_timeout: float = SERVER_QUEUE_TIMEOUT_SECONDS, drain_seconds: float = SERVER_DRAIN_SECONDS):
+        """
+        Initialize the server.
+        
+        Args:
+            workflow: The workflow to serve; defaults to the shared instance
+            host: The interface to bind
+            port: The port to listen on (0 picks a free port)
+            max_in_flight: Runs executed concurrently
+            max_queue: Requests allowed to wait for a run slot
+            queue_timeout: Seconds a request may wait for a slot before a 503
+            drain_seconds: Seconds runs in progress get to finish on shutdown
+        """
+        self.workflow = workflow
+        self.host = host
+        self.port = port
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.drain_seconds = drain_seconds
+        self.ready = False
+        self.draining = False
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._admitted = 0
+        self._running = 0
+        self._connections: Set[asyncio.Task] = set()
+        self._busy: Set[asyncio.Task] = set()
+        self._stopped: Optional[asyncio.Event] = None
+    
+    async def start(self) -> 'WorkflowServer':
+        """
+        Build the workflow and start listening.
+        
+        Returns:
+            Self, with port set to the bound port
+        """
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._stopped = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        
+        # Liveness is answered while the graph compiles; readiness waits for it
+        if self.workflow is None:
+            self.workflow = await asyncio.to_thread(WorkflowManager.shared)
+        else:
+            await asyncio.to_thread(self.workflow._ensure_graph)
+        self.ready = True
+        logger.info(f"Serving workflow at http://{self.host}:{self.port}")
+        return self
+    
+    async def serve_forever(self):
+        """Serve until SIGINT/SIGTERM or stop(), then drain."""
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stopped.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        await self._stopped.wait()
+        await self.shutdown()
+    
+    def run(self):
+        """Serve from a new event loop until interrupted."""
+        asyncio.run(self.serve_forever())
+    
+    def stop(self):
+        """Ask serve_forever() to drain and return."""
+        if self._stopped is not None:
+            self._stopped.set()
+    
+    async def shutdown(self):
+        """Stop accepting connections and drain the requests in progress."""
+        if self.draining:
+            return
+        self.draining = True
+        self.ready = False
+        if self._server is not None:
+            self._server.close()
+        
+        # Idle keep-alive connections have nothing to finish
+        for task in self._connections - self._busy:
+            task.cancel()
+        
+        busy = set(self._busy)
+        if busy:
+            logger.info(f"Draining {len(busy)} request(s) for up to {self.drain_seconds:g}s")
+            _, pending = await asyncio.wait(busy, timeout=self.drain_seconds)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"Cancelled {len(pending)} request(s) still running after the drain period")
+                await asyncio.wait(pending)
+        if self._server is not None:
+            await self._server.wait_closed()
+        logger.info("Server stopped")
+    
+    @asynccontextmanager
+    async def _admission(self) -> AsyncIterator[None]:
+        """Hold a run slot for the block, queueing for one or refusing when saturated."""
+        if self.draining:
+            raise HTTPError(503, "Server is shutting down", {"Connection": "close"})
+        if not self.ready:
+            raise HTTPError(503, "Server is starting", {"Retry-After": "1"})
+        if self._admitted >= self.max_in_flight + self.max_queue:
+            metrics.inc("server_rejected_total", 1, {"reason": "queue_full"})
+            raise HTTPError(429, "Too many requests queued", {"Retry-After": "1"})
+        
+        self._admitted += 1
+        metrics.gauge("server_queued", self._admitted - self._running)
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                metrics.inc("server_rejected_total", 1, {"reason": "queue_timeout"})
+                raise HTTPError(503, "Timed out waiting for a free run slot", {"Retry-After": "1"})
+            self._running += 1
+            metrics.gauge("server_in_flight", self._running)
+            metrics.gauge("server_queued", self._admitted - self._running)
+            try:
+                yield
+            finally:
+                self._running -= 1
+                self._slots.release()
+                metrics.gauge("server_in_flight", self._running)
+        finally:
+            self._admitted -= 1
+            metrics.gauge("server_queued", self._admitted - self._running)
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve the requests of one connection until it closes."""
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while not self.draining:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader, writer), SERVER_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    break
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                
+                self._busy.add(task)
+                try:
+                    keep_alive = await self._dispatch(request, writer)
+                finally:
+                    self._busy.discard(task)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(task)
+            writer.close()
+    
+    async def _read_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> Optional[Request]:
+        """
+        Read one request from a connection.
+        
+        Returns:
+            The request, or None if the client closed the connection
+        """
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(411, "Chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > SERVER_MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body exceeds {SERVER_MAX_BODY_BYTES} bytes")
+        if length and headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target, version, headers, body)
+    
+    async def _dispatch(self, request: Request, writer: asyncio.StreamWriter) -> bool:
+        """
+        Route a request and write its response.
+        
+        Returns:
+            Whether the connection can serve another request
+        """
+        routes = {
+            ("GET", "/healthz"): self._healthz,
+            ("GET", "/readyz"): self._readyz,
+            ("GET", "/metrics"): self._metrics,
+            ("POST", "/v1/query"): self._query,
+            ("POST", "/v1/stream"): self._stream,
+        }
+        start = time.perf_counter()
+        handler = routes.get((request.method, request.path))
+        keep_alive = request.keep_alive and not self.draining
+        status = 200
+        try:
+            if handler is None:
+                allowed = any(path == request.path for _, path in routes)
+                raise HTTPError(405 if allowed else 404, f"No route for {request.method} {request.path}")
+            if handler == self._stream:
+                # Events are written as they arrive; the stream ends with the connection
+                await self._stream(request, writer)
+                keep_alive = False
+            else:
+                status, payload = await handler(request)
+                if isinstance(payload, str):
+                    await self._send(writer, status, payload.encode("utf-8"),
+                                     "text/plain; version=0.0.4; charset=utf-8", keep_alive)
+                else:
+                    await self._send_json(writer, status, payload, keep_alive)
+        except HTTPError as e:
+            status = e.status
+            keep_alive = keep_alive and e.headers.get("Connection") != "close"
+            await self._send_json(writer, e.status, {"error": e.message}, keep_alive, e.headers)
+        except Exception as e:
+            status = 500
+            logger.error(f"Server error on {request.method} {request.path}: {e}", exc_info=True)
+            await self._send_json(writer, 500, {"error": str(e)}, keep_alive=False)
+            keep_alive = False
+        finally:
+            labels = {"route": request.path if handler is not None else "unmatched"}
+            metrics.inc("server_requests_total", 1, {**labels, "status": str(status)})
+            metrics.observe("server_request_seconds", time.perf_counter() - start, labels)
+        return keep_alive
+    
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, status: int, body: bytes, content_type: str,
+                    keep_alive: bool, headers: Optional[Dict[str, str]] = None):
+        """Write a complete response."""
+        lines = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items() if name != "Connection"]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+    
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool,
+                         headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await self._send(writer, status, body, "application/json", keep_alive, headers)
+    
+    async def _healthz(self, request: Request) -> Tuple[int, Dict[str, Any]]:
+        return 200, {"status": "ok"}
+    
+    async def _readyz(self, request: Request) -> Tuple[int, Dict[str, Any]]:
+        saturated = self._admitted >= self.max_in_flight + self.max_queue
+        status = {
+            "ready": self.ready and not self.draining and not saturated,
+            "draining": self.draining,
+            "in_flight": self._running,
+            "queued": self._admitted - self._running,
+        }
+        return (200 if status["ready"] else 503), status
+    
+    async def _metrics(self, request: Request) -> Tuple[int, str]:
+        return 200, metrics.render_prometheus()
+    
+    @staticmethod
+    def _run_arguments(payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate a query body and convert it to WorkflowManager arguments.
+        
+        Args:
+            payload: The decoded request body
+            
+        Returns:
+            Keyword arguments for run/stream
+        """
+        query = payload.get("query")
+        resume = payload.get("resume", False)
+        thread_id = payload.get("thread_id")
+        if not isinstance(resume, bool):
+            raise HTTPError(400, "'resume' must be a boolean")
+        if not resume and (not isinstance(query, str) or not query.strip()):
+            raise HTTPError(400, "'query' must be a non-empty string")
+        if thread_id is not None and not isinstance(thread_id, str):
+            raise HTTPError(400, "'thread_id' must be a string")
+        
+        budget = None
+        if payload.get("budget") is not None:
+            limits = payload["budget"]
+            if not isinstance(limits, dict) or set(limits) - set(_BUDGET_FIELDS):
+                raise HTTPError(400, f"'budget' may only set {', '.join(_BUDGET_FIELDS)}")
+            budget = RunBudget(**limits)
+        return {"user_query": query, "budget": budget, "thread_id": thread_id, "resume": resume}
+    
+    async def _query(self, request: Request) -> Tuple[int, Dict[str, Any]]:
+        """Run a query to completion and return its answer and run summary."""
+        arguments = self._run_arguments(request.json())
+        async with self._admission():
+            try:
+                result = await self.workflow.arun(with_summary=True, **arguments)
+            except ValueError as e:
+                raise HTTPError(400, str(e))
+        summary = result["run_summary"]
+        return 200, {
+            "answer": WorkflowState.get_final_answer(result),
+            "termination_reason": result.get("termination_reason"),
+            "thread_id": summary.get("thread_id"),
+            "run_summary": to_jsonable(summary),
+        }
+    
+    async def _stream(self, request: Request, writer: asyncio.StreamWriter):
+        """Stream a run as server-sent events, ending with an 'end' or 'error' event."""
+        payload = request.json()
+        arguments = self._run_arguments(payload)
+        mode = payload.get("mode", "updates")
+        if mode not in ("updates", "tokens"):
+            raise HTTPError(400, "'mode' must be 'updates' or 'tokens'")
+        
+        async with self._admission():
+            writer.write((
+                "HTTP/1.1 200 OK\r\n"
+                "Content-Type: text/event-stream\r\n"
+                "Cache-Control: no-cache\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1"))
+            await writer.drain()
+            
+            # Collect the messages so the final answer can be reported as for /v1/query
+            state = {"messages": [HumanMessage(content=arguments["user_query"])] if arguments["user_query"] else []}
+            termination_reason = None
+            events = self.workflow.astream(mode=mode, **arguments)
+            try:
+                async for event in events:
+                    if mode == "tokens":
+                        updates = [event["update"]] if event["event"] == "update" else []
+                    else:
+                        updates = list(event.values())
+                    for update in updates:
+                        if isinstance(update, dict):
+                            state["messages"].extend(update.get("messages", []))
+                            termination_reason = update.get("termination_reason", termination_reason)
+                    
+                    if mode == "tokens":
+                        await self._send_event(writer, event["event"], to_jsonable(event))
+                    else:
+                        for node, update in event.items():
+                            await self._send_event(writer, "update", {"node": node, "update": to_jsonable(update)})
+                
+                answer = WorkflowState.get_final_answer(state) if state["messages"] else ""
+                await self._send_event(writer, "end", {"answer": answer, "termination_reason": termination_reason})
+            except (ConnectionError, asyncio.CancelledError):
+                # The client left or the drain period ran out; stop the run with it
+                await events.aclose()
+                raise
+            except Exception as e:
+                logger.error(f"Streamed run failed: {e}", exc_info=True)
+                await self._send_event(writer, "error", {"error": str(e)})
+    
+    @staticmethod
+    async def _send_event(writer: asyncio.StreamWriter, name: str, data: Dict[str, Any]):
+        """Write one server-sent event."""
+        writer.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+        await writer.drain()
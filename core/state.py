@@ -1,5 +1,13 @@
+from langchain_core.messages import BaseMessage, HumanMessage
 from langgraph.graph import MessagesState
 
+# Nodes whose messages carry an answer to the user's question
+ANSWER_NODES = ("researcher", "coder", "speculator")
+
+class WorkflowGraphState(MessagesState):
+    """Graph state: the message history plus why the run ended."""
+    termination_reason: str
+
 class WorkflowState:
     """
     Manages the state of the workflow, providing a consistent interface
@@ -10,6 +18,8 @@ class WorkflowState:
     def create_initial_state(user_query: str) -> dict:
         """
         Creates the initial state for the workflow with a user query.
+        On a checkpointed thread the message is appended to the conversation,
+        and the previous run's termination reason is cleared.
         
         Args:
             user_query: The initial query from the user
@@ -20,21 +30,33 @@ class WorkflowState:
         return {
             "messages": [
                 ("user", user_query),
-            ]
+            ],
+            "termination_reason": "",
         }
     
+    @staticmethod
+    def _question_index(messages: list) -> int:
+        """Index of the latest message from the user; agents name their own human messages."""
+        for index in range(len(messages) - 1, -1, -1):
+            message = messages[index]
+            if isinstance(message, HumanMessage) and not message.name:
+                return index
+        return 0
+    
     @staticmethod
     def get_user_question(state: MessagesState) -> str:
         """
-        Extracts the user's original question from the state.
+        Extracts the user's current question from the state, which is the
+        latest one when a conversation continues over several runs.
         
         Args:
             state: The current workflow state
             
         Returns:
-            The user's original question as a string
+            The user's question as a string
         """
-        return state["messages"][0].content
+        messages = state["messages"]
+        return messages[WorkflowState._question_index(messages)].content
     
     @staticmethod
     def get_last_response(state: MessagesState) -> str:
@@ -47,4 +69,26 @@ class WorkflowState:
         Returns:
             The last response in the state as a string
         """
-        return state["messages"][-1].content
\ No newline at end of file
+        return state["messages"][-1].content
+    
+    @staticmethod
+    def get_final_answer(state: MessagesState) -> str:
+        """
+        Extracts the final answer from a completed workflow state.
+        
+        Args:
+            state: The final workflow state
+            
+        Returns:
+            The content of the last answering agent's message; if no agent
+            answered, the notice of a run stopped early or the message before
+            the validator's verdict
+        """
+        messages = state["messages"]
+        turn: list[BaseMessage] = messages[WorkflowState._question_index(messages):]
+        for message in reversed(turn):
+            if getattr(message, "name", None) in ANSWER_NODES:
+                return message.content
+        if getattr(messages[-1], "name", None) == "terminated":
+            return messages[-1].content
+        return messages[-2].content if len(messages) > 1 else messages[-1].content
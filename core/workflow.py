@@ -1,30 +1,126 @@
-from typing import Dict, Any, Generator
-from langgraph.graph import StateGraph, START, END, MessagesState
+import asyncio
+import threading
+import weakref
+from typing import Dict, Any, AsyncGenerator, Generator, Iterator, Optional, Tuple, Union
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.graph import StateGraph, START, END
 
 from agents import (
     SupervisorAgent,
     EnhancerAgent,
     ResearcherAgent,
     CoderAgent,
-    ValidatorAgent
+    ValidatorAgent,
+    DeciderAgent,
+    SpeculatorAgent
 )
-from core.state import WorkflowState
+from core.answer_cache import AnswerCache
+from core.budget import RunBudget
+from core.checkpoint import create_checkpointer
+from core.run_context import RunContext
+from core.state import ANSWER_NODES, WorkflowState, WorkflowGraphState
+from config import settings
+from config.settings import (
+    ANSWER_CACHE_BACKEND,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_PATH,
+    ANSWER_CACHE_TTL_SECONDS,
+    ANSWER_CACHE_VERSION,
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_PATH,
+    FUSED_DECIDER_ENABLED,
+    MAX_CONCURRENT_WORKFLOWS,
+    SPECULATIVE_FANOUT_ENABLED,
+    STREAM_TOKEN_NODES,
+    TRACE_JSONL_PATH
+)
+from utils.cache import create_cache_backend
 from utils.logger import logger
+from utils.tracing import JsonlTraceExporter
 
 class WorkflowManager:
     """
     Manages the workflow graph construction and execution.
     Implements the Builder pattern for constructing the workflow graph.
+    
+    A compiled workflow holds no per-query state, so one instance can be
+    shared by concurrent callers; use WorkflowManager.shared() to get the
+    process-wide instance. run() and arun() answer repeated queries from the
+    answer cache, and identical concurrent queries share one graph execution.
     """
+    _instance = None
+    _instance_lock = threading.Lock()
     
-    def __init__(self):
-        """Initialize the workflow manager with agent instances."""
-        self.supervisor = SupervisorAgent()
-        self.enhancer = EnhancerAgent()
-        self.researcher = ResearcherAgent()
-        self.coder = CoderAgent()
-        self.validator = ValidatorAgent()
+    def __init__(self, llm: Optional[BaseChatModel] = None, max_concurrency: int = MAX_CONCURRENT_WORKFLOWS,
+                 trace_exporter: Optional[JsonlTraceExporter] = None,
+                 checkpointer: Optional[BaseCheckpointSaver] = None,
+                 speculative: bool = SPECULATIVE_FANOUT_ENABLED, fused: bool = FUSED_DECIDER_ENABLED,
+                 answer_cache: Optional[AnswerCache] = None):
+        """
+        Initialize the workflow manager with agent instances.
+        
+        Args:
+            llm: Optional chat model shared by all agents; if omitted each agent
+                uses its model from AGENT_MODELS
+            max_concurrency: Maximum async runs in flight at once on an event loop
+            trace_exporter: Where finished runs' spans are written; defaults to
+                TRACE_JSONL_PATH when that is set
+            checkpointer: Where graph state is saved after every node; defaults
+                to the CHECKPOINT_BACKEND setting
+            speculative: Add a speculator node that runs researcher and coder
+                in parallel for queries that need both
+            fused: Review answers with a decider node that also picks the next
+                worker, instead of the validator handing back to the supervisor
+            answer_cache: Where whole-run results are cached; defaults to the
+                ANSWER_CACHE_BACKEND setting
+        """
+        self.llm = llm
+        self.supervisor = SupervisorAgent(llm, speculative=speculative)
+        self.enhancer = EnhancerAgent(llm)
+        self.researcher = ResearcherAgent(llm)
+        self.coder = CoderAgent(llm)
+        self.validator = None if fused else ValidatorAgent(llm)
+        self.decider = DeciderAgent(llm) if fused else None
+        self.speculator = SpeculatorAgent([self.researcher, self.coder], llm) if speculative else None
+        
+        # Answering agents hand their answers to whichever node reviews them
+        reviewer = "decider" if fused else "validator"
+        for agent in (self.researcher, self.coder, self.speculator):
+            if agent is not None:
+                agent.handoff = reviewer
         self.graph = None
+        self._build_lock = threading.Lock()
+        self.max_concurrency = max_concurrency
+        self._semaphores = weakref.WeakKeyDictionary()
+        if trace_exporter is None and TRACE_JSONL_PATH:
+            trace_exporter = JsonlTraceExporter(TRACE_JSONL_PATH)
+        self.trace_exporter = trace_exporter
+        if checkpointer is None:
+            checkpointer = create_checkpointer(CHECKPOINT_BACKEND, CHECKPOINT_PATH)
+        self.checkpointer = checkpointer
+        if answer_cache is None:
+            backend = create_cache_backend(
+                ANSWER_CACHE_BACKEND, ANSWER_CACHE_PATH, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL_SECONDS
+            )
+            answer_cache = AnswerCache(backend) if backend is not None else None
+        self.answer_cache = answer_cache
+        self._config_version: Optional[str] = None
+    
+    @classmethod
+    def shared(cls) -> 'WorkflowManager':
+        """
+        Get the process-wide workflow manager, creating and compiling it on first use.
+        
+        Returns:
+            The shared WorkflowManager with its graph already built
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls().build_graph()
+        return cls._instance
     
     def build_graph(self) -> 'WorkflowManager':
         """
@@ -34,61 +130,369 @@ class WorkflowManager:
             Self for method chaining
         """
         # Initialize the graph builder
-        builder = StateGraph(MessagesState)
+        builder = StateGraph(WorkflowGraphState)
         
         # Add nodes to the graph
-        builder.add_node("supervisor", self.supervisor.process)
-        builder.add_node("enhancer", self.enhancer.process)
-        builder.add_node("researcher", self.researcher.process)
-        builder.add_node("coder", self.coder.process)
-        builder.add_node("validator", self.validator.process)
+        builder.add_node("supervisor", self.supervisor.as_node())
+        builder.add_node("enhancer", self.enhancer.as_node())
+        builder.add_node("researcher", self.researcher.as_node())
+        builder.add_node("coder", self.coder.as_node())
+        if self.validator is not None:
+            builder.add_node("validator", self.validator.as_node())
+        if self.decider is not None:
+            builder.add_node("decider", self.decider.as_node())
+        if self.speculator is not None:
+            builder.add_node("speculator", self.speculator.as_node())
         
         # Add edges to define the workflow
         builder.add_edge(START, "supervisor")
         
-        # Compile the graph
-        self.graph = builder.compile()
+        # Compile the graph, saving state after every node when checkpointing
+        self.graph = builder.compile(checkpointer=self.checkpointer)
         
         return self
     
-    def run(self, user_query: str) -> Dict[str, Any]:
+    def set_checkpointer(self, checkpointer: Optional[BaseCheckpointSaver]) -> 'WorkflowManager':
         """
-        Run the workflow with a user query and return the final result.
+        Switch checkpoint persistence and recompile the graph.
         
         Args:
-            user_query: The user's query to process
+            checkpointer: The new checkpointer, or None to disable checkpointing
             
         Returns:
-            The final state after workflow completion
+            Self for method chaining
         """
-        if not self.graph:
+        with self._build_lock:
+            self.checkpointer = checkpointer
             self.build_graph()
+        return self
+    
+    def set_answer_cache(self, answer_cache: Optional[AnswerCache]) -> 'WorkflowManager':
+        """
+        Switch the whole-run answer cache.
+        
+        Args:
+            answer_cache: The new cache, or None to run the graph for every query
+            
+        Returns:
+            Self for method chaining
+        """
+        self.answer_cache = answer_cache
+        return self
+    
+    def _answer_key(self, user_query: Optional[str], thread_id: Optional[str], resume: bool) -> Optional[str]:
+        """
+        Get the answer cache key for a run.
+        
+        Args:
+            user_query: The user's query
+            thread_id: Checkpoint thread requested by the caller
+            resume: Whether the run resumes an interrupted one
+            
+        Returns:
+            The key, or None if the run must not be cached: caching is off, or
+            the answer depends on a thread's history
+        """
+        if self.answer_cache is None or user_query is None or thread_id is not None or resume:
+            return None
+        if self._config_version is None:
+            self._config_version = AnswerCache.fingerprint(self._answer_config())
+        return AnswerCache.key(user_query, self._config_version)
+    
+    def _answer_config(self) -> Dict[str, Any]:
+        """Describe everything that shapes this workflow's answers: graph shape, models and prompts."""
+        agents = (self.supervisor, self.enhancer, self.researcher, self.coder, self.validator, self.decider)
+        return {
+            "version": ANSWER_CACHE_VERSION,
+            "nodes": [agent.name for agent in agents if agent is not None],
+            "speculative": self.speculator is not None,
+            "models": {agent.name: agent.llm._get_llm_string() for agent in agents if agent is not None},
+            "prompts": {name: value for name, value in vars(settings).items() if name.endswith("_PROMPT")},
+        }
+    
+    def _prepare(self, user_query: Optional[str], budget: Optional[RunBudget], thread_id: Optional[str],
+                 resume: bool) -> Tuple[Optional[Dict[str, Any]], RunContext]:
+        """
+        Create the graph input and run context for a run.
+        
+        Args:
+            user_query: The user's query; ignored when resuming
+            budget: Limits for this run; defaults from settings
+            thread_id: Checkpoint thread; a new one is used if omitted
+            resume: Continue the thread's interrupted run from its last completed node
+            
+        Returns:
+            The graph input (None when resuming) and the run context
+        """
+        self._ensure_graph()
+        if (thread_id is not None or resume) and self.checkpointer is None:
+            raise ValueError("thread_id and resume require a checkpointer")
+        
+        run = RunContext(budget)
+        if self.checkpointer is not None:
+            run.thread_id = thread_id or run.run_id
+        
+        if resume:
+            pending = self.graph.get_state({"configurable": {"thread_id": run.thread_id}}).next
+            if pending:
+                logger.info(f"Resuming thread {run.thread_id} at {', '.join(pending)}")
+            else:
+                logger.warning(f"Thread {run.thread_id} has no interrupted run to resume")
+            return None, run
+        
+        if user_query is None:
+            raise ValueError("A user query is required unless resuming")
+        logger.info(f"Starting workflow with query: {user_query}"
+                    + (f" (thread {run.thread_id})" if run.thread_id else ""))
+        return WorkflowState.create_initial_state(user_query), run
+    
+    def _ensure_graph(self):
+        """Build the graph once, even when several threads run the first query together."""
+        if self.graph is None:
+            with self._build_lock:
+                if self.graph is None:
+                    self.build_graph()
+    
+    def _concurrency_limit(self) -> asyncio.Semaphore:
+        """
+        Get the semaphore bounding concurrent async runs on the running event loop.
+        
+        Returns:
+            The semaphore for the current loop
+        """
+        loop = asyncio.get_running_loop()
+        with self._build_lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = asyncio.Semaphore(self.max_concurrency)
+                self._semaphores[loop] = semaphore
+        return semaphore
+    
+    def _finish(self, run: RunContext) -> Dict[str, Any]:
+        """
+        Log a finished run's resource usage and export its trace.
+        
+        Args:
+            run: The finished run
+            
+        Returns:
+            The run summary
+        """
+        summary = run.summary()
+        logger.info("Run finished: " + ", ".join(f"{key}={value}" for key, value in summary.items()))
+        if self.trace_exporter is not None:
+            try:
+                self.trace_exporter.export(run.trace)
+            except OSError as e:
+                logger.warning(f"Failed to export trace for run {run.run_id}: {e}")
+        return summary
+    
+    def _remember(self, result: Dict[str, Any]):
+        """
+        Add a validated research answer to the research index, so later
+        searches for the same facts can be answered locally.
+        
+        Args:
+            result: The final state of a run
+        """
+        index = getattr(self.researcher.search_tool, "index", None)
+        if index is None or result.get("termination_reason") != "validated":
+            return
+        question = WorkflowState.get_user_question(result)
+        for message in reversed(result["messages"]):
+            name = getattr(message, "name", None)
+            if name in ANSWER_NODES:
+                if name in ("researcher", "speculator"):
+                    index.add(f"{question}\n{message.content}", source=name, query=question)
+                return
+            if message.type == "human" and not name:
+                return
+    
+    def warm_up(self) -> 'WorkflowManager':
+        """
+        Compile the graph and open the agents' LLM connections ahead of the
+        first query, so that query does not pay the TLS/handshake latency.
+        
+        Returns:
+            Self for method chaining
+        """
+        self._ensure_graph()
+        
+        # A one-token request per model is enough to establish its pooled
+        # connection; the copy shares the client but bypasses the response cache
+        models = {}
+        for agent in (self.supervisor, self.enhancer, self.researcher, self.coder, self.validator, self.decider):
+            if agent is not None:
+                models.setdefault(id(agent.llm), agent.llm)
+        try:
+            for llm in models.values():
+                llm.model_copy(update={"cache": False}).invoke("ping", max_tokens=1)
+            logger.info("Workflow warm-up complete")
+        except Exception as e:
+            logger.warning(f"Workflow warm-up failed: {e}")
+        
+        return self
+    
+    def run(self, user_query: Optional[str] = None, budget: Optional[RunBudget] = None,
+            with_summary: bool = False, thread_id: Optional[str] = None, resume: bool = False) -> Dict[str, Any]:
+        """
+        Run the workflow with a user query and return the final result.
         
-        # Create initial state with user query
-        initial_state = WorkflowState.create_initial_state(user_query)
+        Args:
+            user_query: The user's query to process; omitted when resuming
+            budget: Limits for this run; defaults from settings
+            with_summary: Add the run's latency/token/cost summary under 'run_summary'
+            thread_id: Checkpoint thread; reusing one continues its conversation
+            resume: Finish the thread's interrupted run instead of starting a new one
+            
+        Returns:
+            The final state after workflow completion
+        """
+        graph_input, run = self._prepare(user_query, budget, thread_id, resume)
         
-        # Execute the workflow
-        logger.info(f"Starting workflow with query: {user_query}")
-        result = self.graph.invoke(initial_state)
+        # Execute the workflow, unless the answer is cached or already being computed
+        key = self._answer_key(user_query, thread_id, resume)
+        if key is None:
+            result = self.graph.invoke(graph_input, run.config())
+        else:
+            result, run.answer_cache = self.answer_cache.run(key, lambda: self.graph.invoke(graph_input, run.config()))
+        self._remember(result)
+        summary = self._finish(run)
+        if with_summary:
+            result["run_summary"] = summary
         
         return result
     
-    def stream(self, user_query: str) -> Generator[Dict[str, Any], None, None]:
+    @staticmethod
+    def _graph_stream_mode(mode: str) -> Union[str, list]:
         """
-        Stream the workflow execution with a user query.
+        Map a stream mode to the graph's stream modes.
+        
+        Args:
+            mode: 'updates' for whole node outputs, 'tokens' for token events
+            
+        Returns:
+            The stream_mode argument for the compiled graph
+        """
+        if mode == "updates":
+            return "updates"
+        if mode == "tokens":
+            return ["updates", "messages"]
+        raise ValueError(f"Unknown stream mode: {mode}")
+    
+    @staticmethod
+    def _token_events(chunk: tuple) -> Iterator[Dict[str, Any]]:
+        """
+        Convert a multi-mode graph chunk into token-mode events.
+        
+        Node updates become {'event': 'update', 'node', 'update'} and LLM
+        output from the answering nodes becomes {'event': 'token', 'node', 'content'}.
         
         Args:
-            user_query: The user's query to process
+            chunk: A (stream_mode, payload) pair from the graph
             
         Yields:
-            Intermediate states during workflow execution
+            Stream events
         """
-        if not self.graph:
-            self.build_graph()
+        stream_mode, payload = chunk
+        if stream_mode == "updates":
+            for node, update in payload.items():
+                yield {"event": "update", "node": node, "update": update}
+            return
+        
+        message, metadata = payload
+        # LLM calls inside a ReAct sub-agent report the outer node as the first namespace segment
+        namespace = metadata.get("langgraph_checkpoint_ns", "")
+        node = namespace.split(":")[0] if namespace else metadata.get("langgraph_node")
+        if node in STREAM_TOKEN_NODES and isinstance(message, AIMessage) and isinstance(message.content, str) and message.content:
+            yield {"event": "token", "node": node, "content": message.content}
+    
+    def stream(self, user_query: Optional[str] = None, budget: Optional[RunBudget] = None,
+               mode: str = "updates", thread_id: Optional[str] = None,
+               resume: bool = False) -> Generator[Dict[str, Any], None, None]:
+        """
+        Stream the workflow execution with a user query.
         
-        # Create initial state with user query
-        initial_state = WorkflowState.create_initial_state(user_query)
+        Args:
+            user_query: The user's query to process; omitted when resuming
+            budget: Limits for this run; defaults from settings
+            mode: 'updates' yields each node's output as it finishes; 'tokens'
+                also yields LLM tokens from the enhancer, researcher and coder
+                as they are generated (see _token_events for the event shape)
+            thread_id: Checkpoint thread; reusing one continues its conversation
+            resume: Finish the thread's interrupted run instead of starting a new one
+            
+        Yields:
+            Intermediate states, or stream events in 'tokens' mode
+        """
+        stream_mode = self._graph_stream_mode(mode)
+        graph_input, run = self._prepare(user_query, budget, thread_id, resume)
         
         # Stream the workflow execution
-        logger.info(f"Starting workflow stream with query: {user_query}")
-        yield from self.graph.stream(initial_state)
\ No newline at end of file
+        for chunk in self.graph.stream(graph_input, run.config(), stream_mode=stream_mode):
+            if mode == "tokens":
+                yield from self._token_events(chunk)
+            else:
+                yield chunk
+        self._finish(run)
+    
+    async def arun(self, user_query: Optional[str] = None, budget: Optional[RunBudget] = None,
+                   with_summary: bool = False, thread_id: Optional[str] = None,
+                   resume: bool = False) -> Dict[str, Any]:
+        """
+        Asynchronously run the workflow with a user query and return the final result.
+        
+        Args:
+            user_query: The user's query to process; omitted when resuming
+            budget: Limits for this run; defaults from settings
+            with_summary: Add the run's latency/token/cost summary under 'run_summary'
+            thread_id: Checkpoint thread; reusing one continues its conversation
+            resume: Finish the thread's interrupted run instead of starting a new one
+            
+        Returns:
+            The final state after workflow completion
+        """
+        # Execute the workflow once a concurrency slot is free
+        async with self._concurrency_limit():
+            graph_input, run = self._prepare(user_query, budget, thread_id, resume)
+            key = self._answer_key(user_query, thread_id, resume)
+            if key is None:
+                result = await self.graph.ainvoke(graph_input, run.config())
+            else:
+                result, run.answer_cache = await self.answer_cache.arun(
+                    key, lambda: self.graph.ainvoke(graph_input, run.config())
+                )
+            await asyncio.to_thread(self._remember, result)
+            summary = self._finish(run)
+            if with_summary:
+                result["run_summary"] = summary
+            return result
+    
+    async def astream(self, user_query: Optional[str] = None, budget: Optional[RunBudget] = None,
+                      mode: str = "updates", thread_id: Optional[str] = None,
+                      resume: bool = False) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Asynchronously stream the workflow execution with a user query.
+        
+        Args:
+            user_query: The user's query to process; omitted when resuming
+            budget: Limits for this run; defaults from settings
+            mode: 'updates' or 'tokens', as for stream()
+            thread_id: Checkpoint thread; reusing one continues its conversation
+            resume: Finish the thread's interrupted run instead of starting a new one
+            
+        Yields:
+            Intermediate states, or stream events in 'tokens' mode
+        """
+        stream_mode = self._graph_stream_mode(mode)
+        
+        # Stream the workflow execution once a concurrency slot is free
+        async with self._concurrency_limit():
+            graph_input, run = self._prepare(user_query, budget, thread_id, resume)
+            async for chunk in self.graph.astream(graph_input, run.config(), stream_mode=stream_mode):
+                if mode == "tokens":
+                    for event in self._token_events(chunk):
+                        yield event
+                else:
+                    yield chunk
+            self._finish(run)
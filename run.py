@@ -5,36 +5,114 @@ Main entry point for running the application
 """
 
 import argparse
-from pprint import pprint
-from core.workflow import WorkflowManager
+import os
+import uuid
+from typing import TYPE_CHECKING
+from config.settings import (
+    BATCH_WORKERS,
+    CHECKPOINT_BACKEND,
+    CHECKPOINT_PATH,
+    METRICS_PORT,
+    PYTHON_EXECUTOR,
+    SERVER_HOST,
+    SERVER_PORT,
+    get_settings
+)
 from utils.logger import logger
 
+# The workflow, tools and provider SDKs are imported only once arguments are
+# parsed and a command needs them, so --help and --check-config start fast
+if TYPE_CHECKING:
+    from core.workflow import WorkflowManager
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Multi-AI Agent Workflow System')
     parser.add_argument('--query', '-q', type=str, help='User query to process')
     parser.add_argument('--interactive', '-i', action='store_true', help='Run in interactive mode')
     parser.add_argument('--verbose', '-v', action='store_true', help='Enable verbose output')
+    parser.add_argument('--stream', '-s', action='store_true', help='Print answer tokens as they are generated')
+    parser.add_argument('--serve', action='store_true', help='Serve queries over HTTP until interrupted')
+    parser.add_argument('--host', type=str, default=SERVER_HOST, help='Interface the server binds')
+    parser.add_argument('--port', type=int, default=SERVER_PORT, help='Port the server listens on')
+    parser.add_argument('--batch', '-b', type=str, metavar='FILE', help='Run every query in a JSONL or plain-text file')
+    parser.add_argument('--output', '-o', type=str, help='JSONL file for batch results (default: <FILE>.results.jsonl)')
+    parser.add_argument('--workers', '-w', type=int, default=BATCH_WORKERS, help='Queries processed concurrently in batch mode')
+    parser.add_argument('--rate-limit', action='append', default=[], metavar='PROVIDER[:MODEL]=LIMIT',
+                        help='Limit for a provider (groq, tavily, riza) or one model: requests per second, '
+                             'or e.g. 30rpm,6000tpm; repeatable')
+    parser.add_argument('--no-resume', action='store_true', help='Re-run queries already present in the batch output')
+    parser.add_argument('--trace-file', type=str, metavar='FILE', help='Append every run\'s spans to a JSONL file')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, metavar='PORT',
+                        help='Serve Prometheus metrics at http://127.0.0.1:PORT/metrics')
+    parser.add_argument('--checkpoint', choices=['memory', 'sqlite'], default=CHECKPOINT_BACKEND,
+                        help=f'Save graph state after every node (sqlite writes to {CHECKPOINT_PATH})')
+    parser.add_argument('--executor', choices=['riza', 'local'], default=PYTHON_EXECUTOR,
+                        help='Run the coder\'s Python remotely on Riza or in a local sandbox')
+    parser.add_argument('--thread-id', type=str, help='Checkpoint thread to run in or resume')
+    parser.add_argument('--resume', action='store_true', help='Finish the interrupted run of --thread-id')
+    parser.add_argument('--check-config', action='store_true', help='Validate API keys and settings, then exit')
     return parser.parse_args()
 
-def process_query(query: str, verbose: bool = False):
+def stream_query(workflow: 'WorkflowManager', query: str, thread_id: str = None, resume: bool = False):
+    """
+    Print answer tokens as they arrive, labelled by the agent producing them.
+    
+    Args:
+        workflow: The workflow to use
+        query: The user query to process
+        thread_id: Checkpoint thread to run in
+        resume: Whether to finish the thread's interrupted run instead
+    """
+    current_node = None
+    termination_reason = None
+    for event in workflow.stream(query, mode="tokens", thread_id=thread_id, resume=resume):
+        if event["event"] == "token":
+            if event["node"] != current_node:
+                current_node = event["node"]
+                print(f"\n[{current_node}] ", end="", flush=True)
+            print(event["content"], end="", flush=True)
+        elif event["update"]:
+            termination_reason = event["update"].get("termination_reason", termination_reason)
+    print()
+    print("-" * 50)
+    if termination_reason and termination_reason != "validated":
+        print(f"Note: the run stopped early ({termination_reason}); this is the best answer so far.")
+
+def process_query(query: str, verbose: bool = False, workflow: 'WorkflowManager' = None, stream: bool = False,
+                  thread_id: str = None, resume: bool = False):
     """
     Process a single query through the workflow.
     
     Args:
         query: The user query to process
         verbose: Whether to show verbose output
+        workflow: The workflow to use; defaults to the shared instance
+        stream: Whether to print answer tokens as they are generated
+        thread_id: Checkpoint thread to run in; continues its conversation
+        resume: Whether to finish the thread's interrupted run instead of processing query
     """
-    # Create and build the workflow
-    workflow = WorkflowManager().build_graph()
+    from core.state import WorkflowState
+    from core.workflow import WorkflowManager
+    
+    # Reuse the process-wide compiled workflow
+    workflow = workflow or WorkflowManager.shared()
     
     # Process the query
-    print(f"\nProcessing query: '{query}'")
+    if resume:
+        print(f"\nResuming thread '{thread_id}'")
+    else:
+        print(f"\nProcessing query: '{query}'")
     print("-" * 50)
     
-    if verbose:
+    if stream and not verbose:
+        # Print tokens as they arrive to cut time to first output
+        stream_query(workflow, query, thread_id, resume)
+    elif verbose:
+        from pprint import pprint
+        
         # Stream the workflow execution for verbose output
-        for output in workflow.stream(query):
+        for output in workflow.stream(query, thread_id=thread_id, resume=resume):
             for key, value in output.items():
                 if value is None:
                     continue
@@ -46,13 +124,24 @@ def process_query(query: str, verbose: bool = False):
                     print()
     else:
         # Run the workflow and get the final result
-        result = workflow.run(query)
+        result = workflow.run(query, with_summary=True, thread_id=thread_id, resume=resume)
         # Extract the final answer
-        final_answer = result["messages"][-2].content  # -2 because -1 is validator's reason
+        final_answer = WorkflowState.get_final_answer(result)
         print("\nFinal Answer:")
         print("-" * 50)
         print(final_answer)
         print("-" * 50)
+        llm = result["run_summary"]["llm"]
+        answer_cache = result["run_summary"]["answer_cache"]
+        print(f"{result['run_summary']['elapsed_seconds']:.1f}s, {llm['calls']} LLM calls, "
+              f"{llm['prompt_tokens']} in / {llm['completion_tokens']} out tokens, ${llm['cost_usd']:.4f}"
+              + (f" (answer cache: {answer_cache})" if answer_cache in ("hit", "coalesced") else ""))
+        search = result["run_summary"]["search"]
+        if search["calls"]:
+            print(f"{search['calls']} searches, results trimmed from {search['tokens_in']} to {search['tokens_out']} tokens")
+        termination_reason = result.get("termination_reason")
+        if termination_reason and termination_reason != "validated":
+            print(f"Note: the run stopped early ({termination_reason}); this is the best answer so far.")
 
 def interactive_mode():
     """Run the application in interactive mode."""
@@ -60,32 +149,194 @@ def interactive_mode():
     print("Type 'exit' or 'quit' to end the session")
     print("-" * 50)
     
+    print("Type 'new' to start a new conversation")
+    print("-" * 50)
+    
+    from core.checkpoint import create_checkpointer
+    from core.workflow import WorkflowManager
+    
+    # Build the workflow once and open connections before the first prompt
+    workflow = WorkflowManager.shared()
+    if workflow.checkpointer is None:
+        # Follow-up questions continue the conversation held in the checkpoint
+        workflow.set_checkpointer(create_checkpointer("memory"))
+    workflow.warm_up()
+    thread_id = uuid.uuid4().hex
+    
     while True:
         query = input("\nEnter your query: ")
         if query.lower() in ('exit', 'quit'):
             break
         
+        if query.strip().lower() == 'new':
+            thread_id = uuid.uuid4().hex
+            print("Started a new conversation")
+            continue
+        
         if not query.strip():
             continue
         
         try:
-            process_query(query)
+            process_query(query, workflow=workflow, stream=True, thread_id=thread_id)
         except Exception as e:
             logger.error(f"Error processing query: {e}", exc_info=True)
             print(f"An error occurred: {e}")
 
+def batch_mode(path: str, output: str = None, workers: int = BATCH_WORKERS, resume: bool = True):
+    """
+    Run every query in a file concurrently, streaming results to a JSONL file.
+    
+    Args:
+        path: JSONL or plain-text file of queries
+        output: JSONL file for results
+        workers: Number of queries processed concurrently
+        resume: Whether to skip queries already answered in the output file
+    """
+    from core.batch import BatchRunner
+    from core.workflow import WorkflowManager
+    
+    output = output or f"{os.path.splitext(path)[0]}.results.jsonl"
+    
+    runner = BatchRunner(WorkflowManager.shared(), output, workers=workers)
+    summary = runner.run(BatchRunner.load_queries(path), resume=resume)
+    
+    print(f"\nBatch complete: {summary['processed']} processed, "
+          f"{summary['skipped']} skipped, {summary['failed']} failed")
+    print(f"Results written to {output}")
+
+def serve_mode(host: str = SERVER_HOST, port: int = SERVER_PORT):
+    """
+    Serve the shared workflow over HTTP until SIGINT/SIGTERM, then drain.
+    
+    Args:
+        host: Interface to bind
+        port: Port to listen on
+    """
+    from core.server import WorkflowServer
+    
+    WorkflowServer(host=host, port=port).run()
+
+def configure_rate_limits(specs: list):
+    """
+    Register rate limits given as PROVIDER[:MODEL]=LIMIT strings, where LIMIT
+    is requests per second (groq=5) or a list of per-minute request and
+    token rates (groq:llama-3.3-70b-versatile=30rpm,6000tpm).
+    
+    Args:
+        specs: Rate limit specifications from the command line
+    """
+    if not specs:
+        return
+    from utils.rate_limiter import rate_limiters
+    
+    for spec in specs:
+        key, _, limit = spec.partition('=')
+        provider, _, model = key.strip().partition(':')
+        provider = provider.lower()
+        try:
+            if 'pm' not in limit:
+                if model:
+                    rate_limiters.configure_limits(provider, requests_per_minute=float(limit) * 60,
+                                                   model=model, burst_seconds=1.0)
+                else:
+                    rate_limiters.configure(provider, float(limit))
+                continue
+            
+            rates = {}
+            for part in limit.lower().split(','):
+                part = part.strip()
+                unit = {'rpm': 'requests_per_minute', 'tpm': 'tokens_per_minute'}[part[-3:]]
+                rates[unit] = float(part[:-3])
+            rate_limiters.configure_limits(provider, model=model or None, **rates)
+        except (ValueError, KeyError):
+            raise SystemExit(f"Invalid --rate-limit '{spec}', expected PROVIDER[:MODEL]=RPS or =Nrpm,Mtpm")
+
+def check_config(executor: str = PYTHON_EXECUTOR):
+    """
+    Report configuration problems without building the workflow, exiting non-zero if any are found.
+    
+    Args:
+        executor: The Python executor the coder will use
+    """
+    problems = get_settings().validate(executor)
+    for problem in problems:
+        print(f"Configuration problem: {problem}")
+    if problems:
+        raise SystemExit(1)
+    print("Configuration OK")
+
+def configure_checkpointing(backend: str = None):
+    """
+    Enable checkpointing on the shared workflow if requested on the command line.
+    
+    Args:
+        backend: 'memory' or 'sqlite'
+    """
+    if backend and backend != CHECKPOINT_BACKEND:
+        from core.checkpoint import create_checkpointer
+        from core.workflow import WorkflowManager
+        
+        WorkflowManager.shared().set_checkpointer(create_checkpointer(backend, CHECKPOINT_PATH))
+
+def configure_instrumentation(trace_file: str = None, metrics_port: int = None):
+    """
+    Export run traces and serve metrics as requested on the command line.
+    
+    Args:
+        trace_file: JSONL file to append spans to
+        metrics_port: Port for the Prometheus metrics endpoint
+    """
+    if trace_file:
+        from core.workflow import WorkflowManager
+        from utils.tracing import JsonlTraceExporter
+        
+        WorkflowManager.shared().trace_exporter = JsonlTraceExporter(trace_file)
+    if metrics_port is not None:
+        from utils.metrics import metrics
+        
+        metrics.start_http_server(metrics_port)
+        print(f"Serving metrics at http://127.0.0.1:{metrics_port}/metrics")
+
 def main():
     """Main entry point for the application."""
     args = parse_arguments()
     
-    if args.interactive:
+    if args.check_config:
+        check_config(args.executor)
+        return
+    
+    # Limits and the executor must be in place before the shared workflow creates its clients
+    configure_rate_limits(args.rate_limit)
+    if args.executor != PYTHON_EXECUTOR:
+        from tools.tool_factory import ToolFactory
+        ToolFactory.python_executor = args.executor
+    configure_instrumentation(args.trace_file, args.metrics_port)
+    configure_checkpointing(args.checkpoint)
+    
+    if args.resume and not (args.thread_id and args.checkpoint):
+        raise SystemExit("--resume requires --thread-id and a --checkpoint backend")
+    
+    if args.serve:
+        serve_mode(args.host, args.port)
+    elif args.batch:
+        batch_mode(args.batch, args.output, args.workers, not args.no_resume)
+    elif args.interactive:
         interactive_mode()
-    elif args.query:
-        process_query(args.query, args.verbose)
+    elif args.query or args.resume:
+        thread_id = args.thread_id or (uuid.uuid4().hex if args.checkpoint else None)
+        try:
+            process_query(args.query, args.verbose, stream=args.stream, thread_id=thread_id, resume=args.resume)
+        except Exception:
+            # An in-memory checkpoint is lost with this process, so only a sqlite one can be resumed
+            if thread_id and args.checkpoint == "sqlite":
+                print(f"Run interrupted; continue it with: --resume --checkpoint {args.checkpoint} --thread-id {thread_id}")
+            raise
     else:
-        print("Please provide a query with --query or use --interactive mode")
+        print("Please provide a query with --query, a file with --batch, or use --interactive or --serve mode")
         print("Example: python run.py --query 'What is the difference between the stock price of Infosys in 2023 and 2021?'")
         print("Example: python run.py --interactive")
+        print("Example: python run.py --batch queries.jsonl --workers 16 --rate-limit groq=5")
+        print("Example: python run.py --serve --port 8080")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pytest
+
+# Settings require provider keys at import time; the tests only talk to local fakes
+for key in ("groq_api_key", "riza_api_key", "tavily_api_key"):
+    os.environ.setdefault(key, "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import the workflow before any agent module, as run.py does
+import core.workflow  # noqa: E402,F401
+from tools.fakes import FakePythonTool, FakeSearchTool  # noqa: E402
+from tools.tool_factory import ToolFactory  # noqa: E402
+
+@pytest.fixture
+def fake_tools():
+    """
+    Replace the search and Python tools with local fakes for the test.
+    
+    Yields:
+        The fake search tool, shared by every agent built during the test
+    """
+    search = FakeSearchTool()
+    ToolFactory.override("tavily_search", lambda: search)
+    ToolFactory.override("python_executor", FakePythonTool)
+    yield search
+    ToolFactory.override("tavily_search", None)
+    ToolFactory.override("python_executor", None)
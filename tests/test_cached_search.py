@@ -0,0 +1,105 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tools.cached_search import CachedSearchTool, normalize_query
+from tools.fakes import FakeSearchTool
+from utils.cache import MemoryCacheBackend, SQLiteCacheBackend, create_cache_backend
+
+def make_tool(backend, latency_seconds: float = 0.0):
+    """A cached fake search, returned with the fake so its calls can be counted."""
+    fake = FakeSearchTool(latency_seconds=latency_seconds)
+    return CachedSearchTool(fake, backend=backend, namespace="test"), fake
+
+@pytest.mark.parametrize("query", [
+    "capital of France",
+    "Capital of FRANCE",
+    "  capital   of\tfrance ",
+    "capital of france?",
+    "Capital of France...",
+])
+def test_normalize_query_ignores_case_whitespace_and_trailing_punctuation(query):
+    assert normalize_query(query) == "capital of france"
+
+def test_normalize_query_keeps_distinct_queries_apart():
+    assert normalize_query("capital of France") != normalize_query("capital of Spain")
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend_kind(request):
+    return request.param
+
+def test_create_cache_backend(tmp_path, backend_kind):
+    backend = create_cache_backend(backend_kind, str(tmp_path / "search.sqlite"), 100, 60)
+    assert isinstance(backend, MemoryCacheBackend if backend_kind == "memory" else SQLiteCacheBackend)
+    assert create_cache_backend(None, str(tmp_path / "search.sqlite"), 100, 60) is None
+    with pytest.raises(ValueError):
+        create_cache_backend("redis", str(tmp_path / "search.sqlite"), 100, 60)
+
+def test_normalized_queries_share_an_entry(tmp_path, backend_kind):
+    tool, fake = make_tool(create_cache_backend(backend_kind, str(tmp_path / "search.sqlite"), 100, 60))
+    
+    first = tool.invoke("Capital of France")
+    assert tool.invoke("  capital of france? ") == first
+    assert fake.calls == 1
+    assert tool.stats()["hits"] == 1
+    assert tool.stats()["size"] == 1
+
+def test_entries_expire_after_the_ttl(tmp_path, backend_kind):
+    tool, fake = make_tool(create_cache_backend(backend_kind, str(tmp_path / "search.sqlite"), 100, 0.05))
+    
+    tool.invoke("capital of France")
+    tool.invoke("capital of France")
+    assert fake.calls == 1
+    
+    time.sleep(0.1)
+    tool.invoke("capital of France")
+    assert fake.calls == 2
+    assert tool.stats()["evictions"] == 1
+
+def test_sqlite_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    tool, fake = make_tool(create_cache_backend("sqlite", path, 100, 60))
+    first = tool.invoke("capital of France")
+    
+    restarted, fresh = make_tool(create_cache_backend("sqlite", path, 100, 60))
+    assert restarted.invoke("capital of France") == first
+    assert fake.calls == 1
+    assert fresh.calls == 0
+
+def test_memory_entries_do_not_outlive_the_backend():
+    tool, fake = make_tool(create_cache_backend("memory", "", 100, 60))
+    tool.invoke("capital of France")
+    
+    restarted, fresh = make_tool(create_cache_backend("memory", "", 100, 60))
+    restarted.invoke("capital of France")
+    assert fresh.calls == 1
+
+def test_failed_searches_are_not_cached(tmp_path, backend_kind):
+    tool, fake = make_tool(create_cache_backend(backend_kind, str(tmp_path / "search.sqlite"), 100, 60))
+    # Tavily reports errors as (message, {}) rather than raising
+    tool._store(tool._key("capital of France"), ("HTTPError('502 Server Error')", {}))
+    
+    assert tool.backend.get(tool._key("capital of France")) is None
+
+def test_concurrent_identical_searches_share_one_request(tmp_path, backend_kind):
+    tool, fake = make_tool(create_cache_backend(backend_kind, str(tmp_path / "search.sqlite"), 100, 60), 0.2)
+    queries = ["capital of France", "Capital of France", "capital of  france?"] * 3
+    
+    with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+        results = list(pool.map(tool.invoke, queries))
+    
+    assert fake.calls == 1
+    assert all(result == results[0] for result in results)
+
+def test_concurrent_identical_async_searches_share_one_request(tmp_path, backend_kind):
+    tool, fake = make_tool(create_cache_backend(backend_kind, str(tmp_path / "search.sqlite"), 100, 60), 0.2)
+    
+    async def main():
+        return await asyncio.gather(*(tool.ainvoke("Capital of France") for _ in range(8)))
+    
+    results = asyncio.run(main())
+    assert fake.calls == 1
+    assert tool.stats()["coalesced"] == 7
+    assert all(result == results[0] for result in results)
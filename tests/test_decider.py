@@ -0,0 +1,49 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agents.decider import DeciderAgent
+from core.fakes import ScriptedChatModel
+
+def coder_state(answer: str, output: str, code: str = "print(6 * 7)"):
+    """A state whose latest message is a coder answer backed by a successful execution."""
+    execution = {"code": code, "output": output, "ok": True}
+    return {"messages": [
+        HumanMessage(content="What is six times seven?"),
+        AIMessage(content=answer, name="coder", additional_kwargs={"execution": execution}),
+    ]}
+
+@pytest.fixture
+def decider():
+    return DeciderAgent(ScriptedChatModel(), accept_verified_code=True)
+
+@pytest.mark.parametrize("answer, output", [
+    ("The result is 42.", "42"),
+    ("6 * 7 = 42", "42"),
+    ("The mean is 3.75 over 4 samples", "3.75"),
+    ("The sorted list is [1, 2, 3]", "[1, 2, 3]"),
+    ("The answer is 4.", "4"),
+])
+def test_accepts_answers_that_state_the_result(decider, answer, output):
+    assert decider._verified(coder_state(answer, output))
+
+@pytest.mark.parametrize("answer, output", [
+    ("The result is 42", "4"),
+    ("The result is -4", "4"),
+    ("The result is 3.14", "3"),
+    ("The result is 14", "1"),
+    ("The result is 7", "42"),
+])
+def test_rejects_results_embedded_in_other_values(decider, answer, output):
+    assert not decider._verified(coder_state(answer, output))
+
+@pytest.mark.parametrize("answer, output", [
+    ("In step 1 we found 17 primes below 60", "1"),
+    ("True: 2 of the 3 checks passed", "True"),
+    ("0 is returned after 5 retries", "0"),
+])
+def test_short_results_among_other_figures_are_left_to_the_llm(decider, answer, output):
+    assert not decider._verified(coder_state(answer, output))
+
+def test_rejects_nondeterministic_code(decider):
+    state = coder_state("The result is 42", "42", code="import random\nprint(random.randint(1, 100))")
+    assert not decider._verified(state)
@@ -0,0 +1,25 @@
+from tools.ranked_search import PassageRanker
+
+def test_keeps_the_best_result_when_no_passage_shares_words_with_the_query():
+    results = [{"url": "https://example.com/infy", "content": "INFY closed at 1,900 rupees on the last trading day of the year."}]
+    
+    ranked = PassageRanker(semantic_weight=0).rank("Infosys share price 2021", results)
+    assert [result["url"] for result in ranked] == ["https://example.com/infy"]
+    assert ranked[0]["content"] == results[0]["content"]
+
+def test_drops_passages_without_overlap_once_one_matches():
+    results = [
+        {"url": "https://example.com/weather", "content": "Rain is expected across Bengaluru this week."},
+        {"url": "https://example.com/infosys", "content": "The Infosys share price rose sharply in 2021."},
+    ]
+    
+    ranked = PassageRanker(semantic_weight=0).rank("Infosys share price 2021", results)
+    assert [result["url"] for result in ranked] == ["https://example.com/infosys"]
+    assert ranked[0]["score"] == 1.0
+
+def test_drops_near_duplicate_results():
+    text = "The Infosys share price rose sharply in 2021 as revenue grew."
+    results = [{"url": "https://a.example", "content": text}, {"url": "https://b.example", "content": text + " "}]
+    
+    ranked = PassageRanker().rank("Infosys share price", results)
+    assert [result["url"] for result in ranked] == ["https://a.example"]
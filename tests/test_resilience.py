@@ -0,0 +1,219 @@
+import asyncio
+import time
+
+import pytest
+
+from utils import resilience
+from utils.faults import FaultInjector, InjectedFault
+from utils.resilience import CircuitBreaker, CircuitOpenError, ResilientCaller, RetryPolicy
+
+def make_caller(breaker=None, **policy) -> ResilientCaller:
+    """A caller with its own breaker, so tests do not share circuit state."""
+    policy = {"max_attempts": 1, "timeout": None, "base_delay": 0.0, **policy}
+    return ResilientCaller("test", policy=RetryPolicy(**policy), breaker=breaker or CircuitBreaker("test"))
+
+def provider(faults: FaultInjector):
+    """A blocking fake provider call that answers 'ok' unless a fault is injected."""
+    def call():
+        faults.inject()
+        return "ok"
+    return call
+
+def aprovider(faults: FaultInjector):
+    """An async fake provider call that answers 'ok' unless a fault is injected."""
+    async def call():
+        await faults.ainject()
+        return "ok"
+    return call
+
+@pytest.fixture
+def full_backoff(monkeypatch):
+    """Make the jittered backoff wait its full upper bound, so delays are predictable."""
+    monkeypatch.setattr(resilience.random, "uniform", lambda low, high: high)
+
+def test_retries_retryable_errors_with_exponential_backoff(full_backoff):
+    faults = FaultInjector(fail_first=2, status_code=503)
+    caller = make_caller(max_attempts=3, base_delay=0.05)
+    
+    started = time.monotonic()
+    assert caller.call(provider(faults)) == "ok"
+    elapsed = time.monotonic() - started
+    
+    assert faults.calls == 3
+    assert faults.faults == 2
+    # Backoffs of 0.05s then 0.1s
+    assert 0.15 <= elapsed < 0.5
+    assert caller.breaker.state == "closed"
+
+def test_async_retries_retryable_errors_with_exponential_backoff(full_backoff):
+    faults = FaultInjector(fail_first=2, status_code=429)
+    caller = make_caller(max_attempts=3, base_delay=0.05)
+    
+    started = time.monotonic()
+    assert asyncio.run(caller.acall(aprovider(faults))) == "ok"
+    elapsed = time.monotonic() - started
+    
+    assert faults.calls == 3
+    assert 0.15 <= elapsed < 0.5
+
+def test_gives_up_after_max_attempts(full_backoff):
+    faults = FaultInjector(error_rate=1.0, status_code=503)
+    caller = make_caller(max_attempts=3, base_delay=0.01)
+    
+    with pytest.raises(InjectedFault):
+        caller.call(provider(faults))
+    assert faults.calls == 3
+
+def test_backoff_is_capped_and_honours_retry_after(full_backoff):
+    policy = RetryPolicy(base_delay=0.5, max_delay=2.0)
+    assert [policy.backoff(attempt) for attempt in (1, 2, 3, 4)] == [0.5, 1.0, 2.0, 2.0]
+    
+    class RateLimited(Exception):
+        response = type("Response", (), {"status_code": 429, "headers": {"retry-after": "1.5"}})()
+    assert policy.backoff(1, RateLimited()) == 1.5
+
+def test_does_not_retry_non_retryable_errors():
+    faults = FaultInjector(error_rate=1.0, status_code=400)
+    caller = make_caller(max_attempts=3, base_delay=0.01)
+    
+    with pytest.raises(InjectedFault):
+        caller.call(provider(faults))
+    assert faults.calls == 1
+    # The provider answered, so its circuit counts it as healthy
+    assert caller.breaker.failures == 0
+
+def test_async_does_not_retry_non_retryable_errors():
+    faults = FaultInjector(error_rate=1.0, status_code=401)
+    caller = make_caller(max_attempts=3, base_delay=0.01)
+    
+    with pytest.raises(InjectedFault):
+        asyncio.run(caller.acall(aprovider(faults)))
+    assert faults.calls == 1
+
+def test_hedge_fires_after_delay_and_faster_twin_wins():
+    slow, fast = FaultInjector(latency_seconds=1.0), FaultInjector()
+    injectors = iter([slow, fast])
+    caller = make_caller(timeout=5.0, hedge_after=0.05)
+    
+    started = time.monotonic()
+    assert caller.call(lambda: provider(next(injectors))()) == "ok"
+    
+    assert time.monotonic() - started < 0.5
+    assert slow.calls == 1 and fast.calls == 1
+
+def test_async_hedge_cancels_the_loser():
+    slow, fast = FaultInjector(latency_seconds=1.0), FaultInjector()
+    injectors = iter([slow, fast])
+    cancelled = []
+    
+    async def call():
+        faults = next(injectors)
+        try:
+            await faults.ainject()
+        except asyncio.CancelledError:
+            cancelled.append(faults)
+            raise
+        return "fast" if faults is fast else "slow"
+    
+    async def main():
+        caller = make_caller(timeout=5.0, hedge_after=0.05)
+        result = await caller.acall(call)
+        # Let the loser observe its cancellation
+        await asyncio.sleep(0)
+        return result
+    
+    started = time.monotonic()
+    assert asyncio.run(main()) == "fast"
+    assert time.monotonic() - started < 0.5
+    assert cancelled == [slow]
+
+def test_no_hedge_when_the_first_attempt_answers_in_time():
+    faults = FaultInjector()
+    caller = make_caller(timeout=5.0, hedge_after=0.5)
+    
+    assert caller.call(provider(faults)) == "ok"
+    assert faults.calls == 1
+
+def test_circuit_opens_half_opens_and_closes():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_seconds=0.1)
+    caller = make_caller(breaker)
+    failing = FaultInjector(error_rate=1.0, status_code=503)
+    healthy = FaultInjector()
+    
+    for _ in range(2):
+        with pytest.raises(InjectedFault):
+            caller.call(provider(failing))
+    assert breaker.state == "open"
+    
+    # Open circuits fail fast without reaching the provider
+    with pytest.raises(CircuitOpenError):
+        caller.call(provider(healthy))
+    assert healthy.calls == 0
+    
+    time.sleep(0.12)
+    assert breaker.state == "half_open"
+    assert caller.call(provider(healthy)) == "ok"
+    assert breaker.state == "closed"
+    assert healthy.calls == 1
+
+def test_failed_trial_reopens_the_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.1)
+    caller = make_caller(breaker)
+    failing = FaultInjector(error_rate=1.0, status_code=503)
+    
+    with pytest.raises(InjectedFault):
+        caller.call(provider(failing))
+    time.sleep(0.12)
+    assert breaker.state == "half_open"
+    
+    with pytest.raises(InjectedFault):
+        caller.call(provider(failing))
+    assert breaker.state == "open"
+
+def test_half_open_admits_one_trial_at_a_time():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.0)
+    breaker.record_failure()
+    
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+def test_failed_admission_releases_the_trial_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.1)
+    caller = make_caller(breaker)
+    healthy = FaultInjector()
+    breaker.record_failure()
+    time.sleep(0.12)
+    
+    def refuse():
+        raise TimeoutError("rate limiter admission timed out")
+    
+    with pytest.raises(TimeoutError):
+        caller.call(provider(healthy), before_attempt=refuse)
+    assert healthy.calls == 0
+    assert breaker.state == "half_open"
+    assert not breaker._trial_in_flight
+    
+    # The next call gets the trial slot and closes the circuit
+    assert caller.call(provider(healthy)) == "ok"
+    assert breaker.state == "closed"
+
+def test_async_failed_admission_releases_the_trial_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_seconds=0.1)
+    caller = make_caller(breaker)
+    healthy = FaultInjector()
+    breaker.record_failure()
+    time.sleep(0.12)
+    
+    async def refuse():
+        raise asyncio.CancelledError()
+    
+    async def main():
+        with pytest.raises(asyncio.CancelledError):
+            await caller.acall(aprovider(healthy), before_attempt=refuse)
+        assert not breaker._trial_in_flight
+        return await caller.acall(aprovider(healthy))
+    
+    assert asyncio.run(main()) == "ok"
+    assert healthy.calls == 1
+    assert breaker.state == "closed"
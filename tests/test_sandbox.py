@@ -0,0 +1,97 @@
+import pytest
+
+from tools.sandbox import SandboxPool, SandboxWorker
+
+@pytest.fixture(scope="module")
+def worker():
+    """One worker shared by the module's tests, which also shows snippets do not affect each other."""
+    worker = SandboxWorker(cpu_seconds=5, memory_mb=1024, max_output=2000, preload=["math", "json"])
+    yield worker
+    worker.kill()
+
+@pytest.fixture
+def victim(tmp_path):
+    """A host file outside the sandbox's scratch directory."""
+    path = tmp_path / "victim.txt"
+    path.write_text("keep me")
+    return path
+
+@pytest.mark.parametrize("code", [
+    'import os; os.remove({path!r})',
+    'import os; os.unlink({path!r})',
+    'import os; os.rename({path!r}, "moved.txt")',
+    'import os; os.replace("scratch.txt", {path!r})',
+    'import os; os.chmod({path!r}, 0o777)',
+    'import os; os.chown({path!r}, os.getuid(), os.getgid())',
+    'import os; os.truncate({path!r}, 0)',
+    'import os; os.utime({path!r}, (0, 0))',
+    'import os; os.link({path!r}, "linked.txt")',
+    'import os; os.symlink({path!r}, "alias.txt"); open("alias.txt", "w").write("gone")',
+    'import os; os.symlink("/etc", {path!r} + ".link")',
+    'import os; os.rmdir({dir!r})',
+    'import os; os.mkdir({dir!r} + "/new")',
+    'import shutil; shutil.rmtree({dir!r})',
+    'open({path!r}, "w").write("gone")',
+])
+def test_refuses_file_changes_outside_the_workdir(worker, victim, code):
+    result = worker.run('open("scratch.txt", "w").close()\n' + code.format(path=str(victim), dir=str(victim.parent)), 10)
+    
+    assert result.exit_code == 1
+    assert "PermissionError" in result.stderr
+    assert victim.read_text() == "keep me"
+    assert sorted(p.name for p in victim.parent.iterdir()) == ["victim.txt"]
+
+def test_allows_file_changes_inside_the_workdir(worker):
+    result = worker.run(
+        'import os, shutil\n'
+        'os.makedirs("data/nested")\n'
+        'open("data/nested/f.txt", "w").write("x")\n'
+        'os.rename("data/nested/f.txt", "data/g.txt")\n'
+        'os.symlink("data/g.txt", "link.txt")\n'
+        'os.remove("link.txt")\n'
+        'shutil.rmtree("data")\n'
+        'print(sorted(os.listdir(".")))',
+        10
+    )
+    assert result.exit_code == 0, result.stderr
+    assert "data" not in result.stdout and "link.txt" not in result.stdout
+
+def test_module_changes_do_not_leak_into_later_snippets(worker):
+    poison = worker.run(
+        'import math, json, builtins, sys\n'
+        'math.pi = 3\n'
+        'math.tau = lambda: 0\n'
+        'json.evil = True\n'
+        'builtins.len = lambda value: 0\n'
+        'del sys.modules["json"]',
+        10
+    )
+    assert poison.exit_code == 0, poison.stderr
+    
+    result = worker.run('import math, json\nprint(math.pi, len([1, 2]), hasattr(json, "evil"), math.tau)', 10)
+    assert result.stdout.strip() == "3.141592653589793 2 False 6.283185307179586"
+    assert not worker.spent
+
+def test_pure_python_imports_are_unloaded_after_each_snippet(worker):
+    worker.run('import textwrap\ntextwrap.dedent = str.upper', 10)
+    result = worker.run('import textwrap\nprint(textwrap.dedent("  indented"))', 10)
+    
+    assert result.stdout.strip() == "indented"
+    assert not worker.spent
+
+def test_extension_imports_mark_the_worker_for_replacement():
+    worker = SandboxWorker(cpu_seconds=5, memory_mb=1024, max_output=2000, preload=["math"])
+    try:
+        worker.run('import _csv\n_csv.field_size_limit(1)', 10)
+        assert worker.spent
+    finally:
+        worker.kill()
+
+def test_pool_replaces_workers_a_snippet_left_dirty():
+    pool = SandboxPool(size=1, timeout=10, preload=["math"])
+    try:
+        pool.execute('import _csv\n_csv.field_size_limit(1)')
+        result = pool.execute('import _csv\nprint(_csv.field_size_limit())')
+        assert result.stdout.strip() == "131072"
+    finally:
+        pool.close()
@@ -0,0 +1,265 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+
+from core.fakes import ScriptedChatModel
+from core.server import WorkflowServer
+from core.workflow import WorkflowManager
+from utils.faults import LatencyDistribution
+
+def make_workflow(latency: float = 0.0) -> WorkflowManager:
+    """A workflow answered by the scripted model, with every LLM call taking the given seconds."""
+    llm = ScriptedChatModel(latency=LatencyDistribution("fixed", latency), routes=["researcher"])
+    # Repeated queries must run the graph rather than hit a cache
+    workflow = WorkflowManager(llm=llm.model_copy(update={"cache": False}))
+    return workflow.set_answer_cache(None)
+
+@asynccontextmanager
+async def serving(workflow: WorkflowManager, **kwargs: Any):
+    """Serve the workflow on a free port for the block, shutting down afterwards."""
+    server = await WorkflowServer(workflow, host="127.0.0.1", port=0, **kwargs).start()
+    try:
+        yield server
+    finally:
+        await server.shutdown()
+
+async def request(port: int, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Tuple[Optional[int], Dict[str, str], bytes]:
+    """
+    Send one request on a new connection and read the response until the server closes it.
+    
+    Returns:
+        The status (None if the connection closed without a response), headers and body
+    """
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write((
+        f"{method} {path} HTTP/1.1\r\nHost: test\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+    ).encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    if not response:
+        return None, {}, b""
+    
+    head, _, body = response.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = {name.strip().lower(): value.strip() for name, _, value in (line.partition(":") for line in header_lines)}
+    return int(status_line.split()[1]), headers, body
+
+def events(body: bytes) -> List[Tuple[str, Dict[str, Any]]]:
+    """Parse a server-sent event stream into (event, data) pairs."""
+    parsed = []
+    for frame in body.decode("utf-8").split("\n\n"):
+        if not frame:
+            continue
+        fields = dict(line.split(": ", 1) for line in frame.split("\n"))
+        assert set(fields) == {"event", "data"}
+        parsed.append((fields["event"], json.loads(fields["data"])))
+    return parsed
+
+async def wait_for(condition, timeout: float = 5.0):
+    """Poll until the condition holds."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+def test_query_returns_the_answer_and_run_summary(fake_tools):
+    async def main():
+        async with serving(make_workflow()) as server:
+            return await request(server.port, "POST", "/v1/query", {"query": "What is the capital of France?"})
+    
+    status, headers, body = asyncio.run(main())
+    assert status == 200
+    assert headers["content-type"] == "application/json"
+    result = json.loads(body)
+    assert result["answer"]
+    assert result["termination_reason"] == "validated"
+    assert result["run_summary"]["thread_id"] == result["thread_id"]
+    assert fake_tools.calls >= 1
+
+def test_query_rejects_invalid_requests(fake_tools):
+    async def main():
+        async with serving(make_workflow()) as server:
+            return [
+                await request(server.port, "POST", "/v1/query", {"query": "  "}),
+                await request(server.port, "POST", "/v1/query", {"query": "hi", "budget": {"max_cost": 1}}),
+                await request(server.port, "GET", "/v1/query"),
+                await request(server.port, "GET", "/v2/query"),
+            ]
+    
+    statuses = [status for status, _, _ in asyncio.run(main())]
+    assert statuses == [400, 400, 405, 404]
+
+def test_stream_frames_updates_then_end(fake_tools):
+    async def main():
+        async with serving(make_workflow()) as server:
+            return await request(server.port, "POST", "/v1/stream", {"query": "What is the capital of France?"})
+    
+    status, headers, body = asyncio.run(main())
+    assert status == 200
+    assert headers["content-type"] == "text/event-stream"
+    assert headers["cache-control"] == "no-cache"
+    
+    stream = events(body)
+    names = [name for name, _ in stream]
+    assert names[-1] == "end"
+    assert set(names[:-1]) == {"update"}
+    nodes = [data["node"] for name, data in stream if name == "update"]
+    assert nodes[0] == "supervisor"
+    assert "researcher" in nodes
+    assert all("update" in data for name, data in stream if name == "update")
+    end = stream[-1][1]
+    assert end["answer"]
+    assert end["termination_reason"] == "validated"
+
+def test_stream_ends_with_the_notice_of_a_run_stopped_early(fake_tools):
+    async def main():
+        async with serving(make_workflow()) as server:
+            return await request(server.port, "POST", "/v1/stream", {"query": "What is the capital of France?", "budget": {"max_hops": 0}})
+    
+    status, _, body = asyncio.run(main())
+    assert status == 200
+    stream = events(body)
+    assert [name for name, _ in stream][-1] == "end"
+    end = stream[-1][1]
+    assert end["termination_reason"].startswith("hop budget exhausted")
+    assert end["answer"].startswith("Run stopped early: hop budget exhausted")
+    assert fake_tools.calls == 0
+
+def test_query_reports_the_notice_of_a_run_stopped_early(fake_tools):
+    async def main():
+        async with serving(make_workflow()) as server:
+            return await request(server.port, "POST", "/v1/query", {"query": "What is the capital of France?", "budget": {"max_hops": 0}})
+    
+    status, _, body = asyncio.run(main())
+    assert status == 200
+    result = json.loads(body)
+    assert result["answer"].startswith("Run stopped early: hop budget exhausted")
+    assert result["answer"] != "What is the capital of France?"
+
+def test_stream_rejects_unknown_modes(fake_tools):
+    async def main():
+        async with serving(make_workflow()) as server:
+            return await request(server.port, "POST", "/v1/stream", {"query": "hi there", "mode": "values"})
+    
+    status, headers, body = asyncio.run(main())
+    assert status == 400
+    assert headers["content-type"] == "application/json"
+    assert "mode" in json.loads(body)["error"]
+
+def test_refuses_with_429_when_the_queue_is_full(fake_tools):
+    async def main():
+        async with serving(make_workflow(latency=0.1), max_in_flight=1, max_queue=1) as server:
+            queries = [
+                asyncio.ensure_future(request(server.port, "POST", "/v1/query", {"query": f"Question number {i}?"}))
+                for i in range(2)
+            ]
+            await wait_for(lambda: server._admitted == 2)
+            assert server._running == 1
+            
+            refused = await request(server.port, "POST", "/v1/query", {"query": "One more question?"})
+            ready = await request(server.port, "GET", "/readyz")
+            alive = await request(server.port, "GET", "/healthz")
+            return refused, ready, alive, await asyncio.gather(*queries)
+    
+    refused, ready, alive, answered = asyncio.run(main())
+    status, headers, body = refused
+    assert status == 429
+    assert headers["retry-after"] == "1"
+    assert "queued" in json.loads(body)["error"]
+    
+    # A saturated server stays alive but asks load balancers to route elsewhere
+    assert ready[0] == 503
+    assert json.loads(ready[2]) == {"ready": False, "draining": False, "in_flight": 1, "queued": 1}
+    assert alive[0] == 200
+    assert [status for status, _, _ in answered] == [200, 200]
+
+def test_queued_requests_time_out_with_503(fake_tools):
+    async def main():
+        async with serving(make_workflow(latency=0.1), max_in_flight=1, max_queue=1, queue_timeout=0.05) as server:
+            running = asyncio.ensure_future(request(server.port, "POST", "/v1/query", {"query": "A slow question?"}))
+            await wait_for(lambda: server._running == 1)
+            queued = await request(server.port, "POST", "/v1/query", {"query": "A queued question?"})
+            return queued, await running
+    
+    queued, running = asyncio.run(main())
+    assert queued[0] == 503
+    assert queued[1]["retry-after"] == "1"
+    assert running[0] == 200
+
+def test_healthz_answers_before_readyz(fake_tools):
+    workflow = make_workflow()
+    built = threading.Event()
+    build = workflow._ensure_graph
+    workflow._ensure_graph = lambda: (built.wait(5), build())
+    
+    async def main():
+        server = WorkflowServer(workflow, host="127.0.0.1", port=0)
+        starting = asyncio.ensure_future(server.start())
+        await wait_for(lambda: server._server is not None)
+        
+        before = [
+            await request(server.port, "GET", "/healthz"),
+            await request(server.port, "GET", "/readyz"),
+            await request(server.port, "POST", "/v1/query", {"query": "Too early?"}),
+        ]
+        built.set()
+        await starting
+        after = [
+            await request(server.port, "GET", "/healthz"),
+            await request(server.port, "GET", "/readyz"),
+        ]
+        await server.shutdown()
+        return before, after
+    
+    before, after = asyncio.run(main())
+    assert [status for status, _, _ in before] == [200, 503, 503]
+    assert json.loads(before[0][2]) == {"status": "ok"}
+    assert json.loads(before[1][2])["ready"] is False
+    assert json.loads(before[2][2])["error"] == "Server is starting"
+    assert [status for status, _, _ in after] == [200, 200]
+    assert json.loads(after[1][2]) == {"ready": True, "draining": False, "in_flight": 0, "queued": 0}
+
+def test_shutdown_drains_runs_in_progress(fake_tools):
+    async def main():
+        server = await WorkflowServer(make_workflow(latency=0.1), host="127.0.0.1", port=0, drain_seconds=10).start()
+        running = asyncio.ensure_future(request(server.port, "POST", "/v1/query", {"query": "A slow question?"}))
+        await wait_for(lambda: server._running == 1)
+        
+        stopping = asyncio.ensure_future(server.shutdown())
+        await wait_for(lambda: server.draining)
+        assert not server.ready
+        # New connections are refused while the run in progress finishes
+        with pytest.raises(OSError):
+            await request(server.port, "GET", "/healthz")
+        assert not running.done()
+        
+        await stopping
+        return await running
+    
+    status, headers, body = asyncio.run(main())
+    assert status == 200
+    assert headers["connection"] == "close"
+    assert json.loads(body)["termination_reason"] == "validated"
+
+def test_shutdown_cancels_runs_after_the_drain_period(fake_tools):
+    async def main():
+        server = await WorkflowServer(make_workflow(latency=2.0), host="127.0.0.1", port=0, drain_seconds=0.1).start()
+        running = asyncio.ensure_future(request(server.port, "POST", "/v1/query", {"query": "A very slow question?"}))
+        await wait_for(lambda: server._running == 1)
+        
+        started = time.monotonic()
+        await server.shutdown()
+        return time.monotonic() - started, await running, server
+    
+    elapsed, (status, _, _), server = asyncio.run(main())
+    assert elapsed < 1.5
+    assert status is None
+    assert server._running == 0 and server._admitted == 0
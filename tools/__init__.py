@@ -1,3 +1,13 @@
-from tools.tool_factory import ToolFactory
+import importlib
 
-__all__ = ['ToolFactory']
\ No newline at end of file
+# Exports load on first access, so importing a tools submodule stays cheap
+_EXPORTS = {
+    'ToolFactory': 'tools.tool_factory'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,106 @@
+import json
+import re
+import time
+from typing import Any, Dict, Optional
+from langchain_core.runnables import RunnableConfig
+
+from tools.wrappers import DelegatingTool
+from utils.cache import CacheBackend
+from utils.single_flight import SingleFlight
+from utils.logger import logger
+from utils.tracing import record_cache_lookup
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize search text so trivially different spellings share a cache entry.
+    
+    Args:
+        query: The raw search query
+        
+    Returns:
+        The lowercased query with collapsed whitespace and no trailing punctuation
+    """
+    return _WHITESPACE.sub(" ", query.lower()).strip(" ?!.")
+
+class CachedSearchTool(DelegatingTool):
+    """
+    Search tool wrapper that caches results by normalized query with a
+    freshness TTL, and lets identical concurrent searches share one request.
+    """
+    backend: CacheBackend
+    namespace: str = "search"
+    single_flight: SingleFlight = None
+    
+    def __init__(self, tool, **kwargs: Any):
+        """
+        Initialize the wrapper around a search tool.
+        
+        Args:
+            tool: The search tool to cache
+            **kwargs: backend, and an optional namespace distinguishing tool configurations
+        """
+        super().__init__(tool, single_flight=SingleFlight(), **kwargs)
+    
+    def _key(self, query: str) -> str:
+        """Build the cache key for a query."""
+        return f"{self.namespace}:{normalize_query(query)}"
+    
+    def _load(self, key: str) -> Optional[Any]:
+        """Read and decode a cached result."""
+        start = time.perf_counter()
+        cached = self.backend.get(key)
+        record_cache_lookup("search", cached is not None, time.perf_counter() - start)
+        if cached is None:
+            return None
+        value = json.loads(cached)
+        return tuple(value) if self.response_format == "content_and_artifact" else value
+    
+    def _store(self, key: str, value: Any):
+        """Encode and cache a result, skipping failed searches."""
+        # Tavily reports errors as (message, {}) rather than raising
+        if self.response_format == "content_and_artifact" and not value[1]:
+            return
+        self.backend.set(key, json.dumps(value))
+    
+    def _run(self, query: str, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Return the cached result for the query, searching once on a miss."""
+        key = self._key(query)
+        cached = self._load(key)
+        if cached is not None:
+            logger.debug("Search cache hit", query)
+            return cached
+        
+        def search():
+            value = super(CachedSearchTool, self)._run(query, config=config, run_manager=run_manager, **kwargs)
+            self._store(key, value)
+            return value
+        
+        value, _ = self.single_flight.do(key, search)
+        return value
+    
+    async def _arun(self, query: str, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Asynchronously return the cached result for the query, searching once on a miss."""
+        key = self._key(query)
+        cached = self._load(key)
+        if cached is not None:
+            logger.debug("Search cache hit", query)
+            return cached
+        
+        async def search():
+            value = await super(CachedSearchTool, self)._arun(query, config=config, run_manager=run_manager, **kwargs)
+            self._store(key, value)
+            return value
+        
+        value, _ = await self.single_flight.ado(key, search)
+        return value
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters.
+        
+        Returns:
+            Hits, misses, evictions, size, and searches coalesced into an in-flight one
+        """
+        return {**self.backend.stats(), "coalesced": self.single_flight.coalesced}
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, ConfigDict, Field
+from langchain_core.tools import BaseTool
+
+from utils.faults import FaultInjector, LatencyDistribution
+
+class FakeSearchInput(BaseModel):
+    """Input for the fake search tool."""
+    query: str = Field(description="search query to look up")
+
+class FakeSearchTool(BaseTool):
+    """
+    Local stand-in for TavilySearchResults with the same name, arguments and
+    (content, artifact) output shape. Results are derived from the query text,
+    so runs are deterministic and need no network access or API key.
+    Latency is fixed (latency_seconds) or drawn from a distribution
+    (latency), and an optional FaultInjector adds provider errors.
+    """
+    name: str = "tavily_search_results_json"
+    description: str = "A search engine. Useful for when you need to answer questions about current events. Input should be a search query."
+    args_schema: Type[BaseModel] = FakeSearchInput
+    response_format: str = "content_and_artifact"
+    max_results: int = 2
+    latency_seconds: float = 0.0
+    latency: Optional[LatencyDistribution] = None
+    faults: Optional[FaultInjector] = None
+    calls: int = 0
+    
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    def _delay(self) -> float:
+        return self.latency.sample() if self.latency is not None else self.latency_seconds
+    
+    def _results(self, query: str) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        """Build canned results for a query."""
+        self.calls += 1
+        results = [
+            {
+                "url": f"https://example.com/{i}?q={query.replace(' ', '+')}",
+                "content": f"Result {i} for '{query}'."
+            }
+            for i in range(1, self.max_results + 1)
+        ]
+        return results, {"query": query, "results": results}
+    
+    def _run(self, query: str, run_manager: Optional[Any] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        time.sleep(self._delay())
+        if self.faults is not None:
+            self.faults.inject()
+        return self._results(query)
+    
+    async def _arun(self, query: str, run_manager: Optional[Any] = None) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        await asyncio.sleep(self._delay())
+        if self.faults is not None:
+            await self.faults.ainject()
+        return self._results(query)
+
+
+class FakePythonInput(BaseModel):
+    """Input for the fake Python tool."""
+    code: str = Field(description="The Python code to execute.")
+
+class FakePythonTool(BaseTool):
+    """
+    Local stand-in for the Python execution tools with the same arguments.
+    Code is not run; every call prints a canned result after a fixed or
+    sampled delay, so runs are deterministic and need no sandbox or API key.
+    """
+    name: str = "riza_exec_python"
+    description: str = "Execute Python code to solve problems. Always print output to stdout."
+    args_schema: Type[BaseModel] = FakePythonInput
+    output: str = "42\n"
+    latency: Optional[LatencyDistribution] = None
+    faults: Optional[FaultInjector] = None
+    calls: int = 0
+    
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    
+    def _run(self, code: str, run_manager: Optional[Any] = None) -> str:
+        self.calls += 1
+        time.sleep(self.latency.sample() if self.latency is not None else 0.0)
+        if self.faults is not None:
+            self.faults.inject()
+        return self.output
+    
+    async def _arun(self, code: str, run_manager: Optional[Any] = None) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency.sample() if self.latency is not None else 0.0)
+        if self.faults is not None:
+            await self.faults.ainject()
+        return self.output
@@ -0,0 +1,81 @@
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional
+from langchain_core.runnables import RunnableConfig
+
+from tools.wrappers import DelegatingTool
+from utils.logger import logger
+from utils.tracing import record_cache_lookup
+from utils.vector_index import VectorIndex
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+class LocalFirstSearchTool(DelegatingTool):
+    """
+    Search tool wrapper that answers from a local vector index of earlier
+    search results and research answers when it recalls enough close
+    matches, and calls the wrapped web search otherwise. Web results are
+    added to the index, so it grows with every search.
+    
+    Embeddings match wording better than figures, so a hit must also
+    contain every number in the query, e.g. the year asked about.
+    """
+    index: VectorIndex
+    min_score: float = 0.6
+    min_hits: int = 2
+    max_results: int = 4
+    max_age_seconds: Optional[float] = None
+    
+    def _recall(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Local hits for the query, or None when too few are close enough."""
+        start = time.perf_counter()
+        hits = self.index.search(query, self.max_results, self.min_score, self.max_age_seconds)
+        numbers = _NUMBER.findall(query)
+        hits = [hit for hit in hits if all(number in hit["text"] for number in numbers)]
+        recalled = len(hits) >= self.min_hits
+        record_cache_lookup("research_index", recalled, time.perf_counter() - start)
+        return hits if recalled else None
+    
+    def _local(self, query: str, hits: List[Dict[str, Any]]) -> Any:
+        """Format local hits like the wrapped tool's results."""
+        logger.debug("Research index hit", query)
+        results = [
+            {"url": hit.get("url", f"local:{hit.get('source', 'index')}"), "content": hit["text"], "score": round(hit["score"], 4)}
+            for hit in hits
+        ]
+        if self.response_format == "content_and_artifact":
+            return results, {"query": query, "results": results, "source": "local"}
+        return results
+    
+    def _remember(self, query: str, value: Any):
+        """Index the results of a web search, skipping failed searches."""
+        if self.response_format == "content_and_artifact":
+            # Tavily reports errors as (message, {}) rather than raising
+            if not value[1]:
+                return
+            value = value[0]
+        if not isinstance(value, list):
+            return
+        for result in value:
+            if isinstance(result, dict) and result.get("content"):
+                self.index.add(result["content"], source="search", url=result.get("url"), query=query)
+    
+    def _run(self, query: str, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Return local results for the query, searching the web when recall is too low."""
+        hits = self._recall(query)
+        if hits is not None:
+            return self._local(query, hits)
+        value = super()._run(query, config=config, run_manager=run_manager, **kwargs)
+        self._remember(query, value)
+        return value
+    
+    async def _arun(self, query: str, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Asynchronously return local results for the query, searching the web when recall is too low."""
+        # Embedding and file appends run in a worker thread, off the event loop
+        hits = await asyncio.to_thread(self._recall, query)
+        if hits is not None:
+            return self._local(query, hits)
+        value = await super()._arun(query, config=config, run_manager=run_manager, **kwargs)
+        await asyncio.to_thread(self._remember, query, value)
+        return value
@@ -0,0 +1,201 @@
+import json
+import math
+import re
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from langchain_core.runnables import RunnableConfig
+
+from tools.wrappers import DelegatingTool
+from utils.embeddings import Embedder, cosine_similarity
+from utils.tokens import estimate_tokens
+from utils.tracing import record_search_trim
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+class PassageRanker:
+    """
+    Turns raw search results into a compact context: splits result contents
+    into passages without sentences repeated across results, scores them
+    against the query with BM25 and optionally an embedder, and keeps the
+    best relevant ones within a token budget.
+    """
+    
+    def __init__(self, max_tokens: int = 400, passage_tokens: int = 60, duplicate_threshold: float = 0.8,
+                 embedder: Optional[Embedder] = None, semantic_weight: float = 0.3,
+                 k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize the ranker.
+        
+        Args:
+            max_tokens: Token budget for the kept passages
+            passage_tokens: Approximate size of a passage; sentences are never split
+            duplicate_threshold: Word-trigram Jaccard similarity above which a
+                passage counts as a near-duplicate
+            embedder: Adds semantic similarity to the lexical score when given
+            semantic_weight: Share of the semantic similarity in the score
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+        """
+        self.max_tokens = max_tokens
+        self.passage_tokens = passage_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.embedder = embedder
+        self.semantic_weight = semantic_weight if embedder is not None else 0.0
+        self.k1 = k1
+        self.b = b
+    
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        return _TOKEN_PATTERN.findall(text.lower())
+    
+    def _passages(self, text: str, seen: List[set]) -> List[str]:
+        """
+        Group a text's sentences into passages of about passage_tokens,
+        dropping sentences that nearly repeat one seen before.
+        
+        Args:
+            text: The result content
+            seen: Shingles of the sentences kept so far, extended in place
+            
+        Returns:
+            The passages, in document order
+        """
+        passages, current = [], []
+        for sentence in _SENTENCE_END.split(text.strip()):
+            shingles = self._shingles(self._tokens(sentence))
+            if not sentence or self._duplicate(shingles, seen):
+                continue
+            seen.append(shingles)
+            if current and estimate_tokens(" ".join(current + [sentence])) > self.passage_tokens:
+                passages.append(" ".join(current))
+                current = []
+            current.append(sentence)
+        if current:
+            passages.append(" ".join(current))
+        return passages
+    
+    def _bm25(self, query: str, documents: List[List[str]]) -> List[float]:
+        """BM25 score of each tokenized document for the query."""
+        count = len(documents)
+        average = sum(len(document) for document in documents) / count or 1.0
+        frequencies = Counter(term for document in documents for term in set(document))
+        scores = []
+        for document in documents:
+            terms = Counter(document)
+            score = 0.0
+            for term in set(self._tokens(query)):
+                if term not in terms:
+                    continue
+                idf = math.log(1 + (count - frequencies[term] + 0.5) / (frequencies[term] + 0.5))
+                tf = terms[term]
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * len(document) / average))
+            scores.append(score)
+        return scores
+    
+    @staticmethod
+    def _shingles(tokens: List[str]) -> set:
+        return set(zip(tokens, tokens[1:], tokens[2:])) if len(tokens) >= 3 else {tuple(tokens)}
+    
+    def _duplicate(self, shingles: set, others: List[set]) -> bool:
+        """Whether a text nearly repeats any of the others, by word-trigram Jaccard similarity."""
+        return any(len(shingles & other) / len(shingles | other) >= self.duplicate_threshold for other in others)
+    
+    def rank(self, query: str, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Rank, deduplicate and pack search results for a query.
+        
+        Args:
+            query: The search query
+            results: Search results with 'content' and optionally 'url' and 'title'
+            
+        Returns:
+            The results that kept at least one passage, best first, each
+            with only its kept passages as content and the best passage's score
+        """
+        # Split every result into passages, dropping sentences repeated from earlier results
+        seen: List[set] = []
+        passages: List[Tuple[int, int, str]] = [
+            (index, position, passage)
+            for index, result in enumerate(results)
+            for position, passage in enumerate(self._passages(str(result.get("content") or ""), seen))
+        ]
+        if not passages:
+            return []
+        
+        # Score them against the query, lexically and optionally semantically
+        tokenized = [self._tokens(passage) for _, _, passage in passages]
+        lexical = self._bm25(query, tokenized)
+        top = max(lexical) or 1.0
+        scores = [score / top for score in lexical]
+        if self.semantic_weight:
+            vector = self.embedder(query)
+            scores = [
+                (1 - self.semantic_weight) * score + self.semantic_weight * max(0.0, cosine_similarity(vector, self.embedder(passage)))
+                for score, (_, _, passage) in zip(scores, passages)
+            ]
+        
+        # Take the relevant passages best first within the budget, skipping near-duplicates
+        # of ones already taken. The best passage is always kept, even if it shares no
+        # words with the query, so a relevant result phrased differently is not lost
+        kept, kept_shingles, used = [], [], 0
+        for i in sorted(range(len(passages)), key=lambda i: -scores[i]):
+            shingles = self._shingles(tokenized[i])
+            if kept and (scores[i] <= 0 or self._duplicate(shingles, kept_shingles)):
+                continue
+            cost = estimate_tokens(passages[i][2])
+            if kept and used + cost > self.max_tokens:
+                continue
+            kept.append(i)
+            kept_shingles.append(shingles)
+            used += cost
+        
+        # Regroup the kept passages by result, best result first and passages in document order
+        grouped: Dict[int, List[int]] = {}
+        for i in kept:
+            grouped.setdefault(passages[i][0], []).append(i)
+        return [
+            {
+                **{key: results[index][key] for key in ("title", "url") if key in results[index]},
+                "content": " ".join(passages[i][2] for i in sorted(members, key=lambda i: passages[i][1])),
+                "score": round(scores[members[0]], 4)
+            }
+            for index, members in grouped.items()
+        ]
+
+class RankedSearchTool(DelegatingTool):
+    """
+    Search tool wrapper that passes only the most relevant, non-duplicate
+    passages of the results on to the model, within a token budget. The
+    wrapped search can then over-fetch results without growing the context.
+    Each call's tokens before and after trimming are recorded on the run's trace.
+    """
+    ranker: PassageRanker
+    
+    def _trim(self, query: str, value: Any) -> Any:
+        """Rank and pack a search's results, leaving failed searches untouched."""
+        started = time.perf_counter()
+        content, artifact = value if self.response_format == "content_and_artifact" else (value, None)
+        # Tavily reports errors as (message, {}) rather than raising
+        if not isinstance(content, list) or (self.response_format == "content_and_artifact" and not artifact):
+            return value
+        
+        ranked = self.ranker.rank(query, [result for result in content if isinstance(result, dict)])
+        record_search_trim(
+            self.name,
+            tokens_in=estimate_tokens(json.dumps(content, default=str)),
+            tokens_out=estimate_tokens(json.dumps(ranked, default=str)),
+            results_in=len(content),
+            results_out=len(ranked),
+            seconds=time.perf_counter() - started
+        )
+        return (ranked, artifact) if self.response_format == "content_and_artifact" else ranked
+    
+    def _run(self, query: str, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Search, then trim the results to the most relevant passages."""
+        return self._trim(query, super()._run(query, config=config, run_manager=run_manager, **kwargs))
+    
+    async def _arun(self, query: str, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Asynchronously search, then trim the results to the most relevant passages."""
+        return self._trim(query, await super()._arun(query, config=config, run_manager=run_manager, **kwargs))
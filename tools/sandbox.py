@@ -0,0 +1,410 @@
+import ast
+import atexit
+import json
+import math
+import operator
+import os
+import queue
+import select
+import struct
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Type
+from langchain_core.tools import BaseTool, ToolException
+from pydantic import BaseModel, Field
+
+from config.settings import (
+    SANDBOX_WORKERS,
+    SANDBOX_TIMEOUT_SECONDS,
+    SANDBOX_CPU_SECONDS,
+    SANDBOX_MEMORY_MB,
+    SANDBOX_MAX_OUTPUT_CHARS,
+    SANDBOX_MAX_JOBS_PER_WORKER,
+    SANDBOX_PRELOAD_MODULES
+)
+from utils.logger import logger
+from utils.metrics import metrics
+
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Environment of worker processes: no API keys, single-threaded numeric libraries
+_WORKER_ENV = {
+    "PATH": os.defpath,
+    "OPENBLAS_NUM_THREADS": "1",
+    "OMP_NUM_THREADS": "1",
+    "MKL_NUM_THREADS": "1",
+}
+
+class SandboxError(Exception):
+    """A sandbox worker died, timed out or broke the protocol."""
+
+class SandboxResult:
+    """Output of one snippet, as a script run would have produced it."""
+    
+    def __init__(self, stdout: str, stderr: str = "", exit_code: int = 0):
+        """
+        Initialize the result.
+        
+        Args:
+            stdout: Captured standard output
+            stderr: Captured standard error, including any traceback
+            exit_code: 0 on success, otherwise the exit code or 1 for an exception
+        """
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_code = exit_code
+
+class SandboxWorker:
+    """
+    One warm interpreter subprocess running snippets sequentially.
+    The parent enforces the wall-clock deadline; the worker itself enforces
+    CPU time, memory, file size and open-file limits and refuses network
+    access, process creation and writes outside its scratch directory.
+    """
+    
+    def __init__(self, cpu_seconds: int, memory_mb: int, max_output: int, preload: List[str]):
+        """
+        Start the worker and wait until its modules are loaded.
+        
+        Args:
+            cpu_seconds: CPU time allowed per snippet
+            memory_mb: Address space limit of the worker
+            max_output: Characters of stdout/stderr kept per snippet
+            preload: Modules imported once at startup
+        """
+        config = {"cpu_seconds": cpu_seconds, "memory_mb": memory_mb, "max_output": max_output, "preload": preload}
+        self.process = subprocess.Popen(
+            [sys.executable, "-I", _WORKER_SCRIPT, json.dumps(config)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=_WORKER_ENV,
+            start_new_session=True
+        )
+        self.jobs = 0
+        # Set once a snippet left state behind that the worker could not undo
+        self.spent = False
+        # Preloading numpy and friends can take a while on a cold disk
+        self._receive(timeout=60.0)
+    
+    def _receive(self, timeout: float) -> Dict[str, Any]:
+        """Read one length-prefixed reply, or raise SandboxError on deadline or exit."""
+        deadline = time.monotonic() + timeout
+        header = self._read(4, deadline)
+        return json.loads(self._read(struct.unpack(">I", header)[0], deadline))
+    
+    def _read(self, size: int, deadline: float) -> bytes:
+        fd = self.process.stdout.fileno()
+        data = b""
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                self.kill()
+                raise SandboxError("Execution timed out")
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                raise SandboxError(self._exit_reason())
+            data += chunk
+        return data
+    
+    def _exit_reason(self) -> str:
+        """Explain why the worker exited mid-request."""
+        code = self.process.wait()
+        if code == -24:  # SIGXCPU
+            return "CPU time limit exceeded"
+        if code == -9:
+            return "Execution was killed, possibly for exceeding the memory limit"
+        return f"Sandbox worker exited with code {code}"
+    
+    def run(self, code: str, timeout: float) -> SandboxResult:
+        """
+        Run a snippet.
+        
+        Args:
+            code: The Python source to execute
+            timeout: Wall-clock seconds allowed
+            
+        Returns:
+            The snippet's output
+        """
+        self.jobs += 1
+        body = json.dumps({"code": code}).encode("utf-8")
+        try:
+            self.process.stdin.write(struct.pack(">I", len(body)) + body)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise SandboxError(self._exit_reason())
+        reply = self._receive(timeout)
+        self.spent = self.spent or reply.get("recycle", False)
+        return SandboxResult(reply["stdout"], reply["stderr"], reply["exit_code"])
+    
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+    
+    def kill(self):
+        """Stop the worker and any process it managed to start."""
+        if self.alive:
+            try:
+                os.killpg(self.process.pid, 9)
+            except OSError:
+                self.process.kill()
+        self.process.wait()
+        self.process.stdin.close()
+        self.process.stdout.close()
+
+class SandboxPool:
+    """
+    Pre-forked pool of sandbox workers shared by the whole process.
+    Workers are started ahead of demand and replaced in the background after
+    they die, time out, import extension modules or have run max_jobs
+    snippets, so executions normally start on a warm interpreter with the
+    common modules already imported.
+    """
+    _instance: Optional['SandboxPool'] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, size: int = SANDBOX_WORKERS, timeout: float = SANDBOX_TIMEOUT_SECONDS,
+                 cpu_seconds: int = SANDBOX_CPU_SECONDS, memory_mb: int = SANDBOX_MEMORY_MB,
+                 max_output: int = SANDBOX_MAX_OUTPUT_CHARS, max_jobs: int = SANDBOX_MAX_JOBS_PER_WORKER,
+                 preload: Optional[List[str]] = None):
+        """
+        Initialize the pool and start its workers in the background.
+        
+        Args:
+            size: Number of workers, i.e. snippets run concurrently
+            timeout: Wall-clock seconds allowed per snippet
+            cpu_seconds: CPU time allowed per snippet
+            memory_mb: Address space limit per worker
+            max_output: Characters of stdout/stderr kept per snippet
+            max_jobs: Snippets a worker runs before it is replaced, bounding
+                state leaked between snippets that restoring module attributes
+                misses, such as mutated classes
+            preload: Modules each worker imports at startup; defaults to
+                SANDBOX_PRELOAD_MODULES
+        """
+        self.size = size
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self._worker_args = (cpu_seconds, memory_mb, max_output, list(SANDBOX_PRELOAD_MODULES if preload is None else preload))
+        self._idle: 'queue.Queue[SandboxWorker]' = queue.Queue()
+        self._closed = False
+        for _ in range(size):
+            self._spawn()
+    
+    @classmethod
+    def shared(cls) -> 'SandboxPool':
+        """
+        Get the process-wide pool, starting it on first use.
+        
+        Returns:
+            The shared SandboxPool
+        """
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+                    atexit.register(cls._instance.close)
+        return cls._instance
+    
+    def _spawn(self):
+        """Start a replacement worker without making the caller wait for it."""
+        def start():
+            try:
+                worker = SandboxWorker(*self._worker_args)
+            except Exception as e:
+                logger.error(f"Sandbox worker failed to start: {e}")
+                return
+            if self._closed:
+                worker.kill()
+            else:
+                self._idle.put(worker)
+        threading.Thread(target=start, name="sandbox-spawn", daemon=True).start()
+    
+    def execute(self, code: str) -> SandboxResult:
+        """
+        Run a snippet on the next idle worker.
+        
+        Args:
+            code: The Python source to execute
+            
+        Returns:
+            The snippet's output
+            
+        Raises:
+            SandboxError: If no worker became available or the snippet was killed
+        """
+        if self._closed:
+            raise SandboxError("Sandbox pool is closed")
+        try:
+            # Allow for one worker start on top of a queue of full-length snippets
+            worker = self._idle.get(timeout=self.timeout + 60.0)
+        except queue.Empty:
+            raise SandboxError("No sandbox worker available")
+        
+        metrics.gauge("sandbox_idle_workers", self._idle.qsize())
+        try:
+            result = worker.run(code, self.timeout)
+        except SandboxError:
+            worker.kill()
+            self._spawn()
+            raise
+        
+        if worker.jobs >= self.max_jobs or worker.spent or not worker.alive:
+            worker.kill()
+            self._spawn()
+        else:
+            self._idle.put(worker)
+        return result
+    
+    def close(self):
+        """Stop every idle worker; busy ones are stopped when they finish."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                return
+
+# Arithmetic the fast path evaluates in-process
+_BINARY_OPS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+}
+_UNARY_OPS = {ast.UAdd: operator.pos, ast.USub: operator.neg}
+_FUNCTIONS = {
+    "abs": abs, "round": round, "min": min, "max": max, "int": int, "float": float,
+    **{name: getattr(math, name) for name in (
+        "sqrt", "exp", "log", "log10", "log2", "sin", "cos", "tan", "asin", "acos", "atan",
+        "floor", "ceil", "factorial", "gcd", "comb", "perm", "fabs", "degrees", "radians"
+    )}
+}
+_CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+# Bounds keeping the fast path to millisecond work; anything larger goes to a worker
+_MAX_EXPONENT = 1000
+_MAX_INT_BITS = 4096
+
+class _TooExpensive(Exception):
+    """The expression is arithmetic, but not cheap enough for the fast path."""
+
+def _evaluate(node: ast.AST) -> Any:
+    """Evaluate a whitelisted arithmetic node, raising ValueError for anything else."""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+        return _CONSTANTS[node.id]
+    if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == "math" \
+            and node.attr in _CONSTANTS:
+        return _CONSTANTS[node.attr]
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _UNARY_OPS:
+        return _UNARY_OPS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow) and abs(right) > _MAX_EXPONENT:
+            raise _TooExpensive()
+        result = _BINARY_OPS[type(node.op)](left, right)
+        if isinstance(result, int) and result.bit_length() > _MAX_INT_BITS:
+            raise _TooExpensive()
+        return result
+    if isinstance(node, ast.Call) and not node.keywords:
+        function = node.func
+        name = function.attr if isinstance(function, ast.Attribute) and isinstance(function.value, ast.Name) \
+            and function.value.id == "math" else getattr(function, "id", None)
+        if name in _FUNCTIONS:
+            args = [_evaluate(arg) for arg in node.args]
+            if name in ("factorial", "comb", "perm") and any(abs(arg) > _MAX_EXPONENT for arg in args):
+                raise _TooExpensive()
+            return _FUNCTIONS[name](*args)
+    raise ValueError("not plain arithmetic")
+
+def evaluate_arithmetic(code: str) -> Optional[str]:
+    """
+    Evaluate a snippet that only prints (or is) an arithmetic expression,
+    without starting a worker.
+    
+    Args:
+        code: The Python source to execute
+        
+    Returns:
+        What the snippet would print, or None if it needs a real interpreter
+    """
+    try:
+        tree = ast.parse(code.strip())
+    except SyntaxError:
+        return None
+    
+    lines = []
+    for statement in tree.body:
+        if not isinstance(statement, ast.Expr):
+            return None
+        call = statement.value
+        is_print = isinstance(call, ast.Call) and getattr(call.func, "id", None) == "print" and not call.keywords
+        expressions = call.args if is_print else [call]
+        try:
+            values = [_evaluate(expression) for expression in expressions]
+        except (ValueError, TypeError, ArithmeticError, _TooExpensive):
+            # Errors are left to a worker, so they come with a proper traceback
+            return None
+        if is_print:
+            lines.append(" ".join(str(value) for value in values))
+        elif len(tree.body) == 1:
+            # A bare expression prints nothing in a script; report its value as a REPL would
+            lines.append(repr(values[0]))
+    return "".join(line + "\n" for line in lines) if lines else None
+
+class PythonCodeInput(BaseModel):
+    """Input for LocalPythonTool."""
+    code: str = Field(description="The Python code to execute.")
+
+class LocalPythonTool(BaseTool):
+    """
+    Python execution on this machine, interchangeable with Riza's ExecPython:
+    plain arithmetic is evaluated in-process, everything else runs in a
+    pre-forked sandbox worker from a SandboxPool.
+    """
+    name: str = "exec_python"
+    description: str = """Execute Python code to solve problems.
+    
+    The Python runtime has no network or filesystem access; math, statistics,
+    decimal, fractions, datetime, json, re, itertools, collections and numpy
+    (if installed) are available. Always print output to stdout."""
+    args_schema: Type[BaseModel] = PythonCodeInput
+    handle_tool_error: bool = True
+    
+    pool: Optional[SandboxPool] = None
+    
+    def _get_pool(self) -> SandboxPool:
+        return self.pool if self.pool is not None else SandboxPool.shared()
+    
+    def _run(self, code: str, run_manager: Optional[Any] = None) -> str:
+        """
+        Execute the code, raising ToolException with its stderr if it fails.
+        
+        Args:
+            code: The Python source to execute
+            run_manager: Unused callback manager
+            
+        Returns:
+            The code's standard output
+        """
+        start = time.perf_counter()
+        output = evaluate_arithmetic(code)
+        if output is not None:
+            metrics.observe("sandbox_execution_seconds", time.perf_counter() - start, {"path": "fast"})
+            return output
+        
+        try:
+            result = self._get_pool().execute(code)
+        except SandboxError as e:
+            raise ToolException(f"Local code execution failed: {e}")
+        finally:
+            metrics.observe("sandbox_execution_seconds", time.perf_counter() - start, {"path": "worker"})
+        if result.exit_code != 0:
+            raise ToolException(
+                f"Local code execution returned a non-zero exit code. "
+                f"The output captured from stderr was:\n{result.stderr}"
+            )
+        return result.stdout
@@ -0,0 +1,282 @@
+"""
+Sandbox worker process, started by tools.sandbox.SandboxPool.
+
+Preloads modules once, then runs submitted snippets one at a time in fresh
+globals, undoing their changes to modules afterwards. Requests and replies
+are length-prefixed JSON on the stdin/stdout pipes; the snippets' own output
+is captured, and the real file descriptors are pointed at /dev/null so user
+code cannot corrupt the protocol.
+"""
+
+# traceback imports ast lazily; importing it here keeps it out of the modules
+# a failing snippet appears to have loaded
+import ast  # noqa: F401
+import builtins
+import contextlib
+import importlib
+import io
+import json
+import os
+import struct
+import sys
+import tempfile
+import traceback
+
+try:
+    import resource
+except ImportError:  # not POSIX; only the parent's wall-clock deadline applies
+    resource = None
+
+# unshare(2) flag for a private network namespace with no interfaces
+CLONE_NEWNET = 0x40000000
+
+# Audit events refused once the worker is ready
+BLOCKED_EVENTS = (
+    "socket.__new__", "socket.connect", "socket.bind", "socket.getaddrinfo", "socket.sendto",
+    "subprocess.Popen", "os.system", "os.exec", "os.posix_spawn", "os.spawn", "os.fork",
+    "os.forkpty", "os.kill", "os.killpg", "ctypes.dlopen", "ctypes.dlsym", "ctypes.cdata",
+)
+
+class _BoundedWriter(io.StringIO):
+    """Text buffer that silently drops output beyond a character limit."""
+    
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+        self.truncated = False
+    
+    def write(self, text: str) -> int:
+        room = self.limit - self.tell()
+        if room <= 0:
+            self.truncated = self.truncated or bool(text)
+            return len(text)
+        if len(text) > room:
+            self.truncated = True
+        super().write(text[:room])
+        return len(text)
+    
+    def result(self) -> str:
+        value = self.getvalue()
+        return value + "\n...[output truncated]\n" if self.truncated else value
+
+def _isolate_network():
+    """Move into an empty network namespace where the kernel allows it."""
+    try:
+        import ctypes
+        ctypes.CDLL(None, use_errno=True).unshare(CLONE_NEWNET)
+    except Exception:
+        pass
+
+# Audit events changing the file system, with the positions of their path and dir_fd
+# arguments and whether the path's final symlink is followed
+PATH_EVENTS = {
+    "os.remove": [(0, 1, False)],
+    "os.rmdir": [(0, 1, False)],
+    "os.mkdir": [(0, 2, False)],
+    "os.chmod": [(0, 2, True)],
+    "os.chown": [(0, 3, True)],
+    "os.utime": [(0, 3, True)],
+    "os.truncate": [(0, None, True)],
+    "os.rename": [(0, 2, False), (1, 3, False)],
+    "os.link": [(0, 2, True), (1, 3, False)],
+    "os.symlink": [(1, 2, False)],
+    "shutil.rmtree": [(0, 1, False)],
+}
+
+def _fd_path(fd: int) -> str:
+    """The path an open file descriptor refers to, or '' where /proc cannot tell."""
+    try:
+        return os.readlink(f"/proc/self/fd/{fd}")
+    except OSError:
+        return ""
+
+def _resolve(path, dir_fd=None, follow: bool = True) -> str:
+    """
+    The real location a path argument refers to, or '' if it cannot be determined.
+    
+    Args:
+        path: A path, or a file descriptor
+        dir_fd: Directory descriptor a relative path is taken from
+        follow: Whether a symlink at the path itself is followed
+        
+    Returns:
+        The absolute real path
+    """
+    if isinstance(path, int):
+        return _fd_path(path)
+    if not isinstance(path, (str, bytes, os.PathLike)):
+        return ""
+    path = os.fsdecode(path)
+    # Audit events pass -1 when no dir_fd was given
+    if dir_fd not in (None, -1) and not os.path.isabs(path):
+        base = _fd_path(dir_fd)
+        if not base:
+            return ""
+        path = os.path.join(base, path)
+    if follow:
+        return os.path.realpath(path)
+    # Removing or renaming a symlink leaves its target alone
+    head, tail = os.path.split(os.path.abspath(path))
+    return os.path.join(os.path.realpath(head), tail)
+
+def _audit_hook(workdir: str):
+    """Create the audit hook refusing network, processes and file changes outside the workdir."""
+    def inside(path: str) -> bool:
+        return path.startswith(workdir + os.sep)
+    
+    def hook(event: str, args: tuple):
+        if event in BLOCKED_EVENTS:
+            raise PermissionError(f"{event} is not allowed in the sandbox")
+        if event == "open" and args and isinstance(args[0], (str, bytes)):
+            mode = args[1] if len(args) > 1 and isinstance(args[1], str) else "r"
+            flags = args[2] if len(args) > 2 and isinstance(args[2], int) else 0
+            writing = any(c in mode for c in "wax+") or flags & (os.O_WRONLY | os.O_RDWR | os.O_CREAT)
+            path = _resolve(args[0])
+            if writing and not inside(path):
+                raise PermissionError(f"Writing {path or args[0]!r} is not allowed in the sandbox")
+        elif event in PATH_EVENTS:
+            for index, dir_fd_index, follow in PATH_EVENTS[event]:
+                dir_fd = args[dir_fd_index] if dir_fd_index is not None and len(args) > dir_fd_index else None
+                path = _resolve(args[index], dir_fd, follow)
+                if not inside(path):
+                    raise PermissionError(f"{event} on {path or args[index]!r} is not allowed in the sandbox")
+    return hook
+
+class _ModuleState:
+    """
+    The worker's modules as they were before any snippet ran, so one snippet
+    cannot change what later ones see, e.g. by setting math.pi = 3.
+    """
+    
+    def __init__(self):
+        self.modules = dict(sys.modules)
+        # sys is left alone: the worker's own pipes and hooks live there
+        self.attributes = {
+            name: dict(vars(module)) for name, module in self.modules.items()
+            if name != "sys" and hasattr(module, "__dict__")
+        }
+    
+    @staticmethod
+    def _extension(module) -> bool:
+        """Whether a module is compiled or built in, and so cannot be imported a second time."""
+        if module is None:
+            return False
+        path = getattr(module, "__file__", None)
+        if path is None:
+            # Namespace packages have no file but are plain Python
+            return not hasattr(module, "__path__")
+        return not str(path).endswith(".py")
+    
+    def restore(self) -> bool:
+        """
+        Undo a snippet's changes to module attributes and sys.modules.
+        
+        Returns:
+            Whether the worker must be replaced instead, because the snippet
+            imported extension modules that cannot be unloaded
+        """
+        # Builtins first, with dict methods only, since the checks below call len() and all()
+        vars(builtins).update(self.attributes["builtins"])
+        for name, saved in self.attributes.items():
+            current = vars(self.modules[name])
+            if len(current) == len(saved) and all(current.get(key, current) is value for key, value in saved.items()):
+                continue
+            for key in [key for key in current if key not in saved]:
+                del current[key]
+            current.update(saved)
+        for name, module in self.modules.items():
+            if sys.modules.get(name) is not module:
+                sys.modules[name] = module
+        
+        imported = [name for name in sys.modules if name not in self.modules]
+        if any(self._extension(sys.modules[name]) for name in imported):
+            return True
+        # Fresh imports of pure Python modules are dropped and imported again when needed
+        for name in imported:
+            del sys.modules[name]
+        return False
+
+def _set_limits(memory_mb: int):
+    """Cap address space, file size and open files for the rest of the worker's life."""
+    if resource is None:
+        return
+    memory = memory_mb * 1024 * 1024
+    for limit, value in ((resource.RLIMIT_AS, memory), (resource.RLIMIT_FSIZE, 16 * 1024 * 1024),
+                         (resource.RLIMIT_NOFILE, 64)):
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            pass
+
+def _arm_cpu_limit(cpu_seconds: int):
+    """Allow the next snippet cpu_seconds more CPU time; the kernel kills the worker past it."""
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    try:
+        resource.setrlimit(resource.RLIMIT_CPU, (used + cpu_seconds, resource.RLIM_INFINITY))
+    except (ValueError, OSError):
+        pass
+
+def _execute(code: str, max_output: int) -> dict:
+    """Run one snippet in fresh globals, capturing its output like a script would produce it."""
+    stdout, stderr = _BoundedWriter(max_output), _BoundedWriter(max_output)
+    exit_code = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            exec(compile(code, "<sandbox>", "exec"), {"__name__": "__main__", "__builtins__": __builtins__})
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                exit_code = e.code if isinstance(e.code, int) else 1
+                if not isinstance(e.code, int):
+                    print(e.code, file=sys.stderr)
+        except BaseException:
+            exit_code = 1
+            # Drop this module's frame, so the traceback starts at the snippet
+            kind, error, tb = sys.exc_info()
+            sys.stderr.write("".join(traceback.format_exception(kind, error, tb.tb_next)))
+    return {"stdout": stdout.result(), "stderr": stderr.result(), "exit_code": exit_code}
+
+def main():
+    config = json.loads(sys.argv[1])
+    _isolate_network()
+    
+    # Warm the interpreter with the modules snippets commonly import
+    for name in config["preload"]:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+    
+    # Keep private copies of the pipes, then detach fds 0-2 from them
+    requests = os.fdopen(os.dup(0), "rb")
+    replies = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    
+    workdir = os.path.realpath(tempfile.mkdtemp(prefix="sandbox-"))
+    os.chdir(workdir)
+    sys.dont_write_bytecode = True
+    _set_limits(config["memory_mb"])
+    sys.addaudithook(_audit_hook(workdir))
+    modules = _ModuleState()
+    
+    def reply(message: dict):
+        body = json.dumps(message).encode("utf-8")
+        replies.write(struct.pack(">I", len(body)) + body)
+        replies.flush()
+    
+    reply({"ready": True})
+    while True:
+        header = requests.read(4)
+        if len(header) < 4:
+            return
+        request = json.loads(requests.read(struct.unpack(">I", header)[0]))
+        _arm_cpu_limit(config["cpu_seconds"])
+        result = _execute(request["code"], config["max_output"])
+        reply({**result, "recycle": modules.restore()})
+
+if __name__ == "__main__":
+    main()
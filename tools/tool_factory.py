@@ -1,62 +1,275 @@
-from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_community.tools.riza.command import ExecPython
-from config.settings import TAVILY_MAX_RESULTS
+import threading
+from typing import Callable, Dict, Optional
+from langchain_core.tools import BaseTool
+from tools.wrappers import RateLimitedTool, ResilientTool
+from tools.cached_search import CachedSearchTool
+from tools.local_search import LocalFirstSearchTool
+from tools.ranked_search import PassageRanker, RankedSearchTool
+from tools.sandbox import LocalPythonTool
+from config.settings import (
+    get_settings,
+    PYTHON_EXECUTOR,
+    TAVILY_MAX_RESULTS,
+    SEARCH_CACHE_BACKEND,
+    SEARCH_CACHE_PATH,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_RANKING_ENABLED,
+    SEARCH_RESULT_MAX_TOKENS,
+    SEARCH_PASSAGE_TOKENS,
+    SEARCH_DUPLICATE_THRESHOLD,
+    SEARCH_SEMANTIC_WEIGHT,
+    RESEARCH_INDEX_ENABLED,
+    RESEARCH_INDEX_PATH,
+    RESEARCH_INDEX_EMBEDDER,
+    RESEARCH_INDEX_MIN_SCORE,
+    RESEARCH_INDEX_MIN_HITS,
+    RESEARCH_INDEX_MAX_AGE_SECONDS,
+    RESEARCH_INDEX_LSH_BITS,
+    RESEARCH_INDEX_LSH_TABLES,
+    RESEARCH_INDEX_EXACT_BELOW
+)
+from utils.cache import create_cache_backend
+from utils.embeddings import HashingEmbedder, create_embedder
+from utils.rate_limiter import rate_limiters
+from utils.resilience import ResilientCaller
+from utils.vector_index import VectorIndex
 
 class ToolFactory:
     """
     Factory class for creating and managing tools used by agents.
     Follows the Factory pattern to centralize tool creation.
+    
+    Tools hold no per-call state, so the factory can also hand out pooled
+    instances (shared=True) that are created once and reused by all agents
+    and threads.
     """
+    _pool: Dict[str, BaseTool] = {}
+    _pool_lock = threading.Lock()
+    _overrides: Dict[str, Callable[[], BaseTool]] = {}
+    _research_index: Optional[VectorIndex] = None
+    _index_lock = threading.Lock()
+    python_executor: str = PYTHON_EXECUTOR
+    
+    @classmethod
+    def get_shared_tool(cls, key: str, creator: Callable[[], BaseTool]) -> BaseTool:
+        """
+        Returns the pooled tool for a key, creating it on first use.
+        
+        Args:
+            key: Pool key identifying the tool
+            creator: Callable that builds the tool when it is not pooled yet
+            
+        Returns:
+            The shared tool instance
+        """
+        tool = cls._pool.get(key)
+        if tool is None:
+            with cls._pool_lock:
+                tool = cls._pool.get(key)
+                if tool is None:
+                    tool = creator()
+                    cls._pool[key] = tool
+        return tool
+    
+    @classmethod
+    def clear_pool(cls):
+        """Drops all pooled tool instances."""
+        with cls._pool_lock:
+            cls._pool.clear()
+    
+    @classmethod
+    def override(cls, kind: str, creator: Optional[Callable[[], BaseTool]]):
+        """
+        Replace how a kind of tool is created, e.g. with a local fake for
+        benchmarks, and empty the pool so agents built afterwards use it.
+        
+        Args:
+            kind: 'tavily_search' or 'python_executor'
+            creator: Builds the replacement tool; None restores the real one
+        """
+        if kind not in ("tavily_search", "python_executor"):
+            raise ValueError(f"Unknown tool kind: {kind}")
+        if creator is None:
+            cls._overrides.pop(kind, None)
+        else:
+            cls._overrides[kind] = creator
+        cls.clear_pool()
+    
+    @staticmethod
+    def _rate_limited(tool: BaseTool, provider: str) -> BaseTool:
+        """Wraps a tool with its provider's rate limiter, if one is configured."""
+        limiter = rate_limiters.get(provider)
+        return RateLimitedTool(tool, limiter=limiter) if limiter else tool
+    
+    @staticmethod
+    def _resilient(tool: BaseTool, provider: str) -> BaseTool:
+        """Wraps a tool with its provider's deadline, retry and circuit breaker policy."""
+        return ResilientTool(tool, caller=ResilientCaller(provider))
     
     @staticmethod
-    def create_tavily_search() -> TavilySearchResults:
+    def _cached(tool: BaseTool, namespace: str) -> BaseTool:
+        """Wraps a search tool with the persistent search cache, if one is configured."""
+        backend = create_cache_backend(
+            SEARCH_CACHE_BACKEND, SEARCH_CACHE_PATH, SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS
+        )
+        return CachedSearchTool(tool, backend=backend, namespace=namespace) if backend is not None else tool
+    
+    @classmethod
+    def research_index(cls) -> Optional[VectorIndex]:
         """
-        Creates a TavilySearchResults tool instance.
+        Returns the process-wide index of earlier research, opening it on first use.
+        
+        Returns:
+            The research index, or None if RESEARCH_INDEX_ENABLED is off
+        """
+        if not RESEARCH_INDEX_ENABLED:
+            return None
+        if cls._research_index is None:
+            with cls._index_lock:
+                if cls._research_index is None:
+                    cls._research_index = VectorIndex(
+                        RESEARCH_INDEX_PATH,
+                        embedder=create_embedder(RESEARCH_INDEX_EMBEDDER),
+                        embedder_name=RESEARCH_INDEX_EMBEDDER,
+                        lsh_bits=RESEARCH_INDEX_LSH_BITS,
+                        lsh_tables=RESEARCH_INDEX_LSH_TABLES,
+                        exact_below=RESEARCH_INDEX_EXACT_BELOW
+                    )
+        return cls._research_index
+    
+    @classmethod
+    def _local_first(cls, tool: BaseTool) -> BaseTool:
+        """Wraps a search tool so the research index is consulted first, if one is configured."""
+        index = cls.research_index()
+        if index is None:
+            return tool
+        return LocalFirstSearchTool(
+            tool,
+            index=index,
+            min_score=RESEARCH_INDEX_MIN_SCORE,
+            min_hits=RESEARCH_INDEX_MIN_HITS,
+            max_age_seconds=RESEARCH_INDEX_MAX_AGE_SECONDS
+        )
+    
+    @classmethod
+    def _ranked(cls, tool: BaseTool) -> BaseTool:
+        """Wraps a search tool so only the best passages of its results reach the model, if enabled."""
+        if not SEARCH_RANKING_ENABLED:
+            return tool
+        # Share the research index's embedder rather than loading a second model
+        index = cls.research_index()
+        ranker = PassageRanker(
+            max_tokens=SEARCH_RESULT_MAX_TOKENS,
+            passage_tokens=SEARCH_PASSAGE_TOKENS,
+            duplicate_threshold=SEARCH_DUPLICATE_THRESHOLD,
+            embedder=index.embedder if index is not None else HashingEmbedder(),
+            semantic_weight=SEARCH_SEMANTIC_WEIGHT
+        )
+        return RankedSearchTool(tool, ranker=ranker)
+    
+    @classmethod
+    def create_tavily_search(cls) -> BaseTool:
+        """
+        Creates a TavilySearchResults tool instance whose over-fetched results
+        are ranked, deduplicated and packed into a token budget. Searches are
+        answered from the local research index when it recalls enough, and
+        otherwise cached by normalized query. Cache misses go through the
+        resilience layer, and every attempt through the rate limiter.
         
         Returns:
             Configured TavilySearchResults tool
         """
-        return TavilySearchResults(max_results=TAVILY_MAX_RESULTS)
+        if "tavily_search" in cls._overrides:
+            return cls._overrides["tavily_search"]()
+        
+        # Imported here, so langchain_community only loads once the tool is needed
+        from langchain_community.tools.tavily_search import TavilySearchResults
+        
+        get_settings().export_tool_keys()
+        search = cls._rate_limited(TavilySearchResults(max_results=TAVILY_MAX_RESULTS), "tavily")
+        return cls._ranked(cls._local_first(cls._cached(cls._resilient(search, "tavily"), f"tavily:{TAVILY_MAX_RESULTS}")))
     
-    @staticmethod
-    def create_python_executor() -> ExecPython:
+    @classmethod
+    def create_python_executor(cls, executor: Optional[str] = None) -> BaseTool:
         """
-        Creates an ExecPython tool instance.
+        Creates a Python execution tool: Riza's remote ExecPython with the
+        resilience layer, or the local sandboxed executor.
         
+        Args:
+            executor: 'riza' or 'local'; defaults to the factory's python_executor
+            
         Returns:
-            Configured ExecPython tool
+            Configured Python execution tool
         """
-        return ExecPython()
+        if "python_executor" in cls._overrides:
+            return cls._overrides["python_executor"]()
+        executor = executor or cls.python_executor
+        if executor == "local":
+            return LocalPythonTool()
+        if executor != "riza":
+            raise ValueError(f"Unknown Python executor: {executor}")
+        
+        from langchain_community.tools.riza.command import ExecPython
+        
+        get_settings().export_tool_keys()
+        return cls._resilient(cls._rate_limited(ExecPython(), "riza"), "riza")
+    
+    @classmethod
+    def _tavily_search(cls, shared: bool) -> BaseTool:
+        """Returns a pooled or fresh Tavily search tool."""
+        if shared:
+            return cls.get_shared_tool("tavily_search", cls.create_tavily_search)
+        return cls.create_tavily_search()
+    
+    @classmethod
+    def _python_executor(cls, shared: bool, executor: Optional[str] = None) -> BaseTool:
+        """Returns a pooled or fresh Python executor tool."""
+        executor = executor or cls.python_executor
+        if shared:
+            return cls.get_shared_tool(f"python_executor:{executor}", lambda: cls.create_python_executor(executor))
+        return cls.create_python_executor(executor)
     
     @classmethod
-    def create_all_tools(cls) -> list:
+    def create_all_tools(cls, shared: bool = False) -> list:
         """
         Creates all available tools.
         
+        Args:
+            shared: Whether to return pooled instances instead of new ones
+            
         Returns:
             List of all tool instances
         """
         return [
-            cls.create_tavily_search(),
-            cls.create_python_executor()
+            cls._tavily_search(shared),
+            cls._python_executor(shared)
         ]
     
     @classmethod
-    def create_research_tools(cls) -> list:
+    def create_research_tools(cls, shared: bool = False) -> list:
         """
         Creates tools specifically for research tasks.
         
+        Args:
+            shared: Whether to return pooled instances instead of new ones
+            
         Returns:
             List of research-focused tool instances
         """
-        return [cls.create_tavily_search()]
+        return [cls._tavily_search(shared)]
     
     @classmethod
-    def create_coding_tools(cls) -> list:
+    def create_coding_tools(cls, shared: bool = False, executor: Optional[str] = None) -> list:
         """
         Creates tools specifically for coding tasks.
         
+        Args:
+            shared: Whether to return pooled instances instead of new ones
+            executor: Python executor to use ('riza' or 'local'); defaults to
+                the factory's python_executor
+                
         Returns:
             List of coding-focused tool instances
         """
-        return [cls.create_python_executor()]
\ No newline at end of file
+        return [cls._python_executor(shared, executor)]
\ No newline at end of file
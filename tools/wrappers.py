@@ -0,0 +1,124 @@
+import re
+from inspect import signature
+from typing import Any, Callable, Optional
+from langchain_core.rate_limiters import BaseRateLimiter
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+
+from utils.resilience import RETRYABLE_ERROR_NAMES, RETRYABLE_STATUS_CODES, ResilientCaller
+
+_STATUS_PATTERN = re.compile(r"\b([45]\d\d)\b")
+
+class DelegatingTool(BaseTool):
+    """
+    Base class for tools that wrap another tool.
+    Exposes the wrapped tool's name, description and argument schema so the
+    wrapper is interchangeable with it; subclasses add behaviour around the call.
+    """
+    tool: BaseTool
+    
+    def __init__(self, tool: BaseTool, **kwargs: Any):
+        """
+        Initialize the wrapper around a tool.
+        
+        Args:
+            tool: The tool to delegate to
+            **kwargs: Additional fields of the wrapper
+        """
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            response_format=tool.response_format,
+            tool=tool,
+            **kwargs
+        )
+    
+    @staticmethod
+    def _forward(method: Callable, config: RunnableConfig, run_manager: Optional[Any], kwargs: dict) -> dict:
+        """Add the config and run manager to the call if the wrapped method accepts them."""
+        parameters = signature(method).parameters
+        if "run_manager" in parameters:
+            kwargs["run_manager"] = run_manager
+        if "config" in parameters:
+            kwargs["config"] = config
+        return kwargs
+    
+    def _run(self, *args: Any, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Call the wrapped tool."""
+        return self.tool._run(*args, **self._forward(self.tool._run, config, run_manager, kwargs))
+    
+    async def _arun(self, *args: Any, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Asynchronously call the wrapped tool."""
+        return await self.tool._arun(*args, **self._forward(self.tool._arun, config, run_manager, kwargs))
+
+class RateLimitedTool(DelegatingTool):
+    """Tool wrapper that waits for a rate limiter token before every call."""
+    limiter: BaseRateLimiter
+    
+    def _run(self, *args: Any, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Wait for the limiter, then call the wrapped tool."""
+        self.limiter.acquire()
+        return super()._run(*args, config=config, run_manager=run_manager, **kwargs)
+    
+    async def _arun(self, *args: Any, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Wait for the limiter without blocking the event loop, then call the wrapped tool."""
+        await self.limiter.aacquire()
+        return await super()._arun(*args, config=config, run_manager=run_manager, **kwargs)
+
+class ToolCallError(Exception):
+    """
+    A failure that the wrapped tool reported as its output instead of raising,
+    as TavilySearchResults does with a (error text, empty artifact) pair.
+    """
+    
+    def __init__(self, result: Any):
+        """
+        Initialize the error from the tool's output.
+        
+        Args:
+            result: The (content, artifact) pair the tool returned
+        """
+        self.result = result
+        content = result[0]
+        super().__init__(content)
+        match = _STATUS_PATTERN.search(content)
+        self.status_code = int(match.group(1)) if match else None
+        if self.status_code is not None:
+            self.retryable = self.status_code in RETRYABLE_STATUS_CODES
+        else:
+            self.retryable = any(name in content for name in RETRYABLE_ERROR_NAMES)
+
+class ResilientTool(DelegatingTool):
+    """
+    Tool wrapper that runs every call through a ResilientCaller: per-attempt
+    deadline, jittered backoff on retryable errors, hedging and the provider's
+    circuit breaker. Errors the tool returns as output are retried the same
+    way, and the last such output is returned if every attempt fails.
+    """
+    caller: ResilientCaller
+    
+    def _check(self, result: Any) -> Any:
+        """Raise ToolCallError if the result is an error reported as output."""
+        if (self.response_format == "content_and_artifact" and isinstance(result, tuple)
+                and isinstance(result[0], str) and not result[1]):
+            raise ToolCallError(result)
+        return result
+    
+    def _run(self, *args: Any, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Call the wrapped tool with retries."""
+        try:
+            return self.caller.call(
+                lambda: self._check(super(ResilientTool, self)._run(*args, config=config, run_manager=run_manager, **kwargs))
+            )
+        except ToolCallError as e:
+            return e.result
+    
+    async def _arun(self, *args: Any, config: RunnableConfig, run_manager: Optional[Any] = None, **kwargs: Any) -> Any:
+        """Asynchronously call the wrapped tool with retries."""
+        async def attempt() -> Any:
+            return self._check(await super(ResilientTool, self)._arun(*args, config=config, run_manager=run_manager, **kwargs))
+        try:
+            return await self.caller.acall(attempt)
+        except ToolCallError as e:
+            return e.result
@@ -0,0 +1,195 @@
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional
+
+class CacheBackend(ABC):
+    """
+    Abstract string key/value store with TTL and size-based LRU eviction.
+    Backends are thread-safe and keep hit/miss/eviction counters.
+    """
+    
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the backend.
+        
+        Args:
+            max_entries: Entries kept before the least recently used are evicted
+            ttl_seconds: Seconds an entry stays valid; None keeps entries until evicted
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+    
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a value, refreshing its recency.
+        
+        Args:
+            key: The cache key
+            
+        Returns:
+            The cached value, or None on a miss or expired entry
+        """
+        pass
+    
+    @abstractmethod
+    def set(self, key: str, value: str):
+        """
+        Store a value, evicting the least recently used entries if full.
+        
+        Args:
+            key: The cache key
+            value: The value to store
+        """
+        pass
+    
+    @abstractmethod
+    def clear(self):
+        """Remove every entry."""
+        pass
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+    
+    def _expired(self, created: float) -> bool:
+        """Whether an entry created at the given time is past its TTL."""
+        return self.ttl_seconds is not None and time.time() - created > self.ttl_seconds
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters.
+        
+        Returns:
+            Hits, misses, evictions and current size
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+        }
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process LRU cache backed by an OrderedDict."""
+    
+    def __init__(self, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        super().__init__(max_entries, ttl_seconds)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[1]):
+                if entry is not None:
+                    del self._entries[key]
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCacheBackend(CacheBackend):
+    """On-disk LRU cache stored in a single SQLite table, shared across processes and restarts."""
+    
+    def __init__(self, path: str, max_entries: int = 10000, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the backend, creating the database file if needed.
+        
+        Args:
+            path: Path of the SQLite database file
+            max_entries: Entries kept before the least recently used are evicted
+            ttl_seconds: Seconds an entry stays valid; None keeps entries until evicted
+        """
+        super().__init__(max_entries, ttl_seconds)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None or self._expired(row[1]):
+                if row is not None:
+                    self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                    self.evictions += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+    
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now)
+            )
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)",
+                    (excess,)
+                )
+                self.evictions += excess
+    
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+    
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+def create_cache_backend(backend: Optional[str], path: str, max_entries: int,
+                         ttl_seconds: Optional[float]) -> Optional[CacheBackend]:
+    """
+    Create a cache backend from configuration values.
+    
+    Args:
+        backend: 'memory', 'sqlite', or None to disable caching
+        path: Database path used by the SQLite backend
+        max_entries: Entries kept before LRU eviction
+        ttl_seconds: Seconds an entry stays valid
+        
+    Returns:
+        The configured backend, or None if caching is disabled
+    """
+    if not backend:
+        return None
+    if backend == "memory":
+        return MemoryCacheBackend(max_entries, ttl_seconds)
+    if backend == "sqlite":
+        return SQLiteCacheBackend(path, max_entries, ttl_seconds)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,116 @@
+import math
+import re
+import zlib
+from typing import Callable, List, Sequence
+
+# An embedder maps text to a fixed-length vector; any local model can be plugged in
+Embedder = Callable[[str], List[float]]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+class HashingEmbedder:
+    """
+    Dependency-free local embedder using signed feature hashing of words and
+    word bigrams. It captures lexical overlap only, which is enough to match
+    reworded repeats of the same request without calling a remote model.
+    """
+    
+    def __init__(self, dimensions: int = 256):
+        """
+        Initialize the embedder.
+        
+        Args:
+            dimensions: Length of the produced vectors
+        """
+        self.dimensions = dimensions
+    
+    def __call__(self, text: str) -> List[float]:
+        """
+        Embed a text.
+        
+        Args:
+            text: The text to embed
+            
+        Returns:
+            An L2-normalized vector of length `dimensions`
+        """
+        vector = [0.0] * self.dimensions
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        
+        for feature in features:
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dimensions] += sign
+        
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+class SentenceTransformerEmbedder:
+    """
+    Local neural embedder backed by a sentence-transformers model. The model
+    is downloaded once and then runs offline; it captures meaning rather than
+    only word overlap.
+    """
+    
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        """
+        Initialize the embedder, loading the model.
+        
+        Args:
+            model_name: sentence-transformers model name or local path
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The sentence-transformers embedder requires sentence-transformers: "
+                "pip install sentence-transformers"
+            ) from e
+        self.model = SentenceTransformer(model_name)
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+    
+    def __call__(self, text: str) -> List[float]:
+        """
+        Embed a text.
+        
+        Args:
+            text: The text to embed
+            
+        Returns:
+            An L2-normalized vector of length `dimensions`
+        """
+        return self.model.encode(text, normalize_embeddings=True).tolist()
+
+def create_embedder(spec: str) -> Embedder:
+    """
+    Create an embedder from a 'kind:argument' spec.
+    
+    Args:
+        spec: 'hashing' or 'hashing:<dimensions>', or
+            'sentence-transformers:<model name>'
+            
+    Returns:
+        The embedder
+    """
+    kind, _, argument = spec.partition(":")
+    if kind == "hashing":
+        return HashingEmbedder(int(argument) if argument else 256)
+    if kind == "sentence-transformers":
+        return SentenceTransformerEmbedder(argument or "all-MiniLM-L6-v2")
+    raise ValueError(f"Unknown embedder: {spec}")
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """
+    Compute the cosine similarity of two vectors.
+    
+    Args:
+        a: First vector
+        b: Second vector
+        
+    Returns:
+        The cosine similarity, or 0.0 if either vector is zero
+    """
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
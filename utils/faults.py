@@ -0,0 +1,144 @@
+import asyncio
+import math
+import random
+import threading
+import time
+from typing import Optional
+
+class InjectedFault(Exception):
+    """Provider-style error raised by a FaultInjector, carrying an HTTP status."""
+    
+    def __init__(self, status_code: int):
+        """
+        Initialize the fault.
+        
+        Args:
+            status_code: The HTTP status the fake provider answers with
+        """
+        self.status_code = status_code
+        super().__init__(f"Injected fault: HTTP {status_code}")
+
+class LatencyDistribution:
+    """
+    Seeded latency generator for fake providers. Draws are clamped at zero and
+    reproducible for a given seed, so benchmark runs are comparable.
+    """
+    KINDS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+    
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed: Optional[int] = 0):
+        """
+        Initialize the distribution.
+        
+        Args:
+            kind: 'fixed' (a seconds), 'uniform' (between a and b), 'normal'
+                (mean a, stddev b), 'lognormal' (median a, sigma b) or
+                'exponential' (mean a)
+            a: First parameter, in seconds
+            b: Second parameter
+            seed: Random seed; None for nondeterministic draws
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = 0) -> 'LatencyDistribution':
+        """
+        Build a distribution from a 'kind:a,b' string such as 'lognormal:0.4,0.5'
+        or a bare number of seconds.
+        
+        Args:
+            spec: The distribution specification
+            seed: Random seed
+            
+        Returns:
+            The distribution
+        """
+        kind, _, params = spec.partition(":")
+        if not params:
+            return cls("fixed", float(kind), seed=seed)
+        values = [float(value) for value in params.split(",")]
+        return cls(kind, *values, seed=seed)
+    
+    def sample(self) -> float:
+        """Draw a latency in seconds."""
+        with self._lock:
+            if self.kind == "fixed":
+                value = self.a
+            elif self.kind == "uniform":
+                value = self._random.uniform(self.a, self.b)
+            elif self.kind == "normal":
+                value = self._random.gauss(self.a, self.b)
+            elif self.kind == "lognormal":
+                value = self.a * math.exp(self._random.gauss(0.0, self.b))
+            else:
+                value = self._random.expovariate(1.0 / self.a) if self.a > 0 else 0.0
+        return max(0.0, value)
+    
+    def __repr__(self) -> str:
+        return f"LatencyDistribution({self.kind}, {self.a:g}, {self.b:g})"
+
+class FaultInjector:
+    """
+    Injects latency and errors into fake providers, so the resilience layer can
+    be exercised locally. Draws come from a seeded generator, so a given
+    configuration fails the same calls on every run.
+    """
+    
+    def __init__(self, error_rate: float = 0.0, status_code: int = 503, latency_seconds: float = 0.0,
+                 slow_rate: float = 0.0, slow_seconds: float = 0.0, fail_first: int = 0,
+                 seed: Optional[int] = 0):
+        """
+        Initialize the injector.
+        
+        Args:
+            error_rate: Probability that a call fails with status_code
+            status_code: Status of injected errors, e.g. 429 or 503
+            latency_seconds: Latency added to every call
+            slow_rate: Probability that a call is additionally delayed by slow_seconds
+            slow_seconds: Extra latency of slow calls, to exercise deadlines and hedging
+            fail_first: Number of initial calls that always fail
+            seed: Random seed; None for nondeterministic draws
+        """
+        self.error_rate = error_rate
+        self.status_code = status_code
+        self.latency_seconds = latency_seconds
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.fail_first = fail_first
+        self.calls = 0
+        self.faults = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def _draw(self):
+        """Decide the delay and failure of the next call."""
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_seconds
+            if self._random.random() < self.slow_rate:
+                delay += self.slow_seconds
+            fail = self.calls <= self.fail_first or self._random.random() < self.error_rate
+            if fail:
+                self.faults += 1
+        return delay, fail
+    
+    def inject(self):
+        """Sleep and possibly raise, before a fake provider answers."""
+        delay, fail = self._draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise InjectedFault(self.status_code)
+    
+    async def ainject(self):
+        """Asynchronously sleep and possibly raise, before a fake provider answers."""
+        delay, fail = self._draw()
+        if delay:
+            await asyncio.sleep(delay)
+        if fail:
+            raise InjectedFault(self.status_code)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+from utils.cache import CacheBackend
+from utils.embeddings import Embedder, HashingEmbedder, cosine_similarity
+from utils.tracing import record_cache_lookup
+
+class LLMResponseCache(BaseCache):
+    """
+    LangChain cache for chat model responses.
+    
+    The exact tier is keyed on the hash of LangChain's llm_string (model name,
+    parameters and bound tools, which includes any structured-output schema)
+    and the serialized prompt messages, minus the per-run message ids. An optional semantic tier matches
+    prompts for the same llm_string whose non-system message text embeds
+    within a cosine similarity threshold of a cached one.
+    """
+    
+    def __init__(self, backend: CacheBackend, semantic_threshold: Optional[float] = None,
+                 embedder: Optional[Embedder] = None, semantic_max_entries: int = 1000):
+        """
+        Initialize the cache.
+        
+        Args:
+            backend: Store for serialized responses
+            semantic_threshold: Minimum cosine similarity for a semantic hit; None disables the tier
+            embedder: Local embedding function for the semantic tier
+            semantic_max_entries: Number of recent prompts indexed for semantic lookup
+        """
+        self.backend = backend
+        self.semantic_threshold = semantic_threshold
+        self.embedder = embedder or HashingEmbedder()
+        self._semantic_index = deque(maxlen=semantic_max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        """Hash the model configuration and prompt into a cache key."""
+        try:
+            messages = json.loads(prompt)
+        except ValueError:
+            messages = None
+        
+        # Message ids are random per run, so they must not distinguish prompts
+        if isinstance(messages, list):
+            for message in messages:
+                if isinstance(message, dict) and isinstance(message.get("kwargs"), dict):
+                    message["kwargs"].pop("id", None)
+            prompt = json.dumps(messages, sort_keys=True)
+        
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+    
+    @staticmethod
+    def _prompt_text(prompt: str) -> str:
+        """
+        Extract the non-system message text from a serialized chat prompt.
+        The system prompt is identical across calls and would swamp similarity.
+        """
+        try:
+            messages = json.loads(prompt)
+        except ValueError:
+            return prompt
+        if not isinstance(messages, list):
+            return prompt
+        
+        parts = []
+        for message in messages:
+            if not isinstance(message, dict):
+                continue
+            if "SystemMessage" in message.get("id", []):
+                continue
+            content = message.get("kwargs", {}).get("content")
+            if isinstance(content, str):
+                parts.append(content)
+        return "\n".join(parts) or prompt
+    
+    def _semantic_key(self, prompt: str, llm_string: str) -> Optional[str]:
+        """Find the key of the most similar indexed prompt above the threshold."""
+        vector = self.embedder(self._prompt_text(prompt))
+        best_key, best_score = None, self.semantic_threshold
+        with self._lock:
+            candidates = list(self._semantic_index)
+        for candidate_llm_string, candidate_vector, key in candidates:
+            if candidate_llm_string != llm_string:
+                continue
+            score = cosine_similarity(vector, candidate_vector)
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+    
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        """Look up a cached response by exact key, then by semantic similarity."""
+        start = time.perf_counter()
+        cached = self.backend.get(self._key(prompt, llm_string))
+        if cached is not None:
+            self.hits += 1
+            record_cache_lookup("llm", True, time.perf_counter() - start)
+            return loads(cached)
+        
+        if self.semantic_threshold is not None:
+            key = self._semantic_key(prompt, llm_string)
+            cached = self.backend.get(key) if key else None
+            if cached is not None:
+                self.semantic_hits += 1
+                record_cache_lookup("llm_semantic", True, time.perf_counter() - start)
+                return loads(cached)
+        
+        self.misses += 1
+        record_cache_lookup("llm", False, time.perf_counter() - start)
+        return None
+    
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        """Store a response and index its prompt for semantic lookup."""
+        key = self._key(prompt, llm_string)
+        self.backend.set(key, dumps(list(return_val)))
+        
+        if self.semantic_threshold is not None:
+            vector = self.embedder(self._prompt_text(prompt))
+            with self._lock:
+                self._semantic_index.append((llm_string, vector, key))
+    
+    def clear(self, **kwargs: Any):
+        """Remove every cached response."""
+        self.backend.clear()
+        with self._lock:
+            self._semantic_index.clear()
+    
+    def stats(self) -> Dict[str, int]:
+        """
+        Get the cache counters.
+        
+        Returns:
+            Exact hits, semantic hits, misses, evictions and current size
+        """
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "size": len(self.backend),
+        }
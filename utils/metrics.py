@@ -0,0 +1,207 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+# Latency buckets in seconds, from cache hits up to slow multi-hop LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize an empty histogram.
+        
+        Args:
+            buckets: Sorted upper bounds of the buckets
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """
+        Record a value.
+        
+        Args:
+            value: The observed value
+        """
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile from the bucket counts.
+        
+        Args:
+            q: The quantile in [0, 1]
+            
+        Returns:
+            The upper bound of the bucket containing the quantile
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class MetricsRegistry:
+    """
+    Process-wide counters and histograms with labels, exportable in the
+    Prometheus text format and over a local HTTP endpoint.
+    """
+    
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+    
+    @staticmethod
+    def _key(labels: Optional[Dict[str, str]]) -> LabelKey:
+        return tuple(sorted((labels or {}).items()))
+    
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        """
+        Increase a counter.
+        
+        Args:
+            name: The metric name
+            value: The amount to add
+            labels: Label values identifying the series
+        """
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = self._key(labels)
+            series[key] = series.get(key, 0) + value
+    
+    def gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """
+        Set a gauge to its current value.
+        
+        Args:
+            name: The metric name
+            value: The current value
+            labels: Label values identifying the series
+        """
+        with self._lock:
+            self._gauges.setdefault(name, {})[self._key(labels)] = value
+    
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        """
+        Record a value in a histogram.
+        
+        Args:
+            name: The metric name
+            value: The observed value
+            labels: Label values identifying the series
+        """
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            key = self._key(labels)
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+    
+    def histogram(self, name: str, labels: Optional[Dict[str, str]] = None) -> Optional[Histogram]:
+        """
+        Get a histogram series.
+        
+        Args:
+            name: The metric name
+            labels: Label values identifying the series
+            
+        Returns:
+            The histogram, or None if nothing was observed
+        """
+        return self._histograms.get(name, {}).get(self._key(labels))
+    
+    def reset(self):
+        """Drop every recorded series."""
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+    
+    @staticmethod
+    def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = key + extra
+        if not pairs:
+            return ""
+        escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+    
+    def render_prometheus(self) -> str:
+        """
+        Render every series in the Prometheus text exposition format.
+        
+        Returns:
+            The exposition text
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{self._format_labels(key)} {value}")
+            for name, series in sorted(self._gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                for key, value in series.items():
+                    lines.append(f"{name}{self._format_labels(key)} {value}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{name}_bucket{self._format_labels(key, (('le', le),))} {cumulative}")
+                    lines.append(f"{name}_sum{self._format_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{self._format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+    
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve the metrics at http://host:port/metrics from a daemon thread.
+        
+        Args:
+            port: The port to listen on (0 picks a free port)
+            host: The interface to bind
+            
+        Returns:
+            The running server
+        """
+        registry = self
+        
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+# Create a singleton instance
+metrics = MetricsRegistry()
@@ -0,0 +1,98 @@
+import threading
+from typing import Dict, Optional
+
+from config.settings import RATE_LIMITS
+from utils.scheduler import RequestScheduler
+
+class RateLimiterRegistry:
+    """
+    Process-wide registry of request schedulers, one per provider (e.g.
+    'groq', 'tavily', 'riza') or per provider model ('groq:<model>').
+    Clients look their scheduler up when they are created, so limits must be
+    configured before the workflow is built; RATE_LIMITS provides defaults.
+    """
+    
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        """
+        Initialize the registry.
+        
+        Args:
+            limits: Limits per provider or provider:model key; defaults to RATE_LIMITS
+        """
+        self._limiters: Dict[str, RequestScheduler] = {}
+        self._lock = threading.Lock()
+        for key, limit in (RATE_LIMITS if limits is None else limits).items():
+            provider, _, model = key.partition(":")
+            self.configure_limits(provider, model=model or None, **limit)
+    
+    @staticmethod
+    def _key(provider: str, model: Optional[str] = None) -> str:
+        return f"{provider}:{model}" if model else provider
+    
+    def configure_limits(self, provider: str, requests_per_minute: Optional[float] = None,
+                         tokens_per_minute: Optional[float] = None, model: Optional[str] = None,
+                         burst_seconds: float = 10.0) -> RequestScheduler:
+        """
+        Set the request and token rates allowed for a provider or one of its models.
+        
+        Args:
+            provider: The provider name
+            requests_per_minute: Requests per minute allowed; None for unlimited
+            tokens_per_minute: Tokens per minute allowed; None for unlimited
+            model: Limit only this model of the provider
+            burst_seconds: Seconds of traffic allowed in a single burst
+            
+        Returns:
+            The scheduler registered for the provider or model
+        """
+        key = self._key(provider, model)
+        scheduler = RequestScheduler(key, requests_per_minute, tokens_per_minute, burst_seconds)
+        with self._lock:
+            self._limiters[key] = scheduler
+        return scheduler
+    
+    def configure(self, provider: str, requests_per_second: float) -> RequestScheduler:
+        """
+        Set the request rate allowed for a provider.
+        
+        Args:
+            provider: The provider name
+            requests_per_second: Sustained requests per second allowed
+            
+        Returns:
+            The scheduler registered for the provider
+        """
+        # A one-second burst, as a per-second limit implies
+        return self.configure_limits(provider, requests_per_minute=requests_per_second * 60, burst_seconds=1.0)
+    
+    def get(self, provider: str, model: Optional[str] = None) -> Optional[RequestScheduler]:
+        """
+        Get the scheduler for a provider or provider model.
+        
+        Args:
+            provider: The provider name
+            model: The model, if the caller uses one; a model-specific limit
+                takes precedence over the provider's
+                
+        Returns:
+            The scheduler, or None if the provider is unlimited
+        """
+        if model:
+            scheduler = self._limiters.get(self._key(provider, model))
+            if scheduler is not None:
+                return scheduler
+        return self._limiters.get(provider)
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get every scheduler's counters.
+        
+        Returns:
+            Stats per provider or provider:model key
+        """
+        with self._lock:
+            schedulers = dict(self._limiters)
+        return {key: scheduler.stats() for key, scheduler in schedulers.items()}
+
+# Create a singleton instance
+rate_limiters = RateLimiterRegistry()
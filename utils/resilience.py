@@ -0,0 +1,457 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from config.settings import (
+    RESILIENCE_POLICIES,
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    CIRCUIT_BREAKER_RESET_SECONDS
+)
+from utils.logger import logger
+from utils.metrics import metrics
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying: timeouts, rate limits and transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504, 529}
+
+# Exception class names raised by provider SDKs (groq, openai, httpx, requests) for transient failures
+RETRYABLE_ERROR_NAMES = (
+    "Timeout", "RateLimit", "APIConnection", "ConnectError", "ConnectionError",
+    "InternalServer", "ServiceUnavailable", "RemoteProtocol", "ReadError",
+)
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit breaker is open."""
+    
+    def __init__(self, provider: str, retry_in: float):
+        """
+        Initialize the error.
+        
+        Args:
+            provider: The provider whose circuit is open
+            retry_in: Seconds until the breaker lets a trial call through
+        """
+        self.provider = provider
+        self.retry_in = retry_in
+        super().__init__(f"Circuit for '{provider}' is open; retry in {retry_in:.1f}s")
+
+class CallTimeoutError(TimeoutError):
+    """Raised when a call does not finish within its deadline."""
+    pass
+
+def status_code(error: BaseException) -> Optional[int]:
+    """
+    Get the HTTP status carried by a provider error, if any.
+    
+    Args:
+        error: The exception raised by the call
+        
+    Returns:
+        The status code, or None
+    """
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decide whether a failed call may succeed if repeated.
+    
+    Args:
+        error: The exception raised by the call
+        
+    Returns:
+        True for timeouts, connection errors, rate limits and 5xx responses,
+        unless the error sets its own 'retryable' attribute
+    """
+    if isinstance(error, CircuitOpenError):
+        return False
+    if getattr(error, "retryable", None) is not None:
+        return error.retryable
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS_CODES
+    return any(name in type(error).__name__ for name in RETRYABLE_ERROR_NAMES)
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Read the provider's Retry-After hint from an error response.
+    
+    Args:
+        error: The exception raised by the call
+        
+    Returns:
+        Seconds to wait, or None if the provider gave no hint
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class RetryPolicy:
+    """Deadline, retry and hedging settings for calls to one provider."""
+    
+    def __init__(self, max_attempts: int = 3, timeout: Optional[float] = 60.0, base_delay: float = 0.5,
+                 max_delay: float = 8.0, hedge_after: Optional[float] = None):
+        """
+        Initialize the policy.
+        
+        Args:
+            max_attempts: Attempts per call, including the first
+            timeout: Seconds each attempt may take; None waits indefinitely
+            base_delay: Backoff before the first retry; doubles per retry
+            max_delay: Upper bound on a single backoff
+            hedge_after: Seconds after which a duplicate request is sent if the
+                first has not answered; None disables hedging
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_after = hedge_after
+    
+    @classmethod
+    def for_provider(cls, provider: str) -> 'RetryPolicy':
+        """
+        Build the policy for a provider from RESILIENCE_POLICIES.
+        
+        Args:
+            provider: The provider name, e.g. 'groq' or 'tavily'
+            
+        Returns:
+            The provider's settings merged over the defaults
+        """
+        settings = {**RESILIENCE_POLICIES.get("default", {}), **RESILIENCE_POLICIES.get(provider, {})}
+        return cls(**settings)
+    
+    def backoff(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        Compute the wait before a retry with full jitter.
+        
+        Args:
+            attempt: The number of the attempt that just failed, from 1
+            error: The error it failed with, checked for a Retry-After hint
+            
+        Returns:
+            Seconds to wait
+        """
+        hint = retry_after(error) if error is not None else None
+        if hint is not None:
+            return min(hint, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+    After enough consecutive failures the circuit opens and calls fail fast;
+    once the reset timeout passes a single trial call is let through, and its
+    outcome closes the circuit again or re-opens it.
+    """
+    
+    def __init__(self, provider: str, failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_BREAKER_RESET_SECONDS):
+        """
+        Initialize a closed breaker.
+        
+        Args:
+            provider: The provider the breaker protects
+            failure_threshold: Consecutive failures that open the circuit
+            reset_seconds: Seconds the circuit stays open before a trial call
+        """
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half_open'."""
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+    
+    def before_call(self):
+        """
+        Check that a call may go ahead.
+        
+        Raises:
+            CircuitOpenError: If the circuit is open, or half open with a trial already running
+        """
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+        metrics.inc("resilience_circuit_rejections_total", 1, {"provider": self.provider})
+        raise CircuitOpenError(self.provider, retry_in)
+    
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"Circuit for '{self.provider}' closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+    
+    def release(self):
+        """End a call whose failure says nothing about the provider's health."""
+        with self._lock:
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        """Count a failed call, opening the circuit at the threshold or after a failed trial."""
+        with self._lock:
+            self.failures += 1
+            trial_failed = self._trial_in_flight
+            self._trial_in_flight = False
+            if trial_failed or (self.opened_at is None and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                logger.warning(f"Circuit for '{self.provider}' opened after {self.failures} consecutive failures")
+                metrics.inc("resilience_circuit_opened_total", 1, {"provider": self.provider})
+
+class CircuitBreakerRegistry:
+    """Process-wide registry holding one circuit breaker per provider."""
+    
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, provider: str) -> CircuitBreaker:
+        """
+        Get the breaker for a provider, creating it on first use.
+        
+        Args:
+            provider: The provider name
+            
+        Returns:
+            The provider's circuit breaker
+        """
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(provider)
+            return self._breakers[provider]
+    
+    def reset(self):
+        """Forget every breaker, closing all circuits."""
+        with self._lock:
+            self._breakers.clear()
+
+# Create a singleton instance
+circuit_breakers = CircuitBreakerRegistry()
+
+# Worker threads that let synchronous calls be abandoned at their deadline or hedged;
+# sized above MAX_CONCURRENT_WORKFLOWS so queueing does not eat into deadlines
+_executor = ThreadPoolExecutor(max_workers=256, thread_name_prefix="resilience")
+
+class ResilientCaller:
+    """
+    Runs provider calls with a per-attempt deadline, jittered exponential
+    backoff between retryable failures, hedged duplicate requests and the
+    provider's circuit breaker. Works for both blocking and async calls.
+    """
+    
+    def __init__(self, provider: str, policy: Optional[RetryPolicy] = None,
+                 breaker: Optional[CircuitBreaker] = None):
+        """
+        Initialize the caller.
+        
+        Args:
+            provider: The provider name, used for the breaker and metrics
+            policy: Retry settings; defaults to the provider's RESILIENCE_POLICIES entry
+            breaker: Circuit breaker; defaults to the provider's shared breaker
+        """
+        self.provider = provider
+        self.policy = policy or RetryPolicy.for_provider(provider)
+        self.breaker = breaker or circuit_breakers.get(provider)
+        self._labels = {"provider": provider}
+    
+    def _attempt(self, fn: Callable[[], T], hedge: bool) -> T:
+        """Run one attempt under the deadline, hedging it if configured."""
+        timeout, hedge_after = self.policy.timeout, self.policy.hedge_after if hedge else None
+        if timeout is None and hedge_after is None:
+            return fn()
+        
+        # Copy the context so callbacks and the run context follow the call into the worker
+        started = time.monotonic()
+        futures = [_executor.submit(contextvars.copy_context().run, fn)]
+        if hedge_after is not None and (timeout is None or hedge_after < timeout):
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                metrics.inc("resilience_hedges_total", 1, self._labels)
+                futures.append(_executor.submit(contextvars.copy_context().run, fn))
+        
+        remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            future: Future = done.pop()
+            if future.exception() is None or not pending:
+                # A failed hedge only counts once its twin has failed too
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        
+        raise CallTimeoutError(f"{self.provider} call timed out after {timeout}s")
+    
+    async def _aattempt(self, coro_fn: Callable[[], Awaitable[T]], hedge: bool) -> T:
+        """Asynchronously run one attempt under the deadline, hedging it if configured."""
+        timeout, hedge_after = self.policy.timeout, self.policy.hedge_after if hedge else None
+        if hedge_after is None or (timeout is not None and hedge_after >= timeout):
+            try:
+                return await asyncio.wait_for(coro_fn(), timeout)
+            except asyncio.TimeoutError:
+                raise CallTimeoutError(f"{self.provider} call timed out after {timeout}s")
+        
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        tasks = [asyncio.ensure_future(coro_fn())]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                metrics.inc("resilience_hedges_total", 1, self._labels)
+                tasks.append(asyncio.ensure_future(coro_fn()))
+            
+            pending = set(tasks)
+            while pending:
+                remaining = None if deadline is None else max(0.0, deadline - loop.time())
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                task = done.pop()
+                if task.exception() is None or not pending:
+                    return task.result()
+            raise CallTimeoutError(f"{self.provider} call timed out after {timeout}s")
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def _failed(self, attempt: int, error: BaseException) -> Optional[float]:
+        """
+        Record a failed attempt.
+        
+        Args:
+            attempt: The attempt number, from 1
+            error: The error it raised
+            
+        Returns:
+            Seconds to back off before retrying, or None to give up
+        """
+        retryable = is_retryable(error)
+        if retryable:
+            self.breaker.record_failure()
+        elif status_code(error) is not None:
+            # The provider answered, e.g. with a 400, so it is reachable
+            self.breaker.record_success()
+        else:
+            # Budget stops, parsing errors and the like are not the provider's fault
+            self.breaker.release()
+        if isinstance(error, CallTimeoutError):
+            metrics.inc("resilience_timeouts_total", 1, self._labels)
+        if not retryable or attempt >= self.policy.max_attempts:
+            metrics.inc("resilience_failures_total", 1, self._labels)
+            return None
+        
+        delay = self.policy.backoff(attempt, error)
+        metrics.inc("resilience_retries_total", 1, self._labels)
+        logger.warning(
+            f"{self.provider} call failed ({type(error).__name__}: {error}); "
+            f"retry {attempt}/{self.policy.max_attempts - 1} in {delay:.2f}s"
+        )
+        return delay
+    
+    def call(self, fn: Callable[[], T], hedge: bool = True, before_attempt: Optional[Callable[[], Any]] = None) -> T:
+        """
+        Call a blocking function with deadlines, retries, hedging and the circuit breaker.
+        
+        Args:
+            fn: The call to make
+            hedge: Whether a slow attempt may be duplicated; disable for calls
+                whose result holds a resource, such as an open stream
+            before_attempt: Runs before every attempt, outside its deadline,
+                e.g. to wait for rate limit admission
+                
+        Returns:
+            The result of the first successful attempt
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_call()
+            if before_attempt is not None:
+                try:
+                    before_attempt()
+                except BaseException:
+                    # Admission failed before the provider was reached; free a half-open trial slot
+                    self.breaker.release()
+                    raise
+            try:
+                result = self._attempt(fn, hedge)
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+    
+    async def acall(self, coro_fn: Callable[[], Awaitable[T]], hedge: bool = True,
+                    before_attempt: Optional[Callable[[], Awaitable[Any]]] = None) -> T:
+        """
+        Asynchronously call a coroutine function with deadlines, retries, hedging
+        and the circuit breaker.
+        
+        Args:
+            coro_fn: Creates the coroutine for each attempt
+            hedge: Whether a slow attempt may be duplicated, as for call()
+            before_attempt: Awaited before every attempt, outside its deadline
+            
+        Returns:
+            The result of the first successful attempt
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_call()
+            if before_attempt is not None:
+                try:
+                    await before_attempt()
+                except BaseException:
+                    # Admission failed before the provider was reached; free a half-open trial slot
+                    self.breaker.release()
+                    raise
+            try:
+                result = await self._aattempt(coro_fn, hedge)
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
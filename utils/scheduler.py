@@ -0,0 +1,326 @@
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+from utils.metrics import metrics
+from utils.tracing import Trace
+
+# Lower rank is served first
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+_priority: ContextVar[str] = ContextVar("request_priority", default="interactive")
+
+# Runs remembered for fair queueing before the least recently served are forgotten
+_MAX_TRACKED_OWNERS = 4096
+
+@contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    """
+    Set the scheduling priority of requests made in the block, including by
+    threads and tasks started from it.
+    
+    Args:
+        priority: 'interactive' or 'batch'
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def current_priority() -> str:
+    """Get the scheduling priority of the code currently executing."""
+    return _priority.get()
+
+def _current_owner() -> str:
+    """Identify the run making a request, falling back to the thread."""
+    span = Trace.current_span()
+    return span.trace.run_id if span is not None else threading.current_thread().name
+
+class TokenBucket:
+    """Continuously refilling bucket; the level may go negative when usage is settled late."""
+    
+    def __init__(self, per_minute: float, capacity: float):
+        """
+        Initialize a full bucket.
+        
+        Args:
+            per_minute: Refill rate in units per minute
+            capacity: Maximum level, i.e. the allowed burst
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity
+        self.level = capacity
+        self._updated = time.monotonic()
+    
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def wait_for(self, amount: float) -> float:
+        """
+        Seconds until the bucket can pay an amount; a request larger than the
+        capacity is let through once the bucket is full.
+        """
+        needed = min(amount, self.capacity) - self.level
+        return 0.0 if needed <= 0 else needed / self.rate
+    
+    def take(self, amount: float):
+        self.level -= amount
+
+class _Waiter:
+    """A request queued for admission, woken by event (threads) or future (asyncio)."""
+    __slots__ = ("rank", "share", "seq", "tokens", "priority", "owner", "enqueued",
+                 "event", "loop", "future", "granted", "cancelled")
+    
+    def __init__(self, rank: int, share: int, seq: int, tokens: int, priority: str, owner: str):
+        self.rank = rank
+        self.share = share
+        self.seq = seq
+        self.tokens = tokens
+        self.priority = priority
+        self.owner = owner
+        self.enqueued = time.monotonic()
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+        self.granted = False
+        self.cancelled = False
+    
+    def __lt__(self, other: '_Waiter') -> bool:
+        return (self.rank, self.share, self.seq) < (other.rank, other.share, other.seq)
+
+class RequestScheduler(BaseRateLimiter):
+    """
+    Process-wide admission control for one provider or provider model.
+    Enforces requests/minute and tokens/minute with token buckets, and queues
+    waiting requests by priority (interactive before batch), then by how many
+    requests each run has already been granted, so one busy run cannot starve
+    the others. Blocking and asyncio callers share the same queue.
+    
+    Also usable wherever a LangChain rate limiter is expected; acquire() then
+    admits a request with no token cost.
+    """
+    
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, burst_seconds: float = 10.0):
+        """
+        Initialize the scheduler.
+        
+        Args:
+            name: The provider or provider:model key, used in metrics
+            requests_per_minute: Request limit; None for unlimited
+            tokens_per_minute: Token limit; None for unlimited
+            burst_seconds: Seconds of traffic a full bucket allows at once
+        """
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute, max(1.0, requests_per_minute * burst_seconds / 60)) \
+            if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute, max(1.0, tokens_per_minute * burst_seconds / 60)) \
+            if tokens_per_minute else None
+        self._queue: List[_Waiter] = []
+        self._served: 'OrderedDict[str, int]' = OrderedDict()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._dispatcher: Optional[threading.Thread] = None
+        self.granted = 0
+        self.total_wait = 0.0
+        self._labels = {"scheduler": name}
+    
+    def _wait_needed(self, tokens: int, now: float) -> float:
+        """Seconds until both buckets can admit a request; call with the lock held."""
+        wait = 0.0
+        for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+            if bucket is not None:
+                bucket.refill(now)
+                wait = max(wait, bucket.wait_for(amount))
+        return wait
+    
+    def _grant(self, waiter: _Waiter, now: float):
+        """Charge the buckets for a request and record it; call with the lock held."""
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(waiter.tokens)
+        self._served[waiter.owner] = self._served.pop(waiter.owner, 0) + 1
+        if len(self._served) > _MAX_TRACKED_OWNERS:
+            self._served.popitem(last=False)
+        
+        waited = now - waiter.enqueued
+        self.granted += 1
+        self.total_wait += waited
+        labels = {**self._labels, "priority": waiter.priority}
+        metrics.inc("scheduler_requests_total", 1, labels)
+        metrics.observe("scheduler_wait_seconds", waited, labels)
+    
+    def _enqueue(self, tokens: int) -> _Waiter:
+        """
+        Admit a request at once if nothing is queued and the buckets allow it,
+        otherwise queue it; call with the lock held.
+        """
+        priority = current_priority()
+        owner = _current_owner()
+        waiter = _Waiter(PRIORITIES[priority], self._served.get(owner, 0), next(self._seq), tokens, priority, owner)
+        now = time.monotonic()
+        if not self._queue and self._wait_needed(tokens, now) == 0:
+            self._grant(waiter, now)
+            waiter.granted = True
+            return waiter
+        
+        heapq.heappush(self._queue, waiter)
+        metrics.gauge("scheduler_queue_depth", len(self._queue), self._labels)
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._dispatch, name=f"scheduler-{self.name}", daemon=True)
+            self._dispatcher.start()
+        self._wakeup.notify()
+        return waiter
+    
+    def _dispatch(self):
+        """Grant queued requests in order as the buckets refill."""
+        with self._lock:
+            while True:
+                while self._queue and self._queue[0].cancelled:
+                    heapq.heappop(self._queue)
+                if not self._queue:
+                    metrics.gauge("scheduler_queue_depth", 0, self._labels)
+                    self._wakeup.wait()
+                    continue
+                
+                head = self._queue[0]
+                now = time.monotonic()
+                wait = self._wait_needed(head.tokens, now)
+                if wait > 0:
+                    self._wakeup.wait(timeout=wait)
+                    continue
+                
+                heapq.heappop(self._queue)
+                metrics.gauge("scheduler_queue_depth", len(self._queue), self._labels)
+                self._grant(head, now)
+                head.granted = True
+                if head.event is not None:
+                    head.event.set()
+                    continue
+                try:
+                    head.loop.call_soon_threadsafe(self._resolve, head.future)
+                except RuntimeError:
+                    # The waiter's event loop has closed; nobody will use the grant
+                    self._refund(head)
+    
+    @staticmethod
+    def _resolve(future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+    
+    def _refund(self, waiter: _Waiter):
+        """Give back a grant its caller abandoned; call with the lock held."""
+        if self.requests is not None:
+            self.requests.take(-1)
+        if self.tokens is not None:
+            self.tokens.take(-waiter.tokens)
+    
+    def admit(self, tokens: int = 0) -> float:
+        """
+        Block until a request may be sent.
+        
+        Args:
+            tokens: Estimated tokens the request will use
+            
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._lock:
+            waiter = self._enqueue(tokens)
+            if waiter.granted:
+                return 0.0
+            waiter.event = threading.Event()
+        waiter.event.wait()
+        return time.monotonic() - start
+    
+    async def aadmit(self, tokens: int = 0) -> float:
+        """
+        Wait without blocking the event loop until a request may be sent.
+        
+        Args:
+            tokens: Estimated tokens the request will use
+            
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._lock:
+            waiter = self._enqueue(tokens)
+            if waiter.granted:
+                return 0.0
+            waiter.loop = asyncio.get_running_loop()
+            waiter.future = waiter.loop.create_future()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                waiter.cancelled = True
+                if waiter.granted:
+                    self._refund(waiter)
+                self._wakeup.notify()
+            raise
+        return time.monotonic() - start
+    
+    def settle(self, estimated: int, actual: int):
+        """
+        Correct the token bucket once a request's real usage is known.
+        
+        Args:
+            estimated: Tokens charged at admission
+            actual: Tokens the provider reported
+        """
+        if self.tokens is None or actual == estimated:
+            return
+        with self._lock:
+            self.tokens.take(actual - estimated)
+            self._wakeup.notify()
+    
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """Admit a request with no token cost (LangChain rate limiter interface)."""
+        if blocking:
+            self.admit()
+            return True
+        with self._lock:
+            if self._queue or self._wait_needed(0, time.monotonic()) > 0:
+                return False
+            self._grant(_Waiter(PRIORITIES[current_priority()], 0, next(self._seq), 0,
+                                current_priority(), _current_owner()), time.monotonic())
+            return True
+    
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        """Asynchronously admit a request with no token cost (LangChain rate limiter interface)."""
+        if blocking:
+            await self.aadmit()
+            return True
+        return self.acquire(blocking=False)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the scheduler counters.
+        
+        Returns:
+            Queue depth, requests granted, average wait and bucket levels
+        """
+        with self._lock:
+            return {
+                "queue_depth": sum(1 for waiter in self._queue if not waiter.cancelled),
+                "granted": self.granted,
+                "avg_wait_seconds": self.total_wait / self.granted if self.granted else 0.0,
+                "requests_available": self.requests.level if self.requests else None,
+                "tokens_available": self.tokens.level if self.tokens else None,
+            }
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+class _Call:
+    """An in-flight call whose result is shared by every caller of the same key."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class _AsyncCall:
+    """An in-flight task whose result is shared by every caller of the same key on one event loop."""
+    
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Deduplicates identical concurrent calls: while a call for a key is in
+    flight, other callers with the same key wait for and share its result
+    instead of starting their own. Works from threads and from asyncio.
+    """
+    
+    def __init__(self):
+        """Initialize with no calls in flight."""
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[Tuple[int, str], _AsyncCall] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+    
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn for a key unless an identical call is already in flight.
+        
+        Args:
+            key: Identity of the call
+            fn: The function to run
+            
+        Returns:
+            The result and whether it was shared from another caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+        
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+    
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await fn for a key unless an identical call is already in flight on this event loop.
+        The call runs in its own task, so a cancelled caller, leader or not,
+        does not cancel it for the others; it is cancelled only once every
+        caller waiting for it has been.
+        
+        Args:
+            key: Identity of the call
+            fn: Coroutine function to await
+            
+        Returns:
+            The result and whether it was shared from another caller
+        """
+        loop_key = (id(asyncio.get_running_loop()), key)
+        call = self._async_calls.get(loop_key)
+        shared = call is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            # The task copies the leader's context, so its callbacks and run context follow
+            call = _AsyncCall(asyncio.ensure_future(fn()))
+            self._async_calls[loop_key] = call
+            call.task.add_done_callback(lambda _: self._forget(loop_key, call))
+        
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+    
+    def _forget(self, loop_key: Tuple[int, str], call: '_AsyncCall'):
+        """Drop a finished call, unless a newer one took its key."""
+        if self._async_calls.get(loop_key) is call:
+            del self._async_calls[loop_key]
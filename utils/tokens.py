@@ -0,0 +1,35 @@
+from typing import Any
+
+# Rough characters-per-token ratio for English text with Llama-family tokenizers
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: Any) -> int:
+    """
+    Estimate the number of tokens in a text without loading a tokenizer.
+    
+    Args:
+        text: The text (non-strings are converted with str())
+        
+    Returns:
+        The approximate token count
+    """
+    if not isinstance(text, str):
+        text = str(text)
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, max_tokens: int, marker: str = " …[truncated]") -> str:
+    """
+    Cut a text down to approximately a token budget.
+    
+    Args:
+        text: The text to shorten
+        max_tokens: The approximate number of tokens to keep
+        marker: Suffix appended when the text was cut
+        
+    Returns:
+        The text unchanged if it fits, otherwise its head plus the marker
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + marker
@@ -0,0 +1,378 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from config.settings import MODEL_PRICING
+from utils.logger import logger
+from utils.metrics import metrics
+
+_current_span: ContextVar[Optional['Span']] = ContextVar("current_span", default=None)
+
+class Span:
+    """A timed operation within a run: an agent step, LLM request, tool call or cache lookup."""
+    
+    def __init__(self, trace: 'Trace', kind: str, name: str, parent: Optional['Span'] = None, **attributes: Any):
+        """
+        Start the span.
+        
+        Args:
+            trace: The trace the span belongs to
+            kind: 'agent', 'llm', 'tool' or 'cache'
+            name: Agent, model, tool or cache name
+            parent: The enclosing span, if any
+            **attributes: Extra attributes recorded with the span
+        """
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.name = name
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes
+        self.start = time.time()
+        self.duration: Optional[float] = None
+        self._started = time.perf_counter()
+    
+    def finish(self, **attributes: Any):
+        """
+        End the span and hand it to its trace.
+        
+        Args:
+            **attributes: Attributes known only at the end, e.g. token counts
+        """
+        self.duration = time.perf_counter() - self._started
+        self.attributes.update(attributes)
+        self.trace.add(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the span for export."""
+        return {
+            "run_id": self.trace.run_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start": self.start,
+            "duration_seconds": self.duration,
+            **self.attributes,
+        }
+
+class Trace:
+    """
+    Structured trace of one workflow run.
+    Finished spans are kept for export and summary, and also feed the
+    process-wide latency histograms and token/cost counters.
+    """
+    
+    def __init__(self, run_id: str):
+        """
+        Initialize an empty trace.
+        
+        Args:
+            run_id: Identifier of the run
+        """
+        self.run_id = run_id
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        """Get the span enclosing the code currently executing."""
+        return _current_span.get()
+    
+    def start_span(self, kind: str, name: str, **attributes: Any) -> Span:
+        """
+        Start a span under the current span without making it current.
+        
+        Args:
+            kind: The span kind
+            name: The span name
+            **attributes: Extra attributes
+            
+        Returns:
+            The started span; call finish() on it
+        """
+        return Span(self, kind, name, parent=_current_span.get(), **attributes)
+    
+    @contextmanager
+    def span(self, kind: str, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Time a block as a span that encloses any spans started inside it.
+        
+        Args:
+            kind: The span kind
+            name: The span name
+            **attributes: Extra attributes
+        """
+        span = self.start_span(kind, name, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish()
+    
+    def record(self, kind: str, name: str, seconds: float, **attributes: Any) -> Span:
+        """
+        Record an operation that has already completed as a span under the current span.
+        
+        Args:
+            kind: The span kind
+            name: The span name
+            seconds: How long the operation took
+            **attributes: Extra attributes
+            
+        Returns:
+            The recorded span
+        """
+        span = self.start_span(kind, name, **attributes)
+        span.start -= seconds
+        span._started -= seconds
+        span.finish()
+        return span
+    
+    def add(self, span: Span):
+        """
+        Record a finished span.
+        
+        Args:
+            span: The finished span
+        """
+        with self._lock:
+            self.spans.append(span)
+        
+        labels = {"kind": span.kind, "name": span.name}
+        metrics.observe("workflow_span_duration_seconds", span.duration, labels)
+        if span.attributes.get("error"):
+            metrics.inc("workflow_span_errors_total", 1, labels)
+        if span.kind == "llm":
+            model = {"model": span.name}
+            metrics.inc("workflow_llm_prompt_tokens_total", span.attributes.get("prompt_tokens", 0), model)
+            metrics.inc("workflow_llm_completion_tokens_total", span.attributes.get("completion_tokens", 0), model)
+            metrics.inc("workflow_llm_cost_usd_total", span.attributes.get("cost_usd", 0.0), model)
+        elif span.kind == "cache":
+            metrics.inc("workflow_cache_lookups_total", 1, {"cache": span.name, "result": span.attributes.get("result", "")})
+        elif span.kind == "search":
+            metrics.inc("workflow_search_tokens_total", span.attributes.get("tokens_in", 0), {"stage": "in"})
+            metrics.inc("workflow_search_tokens_total", span.attributes.get("tokens_out", 0), {"stage": "out"})
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        Aggregate the trace into per-agent timings and LLM/tool/cache totals.
+        
+        Returns:
+            A summary dictionary
+        """
+        with self._lock:
+            spans = list(self.spans)
+        
+        agents = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+        tools = defaultdict(lambda: {"calls": 0, "seconds": 0.0, "errors": 0})
+        caches = defaultdict(lambda: defaultdict(int))
+        llm = {"calls": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        search = {"calls": 0, "tokens_in": 0, "tokens_out": 0}
+        
+        for span in spans:
+            if span.kind == "agent":
+                agents[span.name]["calls"] += 1
+                agents[span.name]["seconds"] += span.duration
+            elif span.kind == "llm":
+                llm["calls"] += 1
+                llm["seconds"] += span.duration
+                llm["prompt_tokens"] += span.attributes.get("prompt_tokens", 0)
+                llm["completion_tokens"] += span.attributes.get("completion_tokens", 0)
+                llm["cost_usd"] += span.attributes.get("cost_usd", 0.0)
+            elif span.kind == "tool":
+                tools[span.name]["calls"] += 1
+                tools[span.name]["seconds"] += span.duration
+                tools[span.name]["errors"] += 1 if span.attributes.get("error") else 0
+            elif span.kind == "cache":
+                caches[span.name][span.attributes.get("result", "unknown")] += 1
+            elif span.kind == "search":
+                search["calls"] += 1
+                search["tokens_in"] += span.attributes.get("tokens_in", 0)
+                search["tokens_out"] += span.attributes.get("tokens_out", 0)
+        
+        for totals in list(agents.values()) + list(tools.values()) + [llm]:
+            totals["seconds"] = round(totals["seconds"], 4)
+        llm["cost_usd"] = round(llm["cost_usd"], 6)
+        
+        return {
+            "agents": dict(agents),
+            "llm": llm,
+            "tools": dict(tools),
+            "caches": {name: dict(results) for name, results in caches.items()},
+            "search": search,
+        }
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the cost of an LLM request from MODEL_PRICING.
+    
+    Args:
+        model: The model name
+        prompt_tokens: Input tokens
+        completion_tokens: Output tokens
+        
+    Returns:
+        The cost in USD, or 0.0 for models without pricing
+    """
+    pricing = MODEL_PRICING.get(model)
+    if not pricing:
+        return 0.0
+    return (prompt_tokens * pricing["input"] + completion_tokens * pricing["output"]) / 1_000_000
+
+def record_cache_lookup(cache: str, hit: bool, seconds: float):
+    """
+    Record a cache lookup on the current run's trace, if any, and in the global metrics.
+    
+    Args:
+        cache: The cache name, e.g. 'llm' or 'search'
+        hit: Whether the lookup was a hit
+        seconds: Duration of the lookup
+    """
+    result = "hit" if hit else "miss"
+    span = _current_span.get()
+    if span is None:
+        metrics.inc("workflow_cache_lookups_total", 1, {"cache": cache, "result": result})
+        return
+    span.trace.record("cache", cache, seconds, result=result)
+
+def record_search_trim(tool: str, tokens_in: int, tokens_out: int, seconds: float, **attributes: Any):
+    """
+    Record how much a search's results were trimmed before reaching the model,
+    on the current run's trace, if any, and in the global metrics.
+    
+    Args:
+        tool: The search tool name
+        tokens_in: Estimated tokens of the raw results
+        tokens_out: Estimated tokens passed on to the model
+        seconds: Duration of the trimming
+        **attributes: Extra attributes, e.g. result counts
+    """
+    logger.debug(f"Search results trimmed from {tokens_in} to {tokens_out} tokens", tool)
+    span = _current_span.get()
+    if span is None:
+        metrics.inc("workflow_search_tokens_total", tokens_in, {"stage": "in"})
+        metrics.inc("workflow_search_tokens_total", tokens_out, {"stage": "out"})
+        return
+    span.trace.record("search", tool, seconds, tokens_in=tokens_in, tokens_out=tokens_out, **attributes)
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler that records a span for every LLM request and tool call
+    of a run, including those inside ReAct sub-agents.
+    """
+    run_inline = True
+    
+    def __init__(self, trace: Trace):
+        """
+        Initialize the handler.
+        
+        Args:
+            trace: The run's trace
+        """
+        self.trace = trace
+        self._open: Dict[UUID, Span] = {}
+        self._lock = threading.Lock()
+    
+    def _start(self, run_id: UUID, kind: str, name: str):
+        span = self.trace.start_span(kind, name)
+        with self._lock:
+            self._open[run_id] = span
+    
+    def _pop(self, run_id: UUID) -> Optional[Span]:
+        with self._lock:
+            return self._open.pop(run_id, None)
+    
+    @staticmethod
+    def _model_name(metadata: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+        params = kwargs.get("invocation_params") or {}
+        return (metadata or {}).get("ls_model_name") or params.get("model_name") or params.get("model") or "unknown"
+    
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        self._start(run_id, "llm", self._model_name(metadata, kwargs))
+    
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID,
+                     metadata: Optional[Dict[str, Any]] = None, **kwargs: Any):
+        self._start(run_id, "llm", self._model_name(metadata, kwargs))
+    
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        span = self._pop(run_id)
+        if span is None:
+            return
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    prompt_tokens += usage.get("input_tokens", 0)
+                    completion_tokens += usage.get("output_tokens", 0)
+                # A routed model may have been answered by a fallback, not the model it started with
+                answered_by = getattr(message, "response_metadata", {}).get("model_name")
+                if answered_by:
+                    span.name = answered_by
+        span.finish(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cost_usd=estimate_cost(span.name, prompt_tokens, completion_tokens)
+        )
+    
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        span = self._pop(run_id)
+        if span is not None:
+            span.finish(error=type(error).__name__)
+    
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, "tool", (serialized or {}).get("name") or "tool")
+    
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        span = self._pop(run_id)
+        if span is not None:
+            span.finish()
+    
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        span = self._pop(run_id)
+        if span is not None:
+            span.finish(error=type(error).__name__)
+
+class JsonlTraceExporter:
+    """Appends every span of finished runs to a JSONL file."""
+    
+    def __init__(self, path: str):
+        """
+        Initialize the exporter.
+        
+        Args:
+            path: The JSONL file to append to
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def export(self, trace: Trace):
+        """
+        Write a trace's spans.
+        
+        Args:
+            trace: The finished trace
+        """
+        lines = [json.dumps(span.to_dict(), default=str) + "\n" for span in trace.spans]
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
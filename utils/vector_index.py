@@ -0,0 +1,251 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from utils.embeddings import Embedder, HashingEmbedder
+from utils.logger import logger
+
+_VECTORS_FILE = "vectors.f32"
+_DOCS_FILE = "docs.jsonl"
+_META_FILE = "meta.json"
+
+class VectorIndex:
+    """
+    Append-only index of text embeddings for approximate nearest-neighbor search.
+    
+    Vectors are L2-normalized float32 rows of one matrix. With a path, the
+    matrix lives in a raw file that is memory-mapped for search and grown by
+    appending, and the documents in a JSON-lines file beside it, so the index
+    survives restarts without loading everything into memory. Without a path
+    it is kept in memory.
+    
+    Search uses random-hyperplane LSH: each of several tables hashes a vector
+    to the signs of its projections on a few random planes, and only rows
+    sharing a bucket with the query (or one bit away) are scored exactly.
+    Small indexes are scanned in full. The index is thread-safe within one
+    process; several processes must not write the same path.
+    """
+    
+    def __init__(self, path: Optional[str] = None, embedder: Optional[Embedder] = None,
+                 embedder_name: str = "hashing:256", lsh_bits: int = 12, lsh_tables: int = 8,
+                 exact_below: int = 5000, seed: int = 0):
+        """
+        Initialize the index, loading what was stored at the path.
+        
+        Args:
+            path: Directory holding the index files; None keeps it in memory
+            embedder: Maps text to a vector; a HashingEmbedder if omitted
+            embedder_name: Identifies the embedder; a stored index built with
+                another embedder is discarded
+            lsh_bits: Hyperplanes per hash table, i.e. about 2**bits buckets per table
+            lsh_tables: Hash tables; more tables find more true neighbors
+            exact_below: Indexes with fewer rows are scanned in full
+            seed: Seed for the hyperplanes, fixed so stored rows hash the same after a restart
+        """
+        self.path = path
+        self.embedder = embedder or HashingEmbedder()
+        self.embedder_name = embedder_name
+        self.dimensions = getattr(self.embedder, "dimensions", None) or len(self.embedder("dimensions"))
+        self.exact_below = exact_below
+        self._planes = np.random.default_rng(seed).standard_normal((lsh_tables, lsh_bits, self.dimensions)).astype(np.float32)
+        self._powers = 1 << np.arange(lsh_bits, dtype=np.int64)
+        self._lock = threading.Lock()
+        self._reset()
+        if path is not None:
+            self._load()
+    
+    def _reset(self):
+        """Empty the in-memory state."""
+        self._matrix = np.empty((0, self.dimensions), dtype=np.float32)
+        self._pending: List[np.ndarray] = []
+        self._docs: List[Dict[str, Any]] = []
+        self._digests = set()
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(len(self._planes))]
+    
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+    
+    def _load(self):
+        """Map the stored vectors and read the documents, discarding an incompatible index."""
+        os.makedirs(self.path, exist_ok=True)
+        meta = {"dimensions": self.dimensions, "embedder": self.embedder_name}
+        try:
+            with open(self._file(_META_FILE), encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = None
+        if stored != meta:
+            if stored is not None:
+                logger.warning(f"Discarding research index at {self.path}: built with {stored}, now {meta}")
+            for name in (_VECTORS_FILE, _DOCS_FILE):
+                if os.path.exists(self._file(name)):
+                    os.remove(self._file(name))
+            with open(self._file(_META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            return
+        
+        if os.path.exists(self._file(_DOCS_FILE)):
+            with open(self._file(_DOCS_FILE), encoding="utf-8") as f:
+                self._docs = [json.loads(line) for line in f if line.strip()]
+        rows = os.path.getsize(self._file(_VECTORS_FILE)) // (4 * self.dimensions) if os.path.exists(self._file(_VECTORS_FILE)) else 0
+        
+        # An interrupted append can leave one file ahead of the other; trim both to the shorter
+        count = min(rows, len(self._docs))
+        if count != rows or count != len(self._docs):
+            logger.warning(f"Research index at {self.path} was partially written; keeping {count} rows")
+            self._docs = self._docs[:count]
+            with open(self._file(_VECTORS_FILE), "r+b") as f:
+                f.truncate(count * 4 * self.dimensions)
+            with open(self._file(_DOCS_FILE), "w", encoding="utf-8") as f:
+                f.writelines(json.dumps(doc) + "\n" for doc in self._docs)
+        
+        self._remap()
+        self._digests = {doc["digest"] for doc in self._docs}
+        for start in range(0, count, 65536):
+            block = np.asarray(self._matrix[start:start + 65536])
+            for offset, codes in enumerate(self._codes(block)):
+                self._bucket(start + offset, codes)
+    
+    def _remap(self):
+        """Make the matrix include every appended row."""
+        if self.path is None:
+            if self._pending:
+                self._matrix = np.vstack([self._matrix, *self._pending])
+        else:
+            count = len(self._docs)
+            self._matrix = (
+                np.memmap(self._file(_VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, self.dimensions))
+                if count else np.empty((0, self.dimensions), dtype=np.float32)
+            )
+        self._pending = []
+    
+    def _codes(self, vectors: np.ndarray) -> np.ndarray:
+        """LSH bucket of each vector in each table, shape (rows, tables)."""
+        signs = np.einsum("tbd,nd->ntb", self._planes, vectors) > 0
+        return signs.astype(np.int64) @ self._powers
+    
+    def _bucket(self, row: int, codes: np.ndarray):
+        for table, code in enumerate(codes):
+            self._buckets[table].setdefault(int(code), []).append(row)
+    
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(self.embedder(text), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+    
+    def add(self, text: str, **metadata: Any) -> bool:
+        """
+        Embed and append a document, unless the same text is already indexed.
+        
+        Args:
+            text: The document text
+            **metadata: JSON-serializable fields returned with search hits, e.g. url or source
+            
+        Returns:
+            Whether the document was added
+        """
+        text = text.strip()
+        digest = self._digest(text)
+        if not text or digest in self._digests:
+            return False
+        vector = self._embed(text)
+        codes = self._codes(vector[None, :])[0]
+        doc = {**metadata, "text": text, "digest": digest, "created": time.time()}
+        
+        with self._lock:
+            if digest in self._digests:
+                return False
+            row = len(self._docs)
+            if self.path is not None:
+                # Vectors first: a crash between the writes leaves an extra row that _load trims
+                with open(self._file(_VECTORS_FILE), "ab") as f:
+                    f.write(vector.tobytes())
+                with open(self._file(_DOCS_FILE), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(doc) + "\n")
+            self._pending.append(vector[None, :])
+            self._docs.append(doc)
+            self._digests.add(digest)
+            self._bucket(row, codes)
+        return True
+    
+    def _candidates(self, codes: np.ndarray) -> np.ndarray:
+        """Rows sharing a bucket with the query, or one bit away from it, in any table."""
+        rows = set()
+        flips = [0] + [int(power) for power in self._powers]
+        for table, code in enumerate(codes):
+            buckets = self._buckets[table]
+            for flip in flips:
+                rows.update(buckets.get(int(code) ^ flip, ()))
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+    
+    def search(self, query: str, k: int = 4, min_score: float = 0.0,
+               max_age_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Find the documents most similar to a query.
+        
+        Args:
+            query: The query text
+            k: Most hits to return
+            min_score: Lowest cosine similarity to return
+            max_age_seconds: Ignore documents older than this; None keeps all
+            
+        Returns:
+            Hits with the document's text and metadata and a 'score', best first
+        """
+        vector = self._embed(query)
+        with self._lock:
+            if self._pending or len(self._matrix) != len(self._docs):
+                self._remap()
+            matrix, docs = self._matrix, self._docs
+        if not len(matrix):
+            return []
+        
+        if len(matrix) < self.exact_below:
+            rows = np.arange(len(matrix))
+        else:
+            rows = np.sort(self._candidates(self._codes(vector[None, :])[0]))
+            rows = rows[rows < len(matrix)]
+        if not len(rows):
+            return []
+        scores = np.asarray(matrix[rows]) @ vector
+        
+        if max_age_seconds is not None:
+            cutoff = time.time() - max_age_seconds
+            fresh = np.fromiter((docs[row]["created"] >= cutoff for row in rows), dtype=bool, count=len(rows))
+            scores = np.where(fresh, scores, -np.inf)
+        top = np.argsort(-scores)[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {**{key: value for key, value in docs[rows[i]].items() if key != "digest"}, "score": float(scores[i])}
+            for i in top if scores[i] >= min_score
+        ]
+    
+    def clear(self):
+        """Remove every document, including the stored files."""
+        with self._lock:
+            self._reset()
+            if self.path is not None:
+                shutil.rmtree(self.path, ignore_errors=True)
+                self._load()
+    
+    def __len__(self) -> int:
+        return len(self._docs)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get the index size.
+        
+        Returns:
+            Documents, dimensions and the embedder
+        """
+        return {"size": len(self), "dimensions": self.dimensions, "embedder": self.embedder_name}